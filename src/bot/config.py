@@ -9,10 +9,32 @@ class Config:
     ADMIN_BOOTSTRAP_CODES: list[str]
     SUPER_ADMIN_CODE: str
     ARCHIVE_AFTER_DAYS: int
+    ARCHIVE_BATCH_SIZE: int
+    SCHEDULER_BATCH_SIZE: int
+    SCHEDULER_RESYNC_SECONDS: int
+    LEADER_HEARTBEAT_SECONDS: float
     LOG_LEVEL: str
     ENVIRONMENT: str
     RESPONSE_REMINDER_HOURS: int
     JOB_AUTO_CLOSE_HOURS: int
+    DISPATCH_CONCURRENCY: int
+    TELEGRAM_GLOBAL_RATE: float
+    TELEGRAM_PER_CHAT_RATE: float
+    TELEGRAM_PER_CHAT_BURST: float
+    PHOTO_CACHE_DIR: str
+    PHOTO_CACHE_MAX_MB: int
+    USER_CACHE_TTL_SECONDS: int
+    USER_CACHE_MAX_ENTRIES: int
+    FSM_FLUSH_DELAY_MS: int
+    FSM_STATE_TTL_HOURS: int
+    BOT_MODE: str
+    WEBHOOK_BASE_URL: str
+    WEBHOOK_PATH: str
+    WEBHOOK_SECRET: str
+    WEBHOOK_HOST: str
+    WEBHOOK_PORT: int
+    TELEGRAM_API_URL: str
+    WORKER_PROCESSES: int
 
     def __init__(self):
         self.BOT_TOKEN = os.getenv("TELEGRAM_BOT_TOKEN", "")
@@ -24,10 +46,47 @@ class Config:
         self.SUPER_ADMIN_CODE = os.getenv("SUPER_ADMIN_CODE", "")
         
         self.ARCHIVE_AFTER_DAYS = int(os.getenv("ARCHIVE_AFTER_DAYS", "90"))
+        self.ARCHIVE_BATCH_SIZE = int(os.getenv("ARCHIVE_BATCH_SIZE", "500"))
         self.LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
         self.ENVIRONMENT = os.getenv("ENVIRONMENT", "development")
         self.RESPONSE_REMINDER_HOURS = int(os.getenv("RESPONSE_REMINDER_HOURS", "24"))
         self.JOB_AUTO_CLOSE_HOURS = int(os.getenv("JOB_AUTO_CLOSE_HOURS", "72"))
+        # Rows each scheduler pass claims per transaction (FOR UPDATE SKIP LOCKED)
+        self.SCHEDULER_BATCH_SIZE = int(os.getenv("SCHEDULER_BATCH_SIZE", "100"))
+        # Job timers fire on time; this only bounds lag for changes made by other processes
+        self.SCHEDULER_RESYNC_SECONDS = int(os.getenv("SCHEDULER_RESYNC_SECONDS", "1800"))
+        # Scheduler leader election: lock retry and connection ping interval
+        self.LEADER_HEARTBEAT_SECONDS = float(os.getenv("LEADER_HEARTBEAT_SECONDS", "5"))
+        
+        # Outbound Telegram limits: ~30 msg/s per bot, ~1 msg/s sustained per chat
+        self.DISPATCH_CONCURRENCY = int(os.getenv("DISPATCH_CONCURRENCY", "20"))
+        self.TELEGRAM_GLOBAL_RATE = float(os.getenv("TELEGRAM_GLOBAL_RATE", "30"))
+        self.TELEGRAM_PER_CHAT_RATE = float(os.getenv("TELEGRAM_PER_CHAT_RATE", "1"))
+        self.TELEGRAM_PER_CHAT_BURST = float(os.getenv("TELEGRAM_PER_CHAT_BURST", "3"))
+        
+        # Downloaded job/checklist photos reused across PDF renders
+        self.PHOTO_CACHE_DIR = os.getenv("PHOTO_CACHE_DIR", "")
+        self.PHOTO_CACHE_MAX_MB = int(os.getenv("PHOTO_CACHE_MAX_MB", "200"))
+        
+        # In-process user profile cache (role, team, language) keyed by telegram_id
+        self.USER_CACHE_TTL_SECONDS = int(os.getenv("USER_CACHE_TTL_SECONDS", "300"))
+        self.USER_CACHE_MAX_ENTRIES = int(os.getenv("USER_CACHE_MAX_ENTRIES", "5000"))
+        
+        # FSM (conversation state) storage: write-behind window and idle expiry
+        self.FSM_FLUSH_DELAY_MS = int(os.getenv("FSM_FLUSH_DELAY_MS", "100"))
+        self.FSM_STATE_TTL_HOURS = int(os.getenv("FSM_STATE_TTL_HOURS", "48"))
+        
+        # Update delivery: "polling" (getUpdates) or "webhook" (Telegram pushes to WEBHOOK_BASE_URL)
+        self.BOT_MODE = os.getenv("BOT_MODE", "polling").lower()
+        self.WEBHOOK_BASE_URL = os.getenv("WEBHOOK_BASE_URL", "")
+        self.WEBHOOK_PATH = os.getenv("WEBHOOK_PATH", "/telegram/webhook")
+        self.WEBHOOK_SECRET = os.getenv("WEBHOOK_SECRET", "")
+        self.WEBHOOK_HOST = os.getenv("WEBHOOK_HOST", "0.0.0.0")
+        self.WEBHOOK_PORT = int(os.getenv("WEBHOOK_PORT", os.getenv("PORT", "8080")))
+        # Alternative Bot API server, e.g. a local one or src.bot.devtools.fake_telegram
+        self.TELEGRAM_API_URL = os.getenv("TELEGRAM_API_URL", "")
+        # Handler processes updates are sharded to by chat id; 0 handles everything in this process
+        self.WORKER_PROCESSES = int(os.getenv("WORKER_PROCESSES", "0"))
 
     def validate(self) -> bool:
         errors = []
@@ -41,6 +100,15 @@ class Config:
         if not self.ADMIN_BOOTSTRAP_CODES:
             errors.append("ADMIN_BOOTSTRAP_CODES is required (comma-separated admin codes)")
         
+        if self.BOT_MODE not in ("polling", "webhook"):
+            errors.append("BOT_MODE must be 'polling' or 'webhook'")
+        
+        if self.BOT_MODE == "webhook":
+            if not self.WEBHOOK_BASE_URL:
+                errors.append("WEBHOOK_BASE_URL is required in webhook mode")
+            if not self.WEBHOOK_SECRET:
+                errors.append("WEBHOOK_SECRET is required in webhook mode (1-256 chars: A-Z, a-z, 0-9, _ and -)")
+        
         if errors:
             for error in errors:
                 logger.error(f"Configuration error: {error}")
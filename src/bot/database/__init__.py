@@ -1,15 +1,20 @@
-from .session import engine, async_session, init_db
+from .session import (
+    engine, async_session, init_db, current_session, isolate_update_session,
+    session_scope, read_scope, transaction_scope, commit_scope, replica_engine,
+    pool_stats
+)
 from .models import (
-    Base, User, AccessCode, Team, Job, Quote, UserRole, JobStatus, JobType, 
+    Base, User, AccessCode, Team, Job, Quote, JobArchive, QuoteArchive, UserRole, JobStatus, JobType, 
     AvailabilityStatus, WeeklyAvailability, UnavailabilityNotice, BroadcastMessage, 
     MessageResponse, Region, CustomRole, RolePermission, AVAILABLE_PERMISSIONS,
-    SafetyChecklist, SafetyChecklistAudit, SafetyChecklistRequest
+    SafetyChecklist, SafetyChecklistAudit, SafetyChecklistRequest, NotificationOutbox, FsmState
 )
 
 __all__ = [
-    'engine', 'async_session', 'init_db', 'Base', 'User', 'AccessCode', 'Team', 
-    'Job', 'Quote', 'UserRole', 'JobStatus', 'JobType', 'AvailabilityStatus', 
+    'engine', 'async_session', 'init_db', 'current_session', 'isolate_update_session',
+    'session_scope', 'read_scope', 'transaction_scope', 'commit_scope', 'replica_engine', 'pool_stats', 'Base', 'User', 'AccessCode', 'Team', 
+    'Job', 'Quote', 'JobArchive', 'QuoteArchive', 'UserRole', 'JobStatus', 'JobType', 'AvailabilityStatus', 
     'WeeklyAvailability', 'UnavailabilityNotice', 'BroadcastMessage', 'MessageResponse',
     'Region', 'CustomRole', 'RolePermission', 'AVAILABLE_PERMISSIONS',
-    'SafetyChecklist', 'SafetyChecklistAudit', 'SafetyChecklistRequest'
+    'SafetyChecklist', 'SafetyChecklistAudit', 'SafetyChecklistRequest', 'NotificationOutbox', 'FsmState'
 ]
@@ -0,0 +1,117 @@
+import time
+from sqlalchemy import event, exc
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+
+class PoolStats:
+    """Counters for one engine: pool checkout latency, saturation and query time.
+
+    Fed by :func:`instrumented_pool_class` and :meth:`attach`; read with
+    :meth:`snapshot`. All counters are cumulative since start (or :meth:`reset`).
+    """
+
+    # Upper bounds (seconds) of the latency histogram buckets; the last bucket is open.
+    BUCKETS = (0.001, 0.01, 0.1, 1.0)
+
+    def __init__(self, name: str):
+        self.name = name
+        self.engine = None
+        self.reset()
+
+    def reset(self):
+        self.checkouts = 0
+        self.checkout_seconds = 0.0
+        self.checkout_max = 0.0
+        self.checkout_buckets = [0] * (len(self.BUCKETS) + 1)
+        self.timeouts = 0
+        self.in_use = 0
+        self.peak_in_use = 0
+        self.queries = 0
+        self.query_seconds = 0.0
+        self.query_max = 0.0
+
+    def _bucket(self, seconds: float) -> int:
+        for i, bound in enumerate(self.BUCKETS):
+            if seconds < bound:
+                return i
+        return len(self.BUCKETS)
+
+    def record_checkout(self, seconds: float):
+        self.checkouts += 1
+        self.checkout_seconds += seconds
+        self.checkout_max = max(self.checkout_max, seconds)
+        self.checkout_buckets[self._bucket(seconds)] += 1
+
+    def record_query(self, seconds: float):
+        self.queries += 1
+        self.query_seconds += seconds
+        self.query_max = max(self.query_max, seconds)
+
+    def attach(self, engine):
+        """Hook checkout/checkin and cursor events of an (async) engine."""
+        self.engine = engine
+        sync_engine = engine.sync_engine
+
+        @event.listens_for(sync_engine, "checkout")
+        def _on_checkout(dbapi_conn, record, proxy):
+            self.in_use += 1
+            self.peak_in_use = max(self.peak_in_use, self.in_use)
+
+        @event.listens_for(sync_engine, "checkin")
+        def _on_checkin(dbapi_conn, record):
+            self.in_use = max(self.in_use - 1, 0)
+
+        @event.listens_for(sync_engine, "before_cursor_execute")
+        def _before_execute(conn, cursor, statement, parameters, context, executemany):
+            conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+        @event.listens_for(sync_engine, "after_cursor_execute")
+        def _after_execute(conn, cursor, statement, parameters, context, executemany):
+            started = conn.info.get("query_started")
+            if started:
+                self.record_query(time.perf_counter() - started.pop())
+
+        @event.listens_for(sync_engine, "handle_error")
+        def _on_error(context):
+            started = context.connection.info.get("query_started") if context.connection else None
+            if started:
+                started.pop()
+
+    def snapshot(self) -> dict:
+        pool = self.engine.pool if self.engine else None
+        labels = [f"<{int(b * 1000)}ms" for b in self.BUCKETS] + [f">={int(self.BUCKETS[-1] * 1000)}ms"]
+        return {
+            "name": self.name,
+            "pool_size": pool.size() if pool else 0,
+            "checked_out": pool.checkedout() if pool else 0,
+            "overflow": max(pool.overflow(), 0) if pool else 0,
+            "peak_in_use": self.peak_in_use,
+            "timeouts": self.timeouts,
+            "checkouts": self.checkouts,
+            "checkout_avg_ms": self.checkout_seconds / self.checkouts * 1000 if self.checkouts else 0.0,
+            "checkout_max_ms": self.checkout_max * 1000,
+            "checkout_histogram": dict(zip(labels, self.checkout_buckets)),
+            "queries": self.queries,
+            "query_avg_ms": self.query_seconds / self.queries * 1000 if self.queries else 0.0,
+            "query_max_ms": self.query_max * 1000,
+        }
+
+
+def instrumented_pool_class(stats: PoolStats) -> type:
+    """An AsyncAdaptedQueuePool subclass that times every checkout into ``stats``.
+
+    The stats live on the class so they survive ``pool.recreate()`` (engine.dispose()).
+    """
+
+    class InstrumentedQueuePool(AsyncAdaptedQueuePool):
+        def connect(self):
+            started = time.perf_counter()
+            try:
+                return super().connect()
+            except exc.TimeoutError:
+                stats.timeouts += 1
+                raise
+            finally:
+                stats.record_checkout(time.perf_counter() - started)
+
+    return InstrumentedQueuePool
@@ -1,6 +1,6 @@
 from datetime import datetime
 from enum import Enum as PyEnum
-from sqlalchemy import Column, Integer, String, DateTime, Boolean, ForeignKey, Text, Enum, BigInteger, Float
+from sqlalchemy import Column, Integer, String, DateTime, Boolean, ForeignKey, Text, Enum, BigInteger, Float, Index, Table, text
 from sqlalchemy.orm import relationship, declarative_base
 
 Base = declarative_base()
@@ -61,13 +61,17 @@ class User(Base):
     is_active = Column(Boolean, default=True)
     availability_status = Column(Enum(AvailabilityStatus), default=AvailabilityStatus.AVAILABLE)
     language = Column(String(10), default="en", nullable=False, server_default="en")
-    created_at = Column(DateTime, default=datetime.utcnow)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)  # keyset pagination key
     
     team = relationship("Team", back_populates="users")
     access_code = relationship("AccessCode", back_populates="users", foreign_keys=[access_code_id])
     created_jobs = relationship("Job", back_populates="supervisor", foreign_keys="Job.supervisor_id")
     assigned_jobs = relationship("Job", back_populates="subcontractor", foreign_keys="Job.subcontractor_id")
     quotes = relationship("Quote", back_populates="subcontractor")
+    
+    __table_args__ = (
+        Index("ix_users_role_active_team", "role", "is_active", "team_id"),
+    )
 
 class AccessCode(Base):
     __tablename__ = "access_codes"
@@ -121,10 +125,11 @@ class Job(Base):
     reminder_sent = Column(Boolean, default=False)
     reminder_sent_at = Column(DateTime, nullable=True)
     
-    created_at = Column(DateTime, default=datetime.utcnow)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)  # keyset pagination key
     sent_at = Column(DateTime, nullable=True)
     accepted_at = Column(DateTime, nullable=True)
     started_at = Column(DateTime, nullable=True)
+    submitted_at = Column(DateTime, nullable=True)
     completed_at = Column(DateTime, nullable=True)
     cancelled_at = Column(DateTime, nullable=True)
     archived_at = Column(DateTime, nullable=True)
@@ -134,6 +139,15 @@ class Job(Base):
     subcontractor = relationship("User", back_populates="assigned_jobs", foreign_keys=[subcontractor_id])
     quotes = relationship("Quote", back_populates="job", foreign_keys="Quote.job_id")
     accepted_quote = relationship("Quote", foreign_keys=[accepted_quote_id], post_update=True)
+    
+    __table_args__ = (
+        # Scheduler reminder / auto-close scans only ever look at SENT jobs
+        Index("ix_jobs_sent_sent_at", "sent_at", postgresql_where=text("status = 'SENT'")),
+        Index("ix_jobs_subcontractor_status", "subcontractor_id", "status"),
+        Index("ix_jobs_supervisor_status", "supervisor_id", "status"),
+        # Keyset pagination of history/archive listings
+        Index("ix_jobs_created_id", "created_at", "id"),
+    )
 
 class Quote(Base):
     __tablename__ = "quotes"
@@ -150,6 +164,40 @@ class Quote(Base):
     
     job = relationship("Job", back_populates="quotes", foreign_keys=[job_id])
     subcontractor = relationship("User", back_populates="quotes")
+    
+    __table_args__ = (
+        Index("ix_quotes_job_id", "job_id"),
+        # One live quote per subcontractor and job; submit_quote's ON CONFLICT target
+        Index(
+            "uq_quotes_job_sub_active", "job_id", "subcontractor_id",
+            unique=True, postgresql_where=text("NOT is_declined")
+        ),
+    )
+
+# ============= COLD STORAGE =============
+# Archived jobs (and their quotes) are moved out of the hot tables by
+# ArchiveService.move_to_cold_storage. Same columns as the source table,
+# minus foreign keys; ids are kept so links and callbacks stay valid.
+
+def _archive_table(source: Table, name: str, *indexes: Index) -> Table:
+    columns = [
+        Column(c.name, c.type, primary_key=c.primary_key, nullable=c.nullable, autoincrement=False)
+        for c in source.columns
+    ]
+    return Table(name, Base.metadata, *columns, *indexes)
+
+class JobArchive(Base):
+    __table__ = _archive_table(
+        Job.__table__, "jobs_archive",
+        Index("ix_jobs_archive_created_id", "created_at", "id"),
+        Index("ix_jobs_archive_team_id", "team_id"),
+    )
+
+class QuoteArchive(Base):
+    __table__ = _archive_table(
+        Quote.__table__, "quotes_archive",
+        Index("ix_quotes_archive_job_id", "job_id"),
+    )
 
 class WeeklyAvailability(Base):
     __tablename__ = "weekly_availability"
@@ -167,6 +215,11 @@ class WeeklyAvailability(Base):
     created_at = Column(DateTime, default=datetime.utcnow)
     
     subcontractor = relationship("User")
+    
+    __table_args__ = (
+        # week_start first: the weekly overviews filter on the week alone
+        Index("ix_weekly_availability_week_sub", "week_start", "subcontractor_id"),
+    )
 
 class UnavailabilityNotice(Base):
     __tablename__ = "unavailability_notices"
@@ -250,6 +303,10 @@ class SafetyChecklist(Base):
     subcontractor = relationship("User", foreign_keys=[subcontractor_id])
     reviewed_by = relationship("User", foreign_keys=[reviewed_by_id])
 
+    __table_args__ = (
+        Index("ix_safety_checklists_created_at", "created_at"),
+    )
+
 
 class SafetyChecklistAudit(Base):
     __tablename__ = "safety_checklist_audits"
@@ -345,3 +402,39 @@ class RolePermission(Base):
     enabled = Column(Boolean, default=True)
     
     custom_role = relationship("CustomRole", back_populates="permissions")
+
+# ============= NOTIFICATION OUTBOX =============
+
+class NotificationOutbox(Base):
+    __tablename__ = "notification_outbox"
+    
+    id = Column(Integer, primary_key=True)
+    chat_id = Column(BigInteger, nullable=False)
+    body = Column(Text, nullable=False)
+    parse_mode = Column(String(20), nullable=True)
+    reply_markup_json = Column(Text, nullable=True)  # Serialized InlineKeyboardMarkup
+    status = Column(String(20), default="PENDING", nullable=False)  # PENDING/SENT/FAILED
+    attempts = Column(Integer, default=0, nullable=False)
+    next_attempt_at = Column(DateTime, default=datetime.utcnow, nullable=False)  # Also the claim lease
+    last_error = Column(Text, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    sent_at = Column(DateTime, nullable=True)
+    
+    __table_args__ = (
+        Index("ix_notification_outbox_pending", "next_attempt_at", postgresql_where=text("status = 'PENDING'")),
+    )
+
+# ============= FSM STATE =============
+# Conversation state for aiogram, written by services.fsm_storage.PostgresStorage
+
+class FsmState(Base):
+    __tablename__ = "fsm_states"
+    
+    key = Column(String(255), primary_key=True)  # DefaultKeyBuilder key: fsm:<bot>:<chat>:<user>:<destiny>
+    state = Column(String(255), nullable=True)
+    data_json = Column(Text, nullable=False, default="{}")  # Serialized JSON payload
+    updated_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    
+    __table_args__ = (
+        Index("ix_fsm_states_updated_at", "updated_at"),
+    )
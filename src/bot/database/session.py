@@ -1,13 +1,32 @@
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from typing import AsyncIterator
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
 from sqlalchemy.orm import sessionmaker
 from .models import Base
+from .metrics import PoolStats, instrumented_pool_class
+import logging
 import os
 import ssl
+import time
 from urllib.parse import urlparse, parse_qs, urlencode, urlunparse
 
 DATABASE_URL = os.getenv("DATABASE_URL", "")
+DATABASE_REPLICA_URL = os.getenv("DATABASE_REPLICA_URL", "")
+REPLICA_MAX_LAG_SECONDS = float(os.getenv("REPLICA_MAX_LAG_SECONDS", "10"))
 ENVIRONMENT = os.getenv("ENVIRONMENT", "development")
 
+# Pool sizing, per engine (primary and replica each get their own pool)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_STATEMENT_CACHE_SIZE = int(os.getenv("DB_STATEMENT_CACHE_SIZE", "100"))  # 0 behind PgBouncer (transaction mode)
+
+logger = logging.getLogger(__name__)
+
 def prepare_database_url(url: str) -> str:
     if not url:
         return url
@@ -29,29 +48,196 @@ def prepare_database_url(url: str) -> str:
     return urlunparse(new_parsed)
 
 def get_connect_args() -> dict:
+    connect_args = {"statement_cache_size": DB_STATEMENT_CACHE_SIZE}
     if ENVIRONMENT == "production":
         ssl_context = ssl.create_default_context()
         ssl_context.check_hostname = False
         ssl_context.verify_mode = ssl.CERT_NONE
-        return {"ssl": ssl_context}
-    return {}
+        connect_args["ssl"] = ssl_context
+    return connect_args
+
+def create_instrumented_engine(url: str, stats: PoolStats):
+    instrumented = create_async_engine(
+        url,
+        echo=False,
+        pool_pre_ping=True,
+        poolclass=instrumented_pool_class(stats),
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_timeout=DB_POOL_TIMEOUT,
+        pool_recycle=DB_POOL_RECYCLE,
+        connect_args=get_connect_args()
+    )
+    stats.attach(instrumented)
+    return instrumented
 
 ASYNC_DATABASE_URL = prepare_database_url(DATABASE_URL)
 
-engine = create_async_engine(
-    ASYNC_DATABASE_URL,
-    echo=False,
-    pool_pre_ping=True,
-    pool_size=5,
-    max_overflow=10,
-    connect_args=get_connect_args()
+# Read via /dbstats; one entry per engine
+pool_stats: dict[str, PoolStats] = {}
+
+engine = create_instrumented_engine(
+    ASYNC_DATABASE_URL, pool_stats.setdefault("primary", PoolStats("primary"))
 ) if ASYNC_DATABASE_URL else None
 
 async_session = sessionmaker(
     engine, class_=AsyncSession, expire_on_commit=False
 ) if engine else None
 
+# Optional streaming replica for heavy read-only listings (see read_scope)
+ASYNC_REPLICA_URL = prepare_database_url(DATABASE_REPLICA_URL)
+
+replica_engine = create_instrumented_engine(
+    ASYNC_REPLICA_URL, pool_stats.setdefault("replica", PoolStats("replica"))
+) if ASYNC_REPLICA_URL and engine else None
+
+replica_session = sessionmaker(
+    replica_engine, class_=AsyncSession, expire_on_commit=False
+) if replica_engine else None
+
 async def init_db():
     if engine:
         async with engine.begin() as conn:
             await conn.run_sync(Base.metadata.create_all)
+
+
+# Session opened by DbSessionMiddleware for the update being processed
+_update_session: ContextVar[AsyncSession | None] = ContextVar("update_session", default=None)
+
+
+def current_session() -> AsyncSession | None:
+    return _update_session.get()
+
+
+def bind_update_session(session: AsyncSession):
+    return _update_session.set(session)
+
+
+def unbind_update_session(token):
+    _update_session.reset(token)
+
+
+def isolate_update_session():
+    """Stop the current task from joining the update's session.
+
+    Concurrent tasks spawned while handling an update inherit its context, but
+    an ``AsyncSession`` must not be used from several tasks at once.
+    """
+    _update_session.set(None)
+
+
+@asynccontextmanager
+async def _block_transaction(session: AsyncSession) -> AsyncIterator[AsyncSession]:
+    """Make the block the whole transaction on a shared ``session``.
+
+    A block entered with a transaction already open joins it and leaves the
+    ending to whoever opened it. Otherwise the transaction the block starts is
+    committed when it exits normally - so the connection is back in the pool
+    before the caller's Telegram calls, translation or PDFs - and rolled back
+    if it raises.
+    """
+    if session.in_transaction():
+        yield session
+        return
+    try:
+        yield session
+    except BaseException:
+        if session.in_transaction():
+            await session.rollback()
+        raise
+    if session.in_transaction():
+        await session.commit()
+
+
+@asynccontextmanager
+async def session_scope(session: AsyncSession | None = None) -> AsyncIterator[AsyncSession]:
+    """Session for a read: ``session`` if given, else the update's, else a fresh one.
+
+    A shared session runs the block as one short transaction, see
+    :func:`_block_transaction`.
+    """
+    session = session or _update_session.get()
+    if session is None:
+        async with async_session() as own_session:
+            yield own_session
+        return
+    async with _block_transaction(session):
+        yield session
+
+
+_REPLICA_LAG_SQL = text("""
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() THEN 0
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+    END
+""")
+_REPLICA_RECHECK_SECONDS = 5.0   # while healthy
+_REPLICA_RETRY_SECONDS = 30.0    # after a failure or too much lag
+_replica_health = {"usable": False, "checked_at": float("-inf")}
+
+
+async def _replica_usable() -> bool:
+    """Cached replica health: reachable and at most REPLICA_MAX_LAG_SECONDS behind."""
+    now = time.monotonic()
+    interval = _REPLICA_RECHECK_SECONDS if _replica_health["usable"] else _REPLICA_RETRY_SECONDS
+    if now - _replica_health["checked_at"] < interval:
+        return _replica_health["usable"]
+
+    try:
+        async with replica_engine.connect() as conn:
+            lag = float(await conn.scalar(_REPLICA_LAG_SQL) or 0)
+        usable = lag <= REPLICA_MAX_LAG_SECONDS
+        if not usable:
+            logger.warning(f"Read replica is {lag:.1f}s behind; reading from primary")
+    except Exception as e:
+        usable = False
+        logger.warning(f"Read replica unavailable; reading from primary: {e}")
+
+    _replica_health.update(usable=usable, checked_at=time.monotonic())
+    return usable
+
+
+@asynccontextmanager
+async def read_scope(session: AsyncSession | None = None) -> AsyncIterator[AsyncSession]:
+    """Session for a heavy, read-only listing that tolerates a few seconds of lag.
+
+    Uses the replica from DATABASE_REPLICA_URL while it is reachable and within
+    REPLICA_MAX_LAG_SECONDS; otherwise (or with no replica configured, or when
+    ``session`` is given) behaves like :func:`session_scope` on the primary.
+    Never use it for reads that must see the update's own writes.
+    """
+    if session is not None or replica_session is None or not await _replica_usable():
+        async with session_scope(session) as primary_session:
+            yield primary_session
+        return
+
+    async with replica_session() as replica:
+        try:
+            yield replica
+        except (DBAPIError, OSError):
+            # Route the following reads to the primary until the next health check.
+            _replica_health.update(usable=False, checked_at=time.monotonic())
+            raise
+
+
+@asynccontextmanager
+async def transaction_scope(session: AsyncSession | None = None) -> AsyncIterator[AsyncSession]:
+    """Session for a write, finished with :func:`commit_scope`.
+
+    A fresh session behaves exactly like ``async with async_session()``; a
+    shared one (passed in, or the update's) like :func:`session_scope`. Early
+    ``return False, ...`` paths must leave nothing written: they come before
+    any write or after a conditional UPDATE that matched no row.
+    """
+    session = session or _update_session.get()
+    if session is None:
+        async with async_session() as own_session:
+            yield own_session
+        return
+    async with _block_transaction(session):
+        yield session
+
+
+async def commit_scope(session: AsyncSession):
+    await session.commit()
@@ -0,0 +1,149 @@
+"""
+Local stand-in for the Telegram Bot API, for exercising webhook mode without
+a public URL or a real bot.
+
+    python -m src.bot.devtools.fake_telegram --port 8081
+
+Then start the bot against it:
+
+    TELEGRAM_API_URL=http://localhost:8081 BOT_MODE=webhook \\
+    WEBHOOK_BASE_URL=http://localhost:8080 WEBHOOK_SECRET=dev python src/bot/main.py
+
+Bot -> Telegram: ``/bot<token>/<method>`` answers every Bot API call with a
+plausible result (a Message for send*/edit* methods, ``true`` otherwise) and
+records it. ``setWebhook`` remembers the URL and secret.
+
+Telegram -> bot: ``POST /updates`` with a full Update, or a shorthand
+``{"chat_id": 1, "text": "/start"}`` / ``{"chat_id": 1, "data": "job:1"}``,
+is delivered to the registered webhook with the secret header.
+``GET /calls`` lists the recorded Bot API calls (``?clear=1`` empties them).
+"""
+import argparse
+import itertools
+import json
+import time
+from aiohttp import ClientSession, web
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Fields the Bot API sends as JSON-serialized strings inside form data.
+_JSON_FIELDS = {"reply_markup", "allowed_updates", "entities", "caption_entities", "link_preview_options", "reply_parameters", "media"}
+
+
+class FakeTelegram:
+    def __init__(self):
+        self.webhook_url: str | None = None
+        self.secret_token: str | None = None
+        self.calls: list[dict] = []
+        self._update_ids = itertools.count(1)
+        self._message_ids = itertools.count(1)
+
+    @staticmethod
+    def _user(user_id: int, is_bot: bool = False) -> dict:
+        return {"id": user_id, "is_bot": is_bot, "first_name": "Bot" if is_bot else f"User {user_id}", "username": f"user{user_id}"}
+
+    def _message(self, chat_id: int, text: str | None = None, message_id: int | None = None) -> dict:
+        message = {
+            "message_id": message_id or next(self._message_ids),
+            "date": int(time.time()),
+            "chat": {"id": chat_id, "type": "private"},
+            "from": self._user(chat_id),
+        }
+        if text is not None:
+            message["text"] = text
+            if text.startswith("/"):
+                message["entities"] = [{"type": "bot_command", "offset": 0, "length": len(text.split()[0])}]
+        return message
+
+    def _result(self, method: str, params: dict, token: str):
+        if method == "getMe":
+            return {**self._user(int(token.split(":")[0]), is_bot=True), "can_join_groups": False}
+        if method == "setWebhook":
+            self.webhook_url = params.get("url")
+            self.secret_token = params.get("secret_token")
+            logger.info(f"Webhook set to {self.webhook_url}")
+            return True
+        if method == "deleteWebhook":
+            self.webhook_url = self.secret_token = None
+            return True
+        if method == "getWebhookInfo":
+            return {"url": self.webhook_url or "", "has_custom_certificate": False, "pending_update_count": 0}
+        if method.startswith(("send", "edit", "copyMessage", "forwardMessage")) and "chat_id" in params:
+            message = self._message(int(params["chat_id"]), params.get("text"), params.get("message_id"))
+            message["from"] = self._user(int(token.split(":")[0]), is_bot=True)
+            return message
+        return True
+
+    async def bot_api(self, request: web.Request) -> web.Response:
+        token, method = request.match_info["token"], request.match_info["method"]
+        if request.content_type == "application/json":
+            params = await request.json()
+        else:
+            params = {k: v for k, v in (await request.post()).items() if isinstance(v, str)}
+        for key in _JSON_FIELDS & params.keys():
+            if isinstance(params[key], str):
+                params[key] = json.loads(params[key])
+
+        self.calls.append({"method": method, "params": params})
+        logger.info(f"{method} {json.dumps(params, ensure_ascii=False, default=str)[:200]}")
+        return web.json_response({"ok": True, "result": self._result(method, params, token)})
+
+    def _build_update(self, body: dict) -> dict:
+        if "update_id" in body:
+            return body
+        update = {"update_id": next(self._update_ids)}
+        chat_id = int(body["chat_id"])
+        if "data" in body:
+            update["callback_query"] = {
+                "id": str(update["update_id"]),
+                "from": self._user(chat_id),
+                "chat_instance": str(chat_id),
+                "data": body["data"],
+                "message": self._message(chat_id, body.get("message_text", ""), body.get("message_id")),
+            }
+        else:
+            update["message"] = self._message(chat_id, body.get("text", ""))
+        return update
+
+    async def push_update(self, request: web.Request) -> web.Response:
+        if not self.webhook_url:
+            return web.json_response({"ok": False, "description": "No webhook registered"}, status=409)
+        update = self._build_update(await request.json())
+        headers = {"X-Telegram-Bot-Api-Secret-Token": self.secret_token} if self.secret_token else {}
+        started = time.perf_counter()
+        async with ClientSession() as session:
+            async with session.post(self.webhook_url, json=update, headers=headers) as response:
+                status = response.status
+        return web.json_response({
+            "ok": status == 200,
+            "status": status,
+            "update": update,
+            "latency_ms": round((time.perf_counter() - started) * 1000, 1),
+        })
+
+    async def list_calls(self, request: web.Request) -> web.Response:
+        calls = list(self.calls)
+        if request.query.get("clear"):
+            self.calls.clear()
+        return web.json_response(calls)
+
+    def app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_post("/bot{token}/{method}", self.bot_api)
+        app.router.add_post("/updates", self.push_update)
+        app.router.add_get("/calls", self.list_calls)
+        return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fake Telegram Bot API for local webhook testing")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8081)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    web.run_app(FakeTelegram().app(), host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
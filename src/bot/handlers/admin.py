@@ -6,17 +6,20 @@ from aiogram.types import Message, CallbackQuery, InlineKeyboardMarkup, InlineKe
 from aiogram.utils.keyboard import InlineKeyboardBuilder
 from sqlalchemy import select
 from sqlalchemy.orm import aliased
-from src.bot.database import async_session, User, Job, AccessCode
+from src.bot.database import async_session, session_scope, read_scope, pool_stats, User, Job, AccessCode
 from src.bot.database.models import UserRole, JobStatus, JobType, TeamType, Team, BroadcastMessage
 from src.bot.services.jobs import JobService
 from src.bot.services.archive import ArchiveService
 from src.bot.services.access_codes import AccessCodeService
 from src.bot.services.safety_checklist import SafetyChecklistService
-from src.bot.utils.permissions import require_role
+from src.bot.services.outbox import OutboxService
+from src.bot.utils.permissions import require_role, get_current_user
+from src.bot.utils.user_cache import UserProfileCache
 from src.bot.utils.roles import has_minimum_role, can_manage_role, creatable_roles, role_display_name
+from src.bot.utils.pagination import fetch_page, parse_page_callback, NEXT
 from src.bot.config import config
 from src.bot.utils.keyboards import (
-    get_role_selection_keyboard, get_job_list_keyboard, get_back_keyboard,
+    get_role_selection_keyboard, get_job_page_keyboard, get_back_keyboard,
     get_user_list_keyboard, get_user_actions_keyboard, get_switch_role_keyboard,
     get_confirm_delete_keyboard, get_main_menu_keyboard, get_supervisor_job_actions_keyboard,
     get_confirm_job_delete_keyboard, get_team_selection_keyboard, get_message_target_keyboard,
@@ -24,9 +27,10 @@ from src.bot.utils.keyboards import (
     get_weekly_availability_keyboard
 )
 from src.bot.database import WeeklyAvailability
+import asyncio
 import logging
 import sqlalchemy
-from src.bot.i18n import variants as tv, all_menu_variants, msg as i18n_msg, get_recipient_lang
+from src.bot.i18n import variants as tv, all_menu_variants, msg as i18n_msg, get_recipient_lang, get_recipient_langs
 
 logger = logging.getLogger(__name__)
 router = Router()
@@ -70,21 +74,17 @@ async def check_admin(message: Message) -> bool:
         await message.answer(i18n_msg("db_unavailable", lang=lang))
         return False
     
-    async with async_session() as session:
-        result = await session.execute(
-            select(User).where(User.telegram_id == message.from_user.id)
-        )
-        user = result.scalar_one_or_none()
-        lang = (getattr(user, "language", "en") or "en") if user else "en"
-        is_effective_admin = bool(
-            user and (
-                has_minimum_role(user.role, UserRole.ADMIN)
-                or (user.super_admin_code and user.super_admin_code == config.SUPER_ADMIN_CODE)
-            )
+    user = await get_current_user(message.from_user.id)
+    lang = (getattr(user, "language", "en") or "en") if user else "en"
+    is_effective_admin = bool(
+        user and (
+            has_minimum_role(user.role, UserRole.ADMIN)
+            or (user.super_admin_code and user.super_admin_code == config.SUPER_ADMIN_CODE)
         )
-        if not is_effective_admin:
-            await message.answer(i18n_msg("admin_no_permission", lang=lang))
-            return False
+    )
+    if not is_effective_admin:
+        await message.answer(i18n_msg("admin_no_permission", lang=lang))
+        return False
     return True
 
 async def check_super_admin(message: Message) -> bool:
@@ -93,49 +93,38 @@ async def check_super_admin(message: Message) -> bool:
         await message.answer(i18n_msg("db_unavailable", lang=lang))
         return False
     
-    async with async_session() as session:
-        result = await session.execute(
-            select(User).where(User.telegram_id == message.from_user.id)
+    user = await get_current_user(message.from_user.id)
+    lang = (getattr(user, "language", "en") or "en") if user else "en"
+    # A user with valid super admin identity can regain super admin capabilities
+    # even if currently switched to a lower role.
+    is_effective_super_admin = bool(
+        user and (
+            has_minimum_role(user.role, UserRole.SUPER_ADMIN)
+            or (user.super_admin_code and user.super_admin_code == config.SUPER_ADMIN_CODE)
         )
-        user = result.scalar_one_or_none()
-        lang = (getattr(user, "language", "en") or "en") if user else "en"
-        # A user with valid super admin identity can regain super admin capabilities
-        # even if currently switched to a lower role.
-        is_effective_super_admin = bool(
-            user and (
-                has_minimum_role(user.role, UserRole.SUPER_ADMIN)
-                or (user.super_admin_code and user.super_admin_code == config.SUPER_ADMIN_CODE)
-            )
-        )
-        if not is_effective_super_admin:
-            await message.answer(i18n_msg("sa_no_permission", lang=lang))
-            return False
+    )
+    if not is_effective_super_admin:
+        await message.answer(i18n_msg("sa_no_permission", lang=lang))
+        return False
     return True
 
+def _status_summary(status_counts: dict) -> str:
+    return "\n".join([f"  {status.value.replace('_', ' ').title()}: {count}" for status, count in status_counts.items()])
+
 async def show_history(message: Message):
-    async with async_session() as session:
-        result = await session.execute(
-            select(User).where(User.telegram_id == message.from_user.id)
-        )
-        user = result.scalar_one_or_none()
+    user = await get_current_user(message.from_user.id)
     
     lang = await get_recipient_lang(message.from_user.id)
-    jobs = await JobService.get_job_history(team_id=user.team_id if user else None, limit=50)
+    status_counts = await JobService.count_jobs_by_status(team_id=user.team_id if user else None)
     
-    if not jobs:
+    if not status_counts:
         await message.answer(i18n_msg("job_history_empty", lang=lang), parse_mode="Markdown")
         return
     
-    status_counts = {}
-    for job in jobs:
-        status = job.status.value
-        status_counts[status] = status_counts.get(status, 0) + 1
-    
-    summary = "\n".join([f"  {status.replace('_', ' ').title()}: {count}" for status, count in status_counts.items()])
-    
+    page_jobs, prev_cursor, next_cursor = await JobService.get_job_history_page(team_id=user.team_id if user else None)
     await message.answer(
-        i18n_msg("job_history_title", lang=lang, count=len(jobs), summary=summary),
-        reply_markup=get_job_list_keyboard(jobs, context="history"),
+        i18n_msg("job_history_title", lang=lang, count=sum(status_counts.values()), summary=_status_summary(status_counts)),
+        reply_markup=get_job_page_keyboard(page_jobs, "history", prev_cursor, next_cursor, lang=lang),
         parse_mode="Markdown"
     )
 
@@ -152,7 +141,26 @@ async def btn_archive(message: Message):
 
 async def archive_jobs(message: Message):
     lang = await get_recipient_lang(message.from_user.id)
-    count = await ArchiveService.archive_old_jobs()
+    
+    progress_msg = None
+    last_edit = 0.0
+    
+    async def report(total: int):
+        nonlocal progress_msg, last_edit
+        now = asyncio.get_running_loop().time()
+        if now - last_edit < 2:
+            return
+        last_edit = now
+        text = i18n_msg("archive_progress", lang=lang, count=total)
+        try:
+            if progress_msg:
+                await progress_msg.edit_text(text, parse_mode="Markdown")
+            else:
+                progress_msg = await message.answer(text, parse_mode="Markdown")
+        except Exception as e:
+            logger.debug(f"Archive progress update failed: {e}")
+    
+    count = await ArchiveService.archive_old_jobs(on_progress=report)
     
     if count > 0:
         await message.answer(i18n_msg("archive_complete", lang=lang, count=count), parse_mode="Markdown")
@@ -171,25 +179,51 @@ async def btn_archived(message: Message):
     await show_archived(message)
 
 async def show_archived(message: Message):
-    async with async_session() as session:
-        result = await session.execute(
-            select(User).where(User.telegram_id == message.from_user.id)
-        )
-        user = result.scalar_one_or_none()
+    user = await get_current_user(message.from_user.id)
     
     lang = await get_recipient_lang(message.from_user.id)
-    jobs = await ArchiveService.get_archived_jobs(team_id=user.team_id if user else None)
+    team_id = user.team_id if user else None
+    jobs, prev_cursor, next_cursor = await ArchiveService.get_archived_jobs_page(team_id=team_id)
     
     if not jobs:
         await message.answer(i18n_msg("archived_jobs_empty", lang=lang), parse_mode="Markdown")
         return
     
+    count = await ArchiveService.count_archived_jobs(team_id=team_id)
     await message.answer(
-        i18n_msg("archived_jobs_title", lang=lang, count=len(jobs)),
-        reply_markup=get_job_list_keyboard(jobs, context="archived"),
+        i18n_msg("archived_jobs_title", lang=lang, count=count),
+        reply_markup=get_job_page_keyboard(jobs, "archived", prev_cursor, next_cursor, lang=lang),
         parse_mode="Markdown"
     )
 
+@router.message(Command("dbstats"))
+@require_role(UserRole.SUPER_ADMIN)
+async def cmd_dbstats(message: Message):
+    """Connection pool metrics since start; `/dbstats reset` zeroes the counters."""
+    if (message.text or "").split()[1:2] == ["reset"]:
+        for stats in pool_stats.values():
+            stats.reset()
+        await message.answer("Pool counters reset.")
+        return
+    
+    if not pool_stats:
+        await message.answer("Database not configured.")
+        return
+    
+    text = "*Database pools*\n"
+    for stats in pool_stats.values():
+        s = stats.snapshot()
+        histogram = ", ".join(f"{label} {count}" for label, count in s["checkout_histogram"].items())
+        text += (
+            f"\n*{s['name']}*\n"
+            f"In use: {s['checked_out']} / {s['pool_size']} (+{s['overflow']} overflow), peak {s['peak_in_use']}\n"
+            f"Checkouts: {s['checkouts']}, avg {s['checkout_avg_ms']:.1f} ms, max {s['checkout_max_ms']:.1f} ms\n"
+            f"Checkout wait: {histogram}\n"
+            f"Timeouts: {s['timeouts']}\n"
+            f"Queries: {s['queries']}, avg {s['query_avg_ms']:.1f} ms, max {s['query_max_ms']:.1f} ms\n"
+        )
+    await message.answer(text, parse_mode="Markdown")
+
 @router.message(Command("createcode"))
 @require_role(UserRole.ADMIN)
 async def cmd_create_code(message: Message, state: FSMContext):
@@ -210,11 +244,7 @@ async def cmd_create_code(message: Message, state: FSMContext):
             await message.answer(i18n_msg("code_invalid_role", lang=lang))
             return
         
-        async with async_session() as session:
-            result = await session.execute(
-                select(User).where(User.telegram_id == message.from_user.id)
-            )
-            user = result.scalar_one_or_none()
+        user = await get_current_user(message.from_user.id)
 
         if not user:
             await message.answer(i18n_msg("user_not_found_err", lang=lang))
@@ -269,11 +299,7 @@ async def btn_create_supervisor_code(message: Message, state: FSMContext):
 @router.message(F.text.in_(tv("Create Subcontractor Code")))
 async def btn_create_subcontractor_code(message: Message, state: FSMContext):
     # Check role hierarchy for subcontractor-code creation.
-    async with async_session() as session:
-        result = await session.execute(
-            select(User).where(User.telegram_id == message.from_user.id)
-        )
-        user = result.scalar_one_or_none()
+    user = await get_current_user(message.from_user.id)
 
     if user and user.super_admin_code and user.super_admin_code == config.SUPER_ADMIN_CODE:
         effective_role = UserRole.SUPER_ADMIN
@@ -327,11 +353,7 @@ async def process_code_input(message: Message, state: FSMContext):
     
     if forced_role:
         # If role is forced (e.g. by supervisor), skip role selection step
-        async with async_session() as session:
-            result = await session.execute(
-                select(User).where(User.telegram_id == message.from_user.id)
-            )
-            user = result.scalar_one_or_none()
+        user = await get_current_user(message.from_user.id)
         
         success = await AccessCodeService.create_access_code(
             code=code,
@@ -372,12 +394,8 @@ async def process_code_input(message: Message, state: FSMContext):
         return
 
     # Get creator's role to determine which roles they can create
-    async with async_session() as session:
-        result = await session.execute(
-            select(User).where(User.telegram_id == message.from_user.id)
-        )
-        creator = result.scalar_one_or_none()
-        creator_role = creator.role.value if creator else "admin"
+    creator = await get_current_user(message.from_user.id)
+    creator_role = creator.role.value if creator else "admin"
     
     await state.update_data(code=code, creator_role=creator_role)
     await message.answer(
@@ -404,11 +422,7 @@ async def process_role_selection(callback: CallbackQuery, state: FSMContext):
         await callback.answer("Invalid role", show_alert=True)
         return
 
-    async with async_session() as session:
-        result = await session.execute(
-            select(User).where(User.telegram_id == callback.from_user.id)
-        )
-        creator = result.scalar_one_or_none()
+    creator = await get_current_user(callback.from_user.id)
 
     if not creator:
         lang = data.get("lang") or await get_recipient_lang(callback.from_user.id)
@@ -461,7 +475,7 @@ async def create_code_with_team(callback: CallbackQuery, state: FSMContext, team
     team_name = None
     
     if team_type:
-        async with async_session() as session:
+        async with session_scope() as session:
             team_type_enum = TeamType.NORTHWEST if team_type == "northwest" else TeamType.SOUTHEAST
             result = await session.execute(
                 select(Team).where(Team.team_type == team_type_enum)
@@ -474,7 +488,7 @@ async def create_code_with_team(callback: CallbackQuery, state: FSMContext, team
     await state.update_data(team_id=team_id, team_name=team_name)
     
     # Check if there are any regions available
-    async with async_session() as session:
+    async with session_scope() as session:
         region_result = await session.execute(
             select(Region).where(Region.is_active == True).order_by(Region.name)
         )
@@ -522,27 +536,16 @@ async def finalize_code_creation(callback: CallbackQuery, state: FSMContext, reg
     region_name = None
     creator_user_id = None
     if region_id:
-        async with async_session() as session:
+        async with session_scope() as session:
             result = await session.execute(
                 select(Region).where(Region.id == region_id)
             )
             region = result.scalar_one_or_none()
             if region:
                 region_name = region.name
-            creator_result = await session.execute(
-                select(User).where(User.telegram_id == callback.from_user.id)
-            )
-            creator = creator_result.scalar_one_or_none()
-            if creator:
-                creator_user_id = creator.id
-    else:
-        async with async_session() as session:
-            creator_result = await session.execute(
-                select(User).where(User.telegram_id == callback.from_user.id)
-            )
-            creator = creator_result.scalar_one_or_none()
-            if creator:
-                creator_user_id = creator.id
+    creator = await get_current_user(callback.from_user.id)
+    if creator:
+        creator_user_id = creator.id
     
     success = await AccessCodeService.create_access_code(
         code=code,
@@ -582,35 +585,33 @@ async def cancel_code_creation(callback: CallbackQuery, state: FSMContext):
 
 @router.callback_query(F.data.startswith("page:history:"))
 async def handle_history_pagination(callback: CallbackQuery):
-    page = int(callback.data.split(":")[2])
+    direction, cursor = parse_page_callback(callback.data, "page:history")
     
-    async with async_session() as session:
-        result = await session.execute(
-            select(User).where(User.telegram_id == callback.from_user.id)
-        )
-        user = result.scalar_one_or_none()
+    user = await get_current_user(callback.from_user.id)
+    lang = await get_recipient_lang(callback.from_user.id)
     
-    jobs = await JobService.get_job_history(team_id=user.team_id if user else None, limit=50)
+    jobs, prev_cursor, next_cursor = await JobService.get_job_history_page(
+        team_id=user.team_id if user else None, cursor=cursor, direction=direction
+    )
     
     await callback.message.edit_reply_markup(
-        reply_markup=get_job_list_keyboard(jobs, page=page, context="history")
+        reply_markup=get_job_page_keyboard(jobs, "history", prev_cursor, next_cursor, lang=lang)
     )
     await callback.answer()
 
 @router.callback_query(F.data.startswith("page:archived:"))
 async def handle_archived_pagination(callback: CallbackQuery):
-    page = int(callback.data.split(":")[2])
+    direction, cursor = parse_page_callback(callback.data, "page:archived")
     
-    async with async_session() as session:
-        result = await session.execute(
-            select(User).where(User.telegram_id == callback.from_user.id)
-        )
-        user = result.scalar_one_or_none()
+    user = await get_current_user(callback.from_user.id)
+    lang = await get_recipient_lang(callback.from_user.id)
     
-    jobs = await ArchiveService.get_archived_jobs(team_id=user.team_id if user else None)
+    jobs, prev_cursor, next_cursor = await ArchiveService.get_archived_jobs_page(
+        team_id=user.team_id if user else None, cursor=cursor, direction=direction
+    )
     
     await callback.message.edit_reply_markup(
-        reply_markup=get_job_list_keyboard(jobs, page=page, context="archived")
+        reply_markup=get_job_page_keyboard(jobs, "archived", prev_cursor, next_cursor, lang=lang)
     )
     await callback.answer()
 
@@ -629,9 +630,7 @@ async def show_job_details(callback: CallbackQuery, job_id: int, context: str):
         await callback.answer("Database error", show_alert=True)
         return
     
-    async with async_session() as session:
-        result = await session.execute(select(Job).where(Job.id == job_id))
-        job = result.scalar_one_or_none()
+    job = await ArchiveService.get_job(job_id)
     
     if not job:
         await callback.answer("Job not found", show_alert=True)
@@ -695,16 +694,13 @@ async def handle_admin_delete_job(callback: CallbackQuery):
 async def handle_confirm_job_delete(callback: CallbackQuery):
     job_id = int(callback.data.split(":")[1])
     
-    async with async_session() as session:
-        # Check admin or super admin
-        admin_result = await session.execute(
-            select(User).where(User.telegram_id == callback.from_user.id)
-        )
-        admin = admin_result.scalar_one_or_none()
-        if not admin or admin.role not in [UserRole.ADMIN, UserRole.SUPER_ADMIN]:
-            await callback.answer("Not authorized", show_alert=True)
-            return
+    # Check admin or super admin
+    admin = await get_current_user(callback.from_user.id)
+    if not admin or admin.role not in [UserRole.ADMIN, UserRole.SUPER_ADMIN]:
+        await callback.answer("Not authorized", show_alert=True)
+        return
 
+    async with session_scope() as session:
         # Delete quotes first to maintain integrity
         from src.bot.database import Quote
         await session.execute(
@@ -715,6 +711,8 @@ async def handle_confirm_job_delete(callback: CallbackQuery):
         await session.execute(
             sqlalchemy.delete(Job).where(Job.id == job_id)
         )
+        # Or its cold-storage copy, if it was already moved there
+        await ArchiveService.delete_cold_job(job_id, session=session)
         await session.commit()
 
     lang = await get_recipient_lang(callback.from_user.id)
@@ -726,43 +724,31 @@ async def handle_confirm_job_delete(callback: CallbackQuery):
 
 @router.callback_query(F.data == "back:history")
 async def back_to_history(callback: CallbackQuery):
-    async with async_session() as session:
-        result = await session.execute(
-            select(User).where(User.telegram_id == callback.from_user.id)
-        )
-        user = result.scalar_one_or_none()
+    user = await get_current_user(callback.from_user.id)
     
     lang = await get_recipient_lang(callback.from_user.id)
-    jobs = await JobService.get_job_history(team_id=user.team_id if user else None, limit=50)
-    
-    status_counts = {}
-    for job in jobs:
-        status = job.status.value
-        status_counts[status] = status_counts.get(status, 0) + 1
-    
-    summary = "\n".join([f"  {status.replace('_', ' ').title()}: {count}" for status, count in status_counts.items()])
+    status_counts = await JobService.count_jobs_by_status(team_id=user.team_id if user else None)
     
+    page_jobs, prev_cursor, next_cursor = await JobService.get_job_history_page(team_id=user.team_id if user else None)
     await callback.message.edit_text(
-        i18n_msg("job_history_title", lang=lang, count=len(jobs), summary=summary),
-        reply_markup=get_job_list_keyboard(jobs, context="history"),
+        i18n_msg("job_history_title", lang=lang, count=sum(status_counts.values()), summary=_status_summary(status_counts)),
+        reply_markup=get_job_page_keyboard(page_jobs, "history", prev_cursor, next_cursor, lang=lang),
         parse_mode="Markdown"
     )
     await callback.answer()
 
 @router.callback_query(F.data == "back:archived")
 async def back_to_archived(callback: CallbackQuery):
-    async with async_session() as session:
-        result = await session.execute(
-            select(User).where(User.telegram_id == callback.from_user.id)
-        )
-        user = result.scalar_one_or_none()
+    user = await get_current_user(callback.from_user.id)
     
     lang = await get_recipient_lang(callback.from_user.id)
-    jobs = await ArchiveService.get_archived_jobs(team_id=user.team_id if user else None)
+    team_id = user.team_id if user else None
+    jobs, prev_cursor, next_cursor = await ArchiveService.get_archived_jobs_page(team_id=team_id)
+    count = await ArchiveService.count_archived_jobs(team_id=team_id)
     
     await callback.message.edit_text(
-        i18n_msg("archived_jobs_title", lang=lang, count=len(jobs)),
-        reply_markup=get_job_list_keyboard(jobs, context="archived"),
+        i18n_msg("archived_jobs_title", lang=lang, count=count),
+        reply_markup=get_job_page_keyboard(jobs, "archived", prev_cursor, next_cursor, lang=lang),
         parse_mode="Markdown"
     )
     await callback.answer()
@@ -813,27 +799,23 @@ async def show_all_access_codes(message: Message):
 async def show_manage_access_codes(message: Message, telegram_user_id: int, edit: bool = False):
     creator_alias = aliased(User)
 
-    async with async_session() as session:
-        actor_result = await session.execute(
-            select(User).where(User.telegram_id == telegram_user_id)
-        )
-        actor = actor_result.scalar_one_or_none()
-
-        if not actor:
-            if edit:
-                await message.edit_text("User record not found.")
-            else:
-                await message.answer("User record not found.")
-            return
+    actor = await get_current_user(telegram_user_id)
+    if not actor:
+        if edit:
+            await message.edit_text("User record not found.")
+        else:
+            await message.answer("User record not found.")
+        return
 
-        role = get_effective_role(actor)
-        if role not in [UserRole.SUPER_ADMIN, UserRole.ADMIN, UserRole.SUPERVISOR]:
-            if edit:
-                await message.edit_text("You don't have permission to manage access codes.")
-            else:
-                await message.answer("You don't have permission to manage access codes.")
-            return
+    role = get_effective_role(actor)
+    if role not in [UserRole.SUPER_ADMIN, UserRole.ADMIN, UserRole.SUPERVISOR]:
+        if edit:
+            await message.edit_text("You don't have permission to manage access codes.")
+        else:
+            await message.answer("You don't have permission to manage access codes.")
+        return
 
+    async with session_scope() as session:
         result = await session.execute(
             select(AccessCode, creator_alias)
             .outerjoin(creator_alias, AccessCode.created_by_id == creator_alias.id)
@@ -890,36 +872,32 @@ async def delete_access_code(callback: CallbackQuery):
     code_id = int(callback.data.split(":")[1])
     creator_alias = aliased(User)
 
-    async with async_session() as session:
-        actor_result = await session.execute(
-            select(User).where(User.telegram_id == callback.from_user.id)
-        )
-        actor = actor_result.scalar_one_or_none()
-        if not actor:
-            await callback.answer("User not found.", show_alert=True)
-            return
+    actor = await get_current_user(callback.from_user.id)
+    if not actor:
+        await callback.answer("User not found.", show_alert=True)
+        return
 
+    async with session_scope() as session:
         code_result = await session.execute(
             select(AccessCode, creator_alias)
             .outerjoin(creator_alias, AccessCode.created_by_id == creator_alias.id)
             .where(AccessCode.id == code_id)
         )
         row = code_result.one_or_none()
+        error = None
         if not row:
-            await callback.answer("Code not found.", show_alert=True)
-            return
-
-        code, creator = row
-        if not code.is_active:
-            await callback.answer("Code already deleted.", show_alert=True)
-            return
-
-        if not can_delete_access_code(actor, code, creator):
-            await callback.answer("You cannot delete this code.", show_alert=True)
-            return
+            error = "Code not found."
+        elif not row[0].is_active:
+            error = "Code already deleted."
+        elif not can_delete_access_code(actor, *row):
+            error = "You cannot delete this code."
+        else:
+            row[0].is_active = False
+            await session.commit()
 
-        code.is_active = False
-        await session.commit()
+    if error:
+        await callback.answer(error, show_alert=True)
+        return
 
     await callback.answer("Access code deleted.")
     await show_manage_access_codes(callback.message, telegram_user_id=callback.from_user.id, edit=True)
@@ -935,11 +913,7 @@ async def btn_view_by_teams(message: Message, state: FSMContext):
     await state.clear()
     
     # Check if admin or super admin
-    async with async_session() as session:
-        result = await session.execute(
-            select(User).where(User.telegram_id == message.from_user.id)
-        )
-        user = result.scalar_one_or_none()
+    user = await get_current_user(message.from_user.id)
     
     if not user or user.role not in [UserRole.SUPER_ADMIN, UserRole.ADMIN]:
         await message.answer("Only admins can view team members.")
@@ -952,7 +926,7 @@ async def btn_view_by_teams(message: Message, state: FSMContext):
 async def show_team_hierarchy(message: Message, user_team_id: int = None, is_super_admin: bool = False):
     from src.bot.database.models import Team, TeamType
     
-    async with async_session() as session:
+    async with read_scope() as session:
         # Get teams based on access level
         if is_super_admin or user_team_id is None:
             # Super admin sees all teams
@@ -1067,34 +1041,32 @@ async def btn_all_users_v2(message: Message, state: FSMContext):
     await show_user_list(message, is_super_admin=True)
 
 async def show_users_by_role(message: Message, role: UserRole, role_name: str):
-    async with async_session() as session:
-        result = await session.execute(
-            select(User).where(User.is_active == True, User.role == role).order_by(User.first_name)
-        )
-        users = list(result.scalars().all())
+    total = await _count_active_users(scope=role.value)
     
     lang = await get_recipient_lang(message.from_user.id)
-    if not users:
+    if not total:
         await message.answer(
             i18n_msg("users_by_role_none", lang=lang, role_name=role_name, role_name_lower=role_name.lower()),
             parse_mode="Markdown"
         )
         return
     
+    page_users, prev_cursor, next_cursor = await _active_users_page(scope=role.value)
+    keyboard = get_user_list_keyboard(page_users, role.value, prev_cursor, next_cursor, lang=lang)
     if role == UserRole.SUBCONTRACTOR:
-        text = i18n_msg("users_by_role_title", lang=lang, role_name=role_name, count=len(users)) + "\n"
-        for u in users:
+        text = i18n_msg("users_by_role_title", lang=lang, role_name=role_name, count=total) + "\n"
+        for u in page_users:
             name = u.first_name or "Unknown"
             text += f" {name}\n"
         await message.answer(
             text,
-            reply_markup=get_user_list_keyboard(users, is_super_admin=True),
+            reply_markup=keyboard,
             parse_mode="Markdown"
         )
     else:
         await message.answer(
-            i18n_msg("users_by_role_title", lang=lang, role_name=role_name, count=len(users)),
-            reply_markup=get_user_list_keyboard(users, is_super_admin=True),
+            i18n_msg("users_by_role_title", lang=lang, role_name=role_name, count=total),
+            reply_markup=keyboard,
             parse_mode="Markdown"
         )
 
@@ -1102,11 +1074,7 @@ async def show_users_by_role(message: Message, role: UserRole, role_name: str):
 async def btn_switch_role_super_admin(message: Message, state: FSMContext):
     await state.clear()
     
-    async with async_session() as session:
-        result = await session.execute(
-            select(User).where(User.telegram_id == message.from_user.id)
-        )
-        user = result.scalar_one_or_none()
+    user = await get_current_user(message.from_user.id)
     
     if not user:
         lang = "en"
@@ -1145,16 +1113,12 @@ async def btn_switch_role_super_admin(message: Message, state: FSMContext):
 async def handle_super_admin_switch(callback: CallbackQuery):
     role_str = callback.data.split(":")[1]
     
-    async with async_session() as session:
-        result = await session.execute(
-            select(User).where(User.telegram_id == callback.from_user.id)
-        )
-        user = result.scalar_one_or_none()
-        
-        if not user:
-            await callback.answer("User not found", show_alert=True)
-            return
-        
+    user = await get_current_user(callback.from_user.id)
+    if not user:
+        await callback.answer("User not found", show_alert=True)
+        return
+
+    async with session_scope() as session:
         from src.bot.config import config
         
         lang = await get_recipient_lang(callback.from_user.id)
@@ -1163,6 +1127,7 @@ async def handle_super_admin_switch(callback: CallbackQuery):
             if user.super_admin_code and user.super_admin_code == config.SUPER_ADMIN_CODE:
                 user.role = UserRole.SUPER_ADMIN
                 await session.commit()
+                UserProfileCache.invalidate(user.telegram_id)
                 
                 await callback.message.edit_text(
                     i18n_msg("welcome_back_gm", lang=lang),
@@ -1211,6 +1176,7 @@ async def handle_super_admin_switch(callback: CallbackQuery):
             
             user.role = new_role
             await session.commit()
+            UserProfileCache.invalidate(user.telegram_id)
             
             await callback.message.edit_text(
                 i18n_msg("role_changed_msg", lang=lang, role=role_str.title()),
@@ -1233,16 +1199,12 @@ async def back_to_super_admin_menu(callback: CallbackQuery):
 async def handle_switch_team_selection(callback: CallbackQuery):
     team_type_str = callback.data.split(":")[1]
     
-    async with async_session() as session:
-        result = await session.execute(
-            select(User).where(User.telegram_id == callback.from_user.id)
-        )
-        user = result.scalar_one_or_none()
-        
-        if not user:
-            await callback.answer("User not found", show_alert=True)
-            return
-        
+    user = await get_current_user(callback.from_user.id)
+    if not user:
+        await callback.answer("User not found", show_alert=True)
+        return
+
+    async with session_scope() as session:
         # Get the team
         team_type = TeamType.NORTHWEST if team_type_str == "northwest" else TeamType.SOUTHEAST
         team_result = await session.execute(
@@ -1250,14 +1212,16 @@ async def handle_switch_team_selection(callback: CallbackQuery):
         )
         team = team_result.scalar_one_or_none()
         
-        if not team:
-            await callback.answer("Team not found", show_alert=True)
-            return
-        
+    if not team:
+        await callback.answer("Team not found", show_alert=True)
+        return
+
+    async with session_scope() as session:
         # Update user role and team
         user.role = UserRole.SUBCONTRACTOR
         user.team_id = team.id
         await session.commit()
+        UserProfileCache.invalidate(user.telegram_id)
         
         lang = await get_recipient_lang(callback.from_user.id)
         await callback.message.edit_text(
@@ -1277,22 +1241,19 @@ async def handle_switch_team_selection(callback: CallbackQuery):
 async def btn_return_to_super_admin(message: Message, state: FSMContext):
     await state.clear()
     
-    async with async_session() as session:
-        result = await session.execute(
-            select(User).where(User.telegram_id == message.from_user.id)
-        )
-        user = result.scalar_one_or_none()
-        
-        if not user:
-            await message.answer("User not found.")
-            return
-        
+    user = await get_current_user(message.from_user.id)
+    if not user:
+        await message.answer("User not found.")
+        return
+
+    async with session_scope() as session:
         from src.bot.config import config
         
         lang = await get_recipient_lang(message.from_user.id)
         if user.super_admin_code and user.super_admin_code == config.SUPER_ADMIN_CODE:
             user.role = UserRole.SUPER_ADMIN
             await session.commit()
+            UserProfileCache.invalidate(user.telegram_id)
             
             keyboard = get_main_menu_keyboard(UserRole.SUPER_ADMIN)
             await message.answer(
@@ -1303,17 +1264,23 @@ async def btn_return_to_super_admin(message: Message, state: FSMContext):
         else:
             await message.answer(i18n_msg("return_gm_failed", lang=lang))
 
+async def _active_users_page(scope: str = "all", cursor: str | None = None, direction: str = NEXT) -> tuple[list, str | None, str | None]:
+    """One keyset page of active users; ``scope`` is a role value or "all"."""
+    async with session_scope() as session:
+        query = select(User).where(User.is_active == True)
+        if scope != "all":
+            query = query.where(User.role == UserRole(scope))
+        return await fetch_page(session, query, User, cursor, direction)
+
+async def _count_active_users(scope: str = "all") -> int:
+    async with session_scope() as session:
+        query = select(sqlalchemy.func.count(User.id)).where(User.is_active == True)
+        if scope != "all":
+            query = query.where(User.role == UserRole(scope))
+        return await session.scalar(query) or 0
+
 async def show_user_list(message: Message, is_super_admin: bool = False):
-    async with async_session() as session:
-        admin_result = await session.execute(
-            select(User).where(User.telegram_id == message.from_user.id)
-        )
-        admin = admin_result.scalar_one_or_none()
-        
-        result = await session.execute(
-            select(User).where(User.is_active == True).order_by(User.role, User.first_name)
-        )
-        users = list(result.scalars().all())
+    users, prev_cursor, next_cursor = await _active_users_page()
     
     lang = await get_recipient_lang(message.from_user.id)
     if not users:
@@ -1322,8 +1289,8 @@ async def show_user_list(message: Message, is_super_admin: bool = False):
     
     title_key = "manage_users_sa_title" if is_super_admin else "manage_users_admin_title"
     await message.answer(
-        i18n_msg(title_key, lang=lang, count=len(users)),
-        reply_markup=get_user_list_keyboard(users, is_super_admin=is_super_admin),
+        i18n_msg(title_key, lang=lang, count=await _count_active_users()),
+        reply_markup=get_user_list_keyboard(users, "all", prev_cursor, next_cursor, lang=lang),
         parse_mode="Markdown"
     )
 
@@ -1331,23 +1298,20 @@ async def show_user_list(message: Message, is_super_admin: bool = False):
 async def handle_manage_user(callback: CallbackQuery):
     user_id = int(callback.data.split(":")[1])
     
-    async with async_session() as session:
-        admin_result = await session.execute(
-            select(User).where(User.telegram_id == callback.from_user.id)
-        )
-        admin = admin_result.scalar_one_or_none()
-        
-        if not admin or admin.role not in [UserRole.ADMIN, UserRole.SUPER_ADMIN]:
-            await callback.answer("Not authorized", show_alert=True)
-            return
-        
+    admin = await get_current_user(callback.from_user.id)
+    if not admin or admin.role not in [UserRole.ADMIN, UserRole.SUPER_ADMIN]:
+        await callback.answer("Not authorized", show_alert=True)
+        return
+    
+    async with session_scope() as session:
         result = await session.execute(select(User).where(User.id == user_id))
         user = result.scalar_one_or_none()
         
-        if not user:
-            await callback.answer("User not found", show_alert=True)
-            return
-        
+    if not user:
+        await callback.answer("User not found", show_alert=True)
+        return
+
+    async with session_scope() as session:
         # Extract all needed data within the session
         is_self = user.telegram_id == callback.from_user.id
         role_text = role_display_name(user.role)
@@ -1393,16 +1357,12 @@ async def handle_delete_user_request(callback: CallbackQuery):
     user_id = int(parts[1])
     delete_type = parts[2]
     
-    async with async_session() as session:
-        admin_result = await session.execute(
-            select(User).where(User.telegram_id == callback.from_user.id)
-        )
-        admin = admin_result.scalar_one_or_none()
-        
-        if not admin or admin.role not in [UserRole.ADMIN, UserRole.SUPER_ADMIN]:
-            await callback.answer("Not authorized", show_alert=True)
-            return
-        
+    admin = await get_current_user(callback.from_user.id)
+    if not admin or admin.role not in [UserRole.ADMIN, UserRole.SUPER_ADMIN]:
+        await callback.answer("Not authorized", show_alert=True)
+        return
+    
+    async with session_scope() as session:
         result = await session.execute(select(User).where(User.id == user_id))
         user = result.scalar_one_or_none()
     
@@ -1436,23 +1396,20 @@ async def handle_confirm_delete(callback: CallbackQuery):
     user_id = int(parts[1])
     delete_type = parts[2]
     
-    async with async_session() as session:
-        admin_result = await session.execute(
-            select(User).where(User.telegram_id == callback.from_user.id)
-        )
-        admin = admin_result.scalar_one_or_none()
-        
-        if not admin or admin.role not in [UserRole.ADMIN, UserRole.SUPER_ADMIN]:
-            await callback.answer("Not authorized", show_alert=True)
-            return
-        
+    admin = await get_current_user(callback.from_user.id)
+    if not admin or admin.role not in [UserRole.ADMIN, UserRole.SUPER_ADMIN]:
+        await callback.answer("Not authorized", show_alert=True)
+        return
+    
+    async with session_scope() as session:
         result = await session.execute(select(User).where(User.id == user_id))
         user = result.scalar_one_or_none()
         
-        if not user:
-            await callback.answer("User not found", show_alert=True)
-            return
-        
+    if not user:
+        await callback.answer("User not found", show_alert=True)
+        return
+
+    async with session_scope() as session:
         name = user.first_name or user.username or f"User {user.telegram_id}"
         is_self = user.telegram_id == callback.from_user.id
         
@@ -1467,6 +1424,7 @@ async def handle_confirm_delete(callback: CallbackQuery):
         
         user.is_active = False
         await session.commit()
+        UserProfileCache.invalidate(user.telegram_id)
     
     lang = await get_recipient_lang(callback.from_user.id)
     if is_self:
@@ -1481,16 +1439,12 @@ async def handle_confirm_delete(callback: CallbackQuery):
 
 @router.callback_query(F.data == "back:users")
 async def back_to_users(callback: CallbackQuery):
-    async with async_session() as session:
-        result = await session.execute(
-            select(User).where(User.is_active == True).order_by(User.role, User.first_name)
-        )
-        users = list(result.scalars().all())
+    users, prev_cursor, next_cursor = await _active_users_page()
     
     lang = await get_recipient_lang(callback.from_user.id)
     await callback.message.edit_text(
-        i18n_msg("back_to_users_title", lang=lang, count=len(users)),
-        reply_markup=get_user_list_keyboard(users),
+        i18n_msg("back_to_users_title", lang=lang, count=await _count_active_users()),
+        reply_markup=get_user_list_keyboard(users, "all", prev_cursor, next_cursor, lang=lang),
         parse_mode="Markdown"
     )
     await callback.answer()
@@ -1498,7 +1452,7 @@ async def back_to_users(callback: CallbackQuery):
 
 @router.callback_query(F.data == "back_to_regions")
 async def back_to_regions(callback: CallbackQuery):
-    async with async_session() as session:
+    async with session_scope() as session:
         result = await session.execute(
             select(Region).where(Region.is_active == True).order_by(Region.name)
         )
@@ -1521,7 +1475,7 @@ async def back_to_regions(callback: CallbackQuery):
 
 @router.callback_query(F.data == "back_to_teams")
 async def back_to_teams(callback: CallbackQuery):
-    async with async_session() as session:
+    async with session_scope() as session:
         result = await session.execute(select(Team).order_by(Team.name))
         teams = list(result.scalars().all())
 
@@ -1546,16 +1500,15 @@ async def back_to_admin_menu(callback: CallbackQuery):
 
 @router.callback_query(F.data.startswith("page:users:"))
 async def handle_users_pagination(callback: CallbackQuery):
-    page = int(callback.data.split(":")[2])
+    parts = callback.data.split(":", 3)
+    scope = parts[2] if len(parts) > 3 and (parts[2] == "all" or parts[2] in {r.value for r in UserRole}) else "all"
+    direction, cursor = parse_page_callback(callback.data, f"page:users:{scope}")
     
-    async with async_session() as session:
-        result = await session.execute(
-            select(User).where(User.is_active == True).order_by(User.role, User.first_name)
-        )
-        users = list(result.scalars().all())
+    users, prev_cursor, next_cursor = await _active_users_page(scope, cursor, direction)
     
+    lang = await get_recipient_lang(callback.from_user.id)
     await callback.message.edit_reply_markup(
-        reply_markup=get_user_list_keyboard(users, page=page)
+        reply_markup=get_user_list_keyboard(users, scope, prev_cursor, next_cursor, lang=lang)
     )
     await callback.answer()
 
@@ -1588,16 +1541,12 @@ async def handle_switch_role(callback: CallbackQuery):
         await callback.answer("Invalid role", show_alert=True)
         return
     
-    async with async_session() as session:
-        result = await session.execute(
-            select(User).where(User.telegram_id == callback.from_user.id)
-        )
-        user = result.scalar_one_or_none()
-        
-        if not user or user.role != UserRole.ADMIN:
-            await callback.answer("Not authorized", show_alert=True)
-            return
-        
+    user = await get_current_user(callback.from_user.id)
+    if not user or user.role != UserRole.ADMIN:
+        await callback.answer("Not authorized", show_alert=True)
+        return
+
+    async with session_scope() as session:
         if user.access_code_id:
             from src.bot.database import AccessCode
             code_result = await session.execute(
@@ -1610,6 +1559,7 @@ async def handle_switch_role(callback: CallbackQuery):
         user.role = new_role
         user.access_code_id = None
         await session.commit()
+        UserProfileCache.invalidate(user.telegram_id)
     
     keyboard = get_main_menu_keyboard(new_role)
     
@@ -1637,15 +1587,11 @@ async def btn_admin_new_job(message: Message, state: FSMContext):
         await message.answer(i18n_msg("db_unavailable", lang=lang))
         return
     
-    async with async_session() as session:
-        result = await session.execute(
-            select(User).where(User.telegram_id == message.from_user.id)
-        )
-        user = result.scalar_one_or_none()
-        if not user or user.role not in [UserRole.ADMIN, UserRole.SUPERVISOR]:
-            lang = (getattr(user, "language", "en") or "en") if user else "en"
-            await message.answer(i18n_msg("no_permission_create_job", lang=lang))
-            return
+    user = await get_current_user(message.from_user.id)
+    if not user or user.role not in [UserRole.ADMIN, UserRole.SUPERVISOR]:
+        lang = (getattr(user, "language", "en") or "en") if user else "en"
+        await message.answer(i18n_msg("no_permission_create_job", lang=lang))
+        return
     
     # Import and use supervisor's job creation flow
     from src.bot.handlers.supervisor import start_new_job
@@ -1656,15 +1602,11 @@ async def btn_admin_new_job(message: Message, state: FSMContext):
 @router.message(F.text.in_(tv("Send Message")))
 async def btn_send_message(message: Message, state: FSMContext):
     """Start the messaging flow for admins and supervisors"""
-    async with async_session() as session:
-        result = await session.execute(
-            select(User).where(User.telegram_id == message.from_user.id)
-        )
-        user = result.scalar_one_or_none()
-        if not user or user.role not in [UserRole.ADMIN, UserRole.SUPER_ADMIN, UserRole.SUPERVISOR]:
-            lang = (getattr(user, "language", "en") or "en") if user else "en"
-            await message.answer(i18n_msg("no_permission_send_msg", lang=lang))
-            return
+    user = await get_current_user(message.from_user.id)
+    if not user or user.role not in [UserRole.ADMIN, UserRole.SUPER_ADMIN, UserRole.SUPERVISOR]:
+        lang = (getattr(user, "language", "en") or "en") if user else "en"
+        await message.answer(i18n_msg("no_permission_send_msg", lang=lang))
+        return
     
     lang = await get_recipient_lang(message.from_user.id)
     await message.answer(
@@ -1687,18 +1629,14 @@ async def process_message_target(callback: CallbackQuery, state: FSMContext):
     lang = await get_recipient_lang(callback.from_user.id)
 
     if target == "all_users":
-        async with async_session() as session:
-            result = await session.execute(
-                select(User).where(User.telegram_id == callback.from_user.id)
-            )
-            sender = result.scalar_one_or_none()
+        sender = await get_current_user(callback.from_user.id)
         if not sender or sender.role != UserRole.SUPER_ADMIN:
             await callback.answer(i18n_msg("only_sa_message_all", lang=lang), show_alert=True)
             return
     
     if target == "select":
         # Show list of subcontractors to select
-        async with async_session() as session:
+        async with session_scope() as session:
             result = await session.execute(
                 select(User).where(User.role == UserRole.SUBCONTRACTOR)
             )
@@ -1741,7 +1679,7 @@ async def toggle_user_selection(callback: CallbackQuery, state: FSMContext):
     await state.update_data(selected_ids=selected_ids)
     
     # Refresh the keyboard
-    async with async_session() as session:
+    async with session_scope() as session:
         result = await session.execute(
             select(User).where(User.role == UserRole.SUBCONTRACTOR)
         )
@@ -1781,19 +1719,15 @@ async def send_broadcast_message(message: Message, state: FSMContext):
     target_type = data.get('target_type')
     selected_ids = data.get('selected_ids', [])
     
-    bot = message.bot
     sent_count = 0
     
     from src.bot.utils.keyboards import get_message_reaction_keyboard
     
-    async with async_session() as session:
-        # Get sender info
-        sender_result = await session.execute(
-            select(User).where(User.telegram_id == message.from_user.id)
-        )
-        sender = sender_result.scalar_one_or_none()
-        sender_name = sender.first_name or sender.username or "Admin" if sender else "Admin"
-        
+    # Get sender info
+    sender = await get_current_user(message.from_user.id)
+    sender_name = sender.first_name or sender.username or "Admin" if sender else "Admin"
+    
+    async with session_scope() as session:
         # Determine recipients
         if target_type == "select":
             result = await session.execute(
@@ -1834,7 +1768,20 @@ async def send_broadcast_message(message: Message, state: FSMContext):
                 team_id = team.id if team else None
             except:
                 team_id = None
-        
+    
+    # Translate before the write transaction starts: the broadcast and its
+    # outbox rows are committed together, without holding a connection while
+    # the translations run.
+    from src.bot.utils.translate import translate_text
+    _body_cache: dict[str, str] = {}
+    langs = await get_recipient_langs(r.telegram_id for r in recipients)
+    for r_lang in set(langs.values()):
+        try:
+            _body_cache[r_lang] = await translate_text(message.text, target_lang=r_lang)
+        except Exception as e:
+            logger.error(f"Failed to translate broadcast to {r_lang}: {e}")
+    
+    async with session_scope() as session:
         # Save the broadcast message to database
         broadcast = BroadcastMessage(
             sender_id=sender.id if sender else None,
@@ -1846,20 +1793,17 @@ async def send_broadcast_message(message: Message, state: FSMContext):
         session.add(broadcast)
         await session.flush()  # Get the broadcast ID
         
-        from src.bot.utils.translate import translate_text
-        _body_cache: dict[str, str] = {}
         for recipient in recipients:
             try:
-                r_lang = await get_recipient_lang(recipient.telegram_id)
-                if r_lang not in _body_cache:
-                    _body_cache[r_lang] = await translate_text(message.text, target_lang=r_lang)
+                r_lang = langs[recipient.telegram_id]
                 header = i18n_msg("broadcast_header", lang=r_lang, sender=sender_name)
                 body = _body_cache[r_lang]
-                await bot.send_message(
+                await OutboxService.enqueue(
                     recipient.telegram_id,
                     header + body,
                     reply_markup=get_message_reaction_keyboard(broadcast.id, lang=r_lang),
-                    parse_mode="Markdown"
+                    parse_mode="Markdown",
+                    session=session
                 )
                 sent_count += 1
             except Exception as e:
@@ -1882,17 +1826,14 @@ async def btn_request_availability(message: Message, state: FSMContext):
         await message.answer(i18n_msg("db_unavailable", lang=lang))
         return
 
-    async with async_session() as session:
-        result = await session.execute(
-            select(User).where(User.telegram_id == message.from_user.id)
-        )
-        user = result.scalar_one_or_none()
+    user = await get_current_user(message.from_user.id)
 
-        if not user or user.role != UserRole.ADMIN:
-            lang = (getattr(user, "language", "en") or "en") if user else "en"
-            await message.answer(i18n_msg("only_managers_request_avail", lang=lang))
-            return
+    if not user or user.role != UserRole.ADMIN:
+        lang = (getattr(user, "language", "en") or "en") if user else "en"
+        await message.answer(i18n_msg("only_managers_request_avail", lang=lang))
+        return
 
+    async with session_scope() as session:
         subs_result = await session.execute(
             select(User).where(User.role == UserRole.SUBCONTRACTOR, User.is_active == True)
         )
@@ -1930,7 +1871,7 @@ async def toggle_availability_request_selection(callback: CallbackQuery, state:
 
     await state.update_data(selected_ids=selected_ids)
 
-    async with async_session() as session:
+    async with session_scope() as session:
         result = await session.execute(
             select(User).where(User.role == UserRole.SUBCONTRACTOR, User.is_active == True)
         )
@@ -1967,7 +1908,6 @@ async def send_availability_request(callback: CallbackQuery, state: FSMContext):
 
     from datetime import datetime, timedelta
 
-    bot = callback.bot
     sent_count = 0
     failed_count = 0
 
@@ -1975,16 +1915,13 @@ async def send_availability_request(callback: CallbackQuery, state: FSMContext):
     days_since_monday = today.weekday()
     current_monday = datetime.combine(today - timedelta(days=days_since_monday), datetime.min.time())
 
-    async with async_session() as session:
-        requester_result = await session.execute(
-            select(User).where(User.telegram_id == callback.from_user.id)
-        )
-        requester = requester_result.scalar_one_or_none()
-        if not requester or requester.role != UserRole.ADMIN:
-            lang = await get_recipient_lang(callback.from_user.id)
-            await callback.answer(i18n_msg("only_managers_request_avail", lang=lang), show_alert=True)
-            return
+    requester = await get_current_user(callback.from_user.id)
+    if not requester or requester.role != UserRole.ADMIN:
+        lang = await get_recipient_lang(callback.from_user.id)
+        await callback.answer(i18n_msg("only_managers_request_avail", lang=lang), show_alert=True)
+        return
 
+    async with session_scope() as session:
         result = await session.execute(
             select(User).where(
                 User.id.in_(selected_ids),
@@ -2035,11 +1972,12 @@ async def send_availability_request(callback: CallbackQuery, state: FSMContext):
                     mon=mon_date, tue=tue_date, wed=wed_date,
                     thu=thu_date, fri=fri_date
                 )
-                await bot.send_message(
+                await OutboxService.enqueue(
                     sub.telegram_id,
                     avail_text,
                     reply_markup=get_weekly_availability_keyboard(availability.id, selected_days),
                     parse_mode="Markdown",
+                    session=session,
                 )
                 sent_count += 1
             except Exception as e:
@@ -2066,11 +2004,7 @@ async def btn_weekly_availability(message: Message):
         await message.answer(i18n_msg("db_unavailable", lang=lang))
         return
 
-    async with async_session() as session:
-        result = await session.execute(
-            select(User).where(User.telegram_id == message.from_user.id)
-        )
-        user = result.scalar_one_or_none()
+    user = await get_current_user(message.from_user.id)
 
     lang = await get_recipient_lang(message.from_user.id)
     if not user or user.role != UserRole.ADMIN:
@@ -2084,7 +2018,7 @@ async def btn_weekly_availability(message: Message):
     days_since_monday = today.weekday()
     current_monday = datetime.combine(today - timedelta(days=days_since_monday), datetime.min.time())
     
-    async with async_session() as session:
+    async with read_scope() as session:
         # Get all availability records for this week
         result = await session.execute(
             select(WeeklyAvailability, User).join(
@@ -2156,7 +2090,7 @@ from src.bot.database.models import Region, CustomRole, RolePermission, AVAILABL
 @router.message(F.text.in_(tv("Manage Roles")))
 @require_role(UserRole.SUPER_ADMIN)
 async def show_manage_roles(message: Message):
-    async with async_session() as session:
+    async with session_scope() as session:
         result = await session.execute(
             select(CustomRole).where(CustomRole.is_active == True).order_by(CustomRole.name)
         )
@@ -2278,12 +2212,9 @@ async def save_custom_role(callback: CallbackQuery, state: FSMContext):
     base_role = UserRole(data.get("base_role"))
     selected_permissions = data.get("selected_permissions", [])
     
-    async with async_session() as session:
-        user_result = await session.execute(
-            select(User).where(User.telegram_id == callback.from_user.id)
-        )
-        user = user_result.scalar_one_or_none()
-        
+    user = await get_current_user(callback.from_user.id)
+    
+    async with session_scope() as session:
         custom_role = CustomRole(
             name=role_name,
             description=role_description,
@@ -2318,16 +2249,17 @@ async def save_custom_role(callback: CallbackQuery, state: FSMContext):
 async def view_custom_role(callback: CallbackQuery):
     role_id = int(callback.data.split(":")[1])
     
-    async with async_session() as session:
+    async with session_scope() as session:
         result = await session.execute(
             select(CustomRole).where(CustomRole.id == role_id)
         )
         role = result.scalar_one_or_none()
         
-        if not role:
-            await callback.answer("Role not found.")
-            return
-        
+    if not role:
+        await callback.answer("Role not found.")
+        return
+
+    async with session_scope() as session:
         perm_result = await session.execute(
             select(RolePermission).where(
                 RolePermission.custom_role_id == role_id,
@@ -2362,7 +2294,7 @@ async def view_custom_role(callback: CallbackQuery):
 async def delete_custom_role(callback: CallbackQuery):
     role_id = int(callback.data.split(":")[1])
     
-    async with async_session() as session:
+    async with session_scope() as session:
         result = await session.execute(
             select(CustomRole).where(CustomRole.id == role_id)
         )
@@ -2386,7 +2318,7 @@ async def cancel_role_create(callback: CallbackQuery, state: FSMContext):
 @router.message(F.text.in_(tv("Manage Regions")))
 @require_role(UserRole.SUPER_ADMIN, UserRole.ADMIN)
 async def show_manage_regions(message: Message):
-    async with async_session() as session:
+    async with session_scope() as session:
         result = await session.execute(
             select(Region).where(Region.is_active == True).order_by(Region.name)
         )
@@ -2412,21 +2344,22 @@ async def show_manage_regions(message: Message):
 @router.message(F.text.in_(tv("View Regions")))
 @require_role(UserRole.SUPER_ADMIN, UserRole.ADMIN)
 async def view_regions_list(message: Message):
-    async with async_session() as session:
+    async with session_scope() as session:
         result = await session.execute(
             select(Region).where(Region.is_active == True).order_by(Region.name)
         )
         regions = list(result.scalars().all())
         
-        if not regions:
-            await message.answer(
-                "* Regions*\n\n"
-                "No regions created yet.\n"
-                "Use *Manage Regions* to create regions.",
-                parse_mode="Markdown"
-            )
-            return
-        
+    if not regions:
+        await message.answer(
+            "* Regions*\n\n"
+            "No regions created yet.\n"
+            "Use *Manage Regions* to create regions.",
+            parse_mode="Markdown"
+        )
+        return
+
+    async with session_scope() as session:
         text = "* All Regions*\n\n"
         for region in regions:
             user_count = await session.execute(
@@ -2436,8 +2369,8 @@ async def view_regions_list(message: Message):
             text += f" *{region.name}* - {count} user(s)\n"
             if region.description:
                 text += f"  _{region.description}_\n"
-        
-        await message.answer(text, parse_mode="Markdown")
+    
+    await message.answer(text, parse_mode="Markdown")
 
 @router.callback_query(F.data == "create_region")
 async def start_create_region(callback: CallbackQuery, state: FSMContext):
@@ -2464,12 +2397,9 @@ async def process_region_description(message: Message, state: FSMContext):
     region_name = data.get("region_name")
     description = None if message.text == "/skip" else message.text.strip()
     
-    async with async_session() as session:
-        user_result = await session.execute(
-            select(User).where(User.telegram_id == message.from_user.id)
-        )
-        user = user_result.scalar_one_or_none()
-        
+    user = await get_current_user(message.from_user.id)
+    
+    async with session_scope() as session:
         region = Region(
             name=region_name,
             description=description,
@@ -2491,16 +2421,17 @@ async def process_region_description(message: Message, state: FSMContext):
 async def view_region(callback: CallbackQuery):
     region_id = int(callback.data.split(":")[1])
     
-    async with async_session() as session:
+    async with session_scope() as session:
         result = await session.execute(
             select(Region).where(Region.id == region_id)
         )
         region = result.scalar_one_or_none()
         
-        if not region:
-            await callback.answer("Region not found.")
-            return
-        
+    if not region:
+        await callback.answer("Region not found.")
+        return
+
+    async with session_scope() as session:
         user_result = await session.execute(
             select(User).where(User.region_id == region_id, User.is_active == True)
         )
@@ -2532,7 +2463,7 @@ async def view_region(callback: CallbackQuery):
 async def delete_region(callback: CallbackQuery):
     region_id = int(callback.data.split(":")[1])
     
-    async with async_session() as session:
+    async with session_scope() as session:
         result = await session.execute(
             select(Region).where(Region.id == region_id)
         )
@@ -2550,7 +2481,7 @@ async def delete_region(callback: CallbackQuery):
 @router.message(F.text.in_(tv("Manage Teams")))
 @require_role(UserRole.SUPER_ADMIN, UserRole.ADMIN)
 async def show_manage_teams(message: Message):
-    async with async_session() as session:
+    async with session_scope() as session:
         result = await session.execute(
             select(Team).order_by(Team.name)
         )
@@ -2587,14 +2518,16 @@ async def start_create_team(callback: CallbackQuery, state: FSMContext):
 async def process_team_name(message: Message, state: FSMContext):
     team_name = message.text.strip()
     
-    async with async_session() as session:
+    async with session_scope() as session:
         existing = await session.execute(
             select(Team).where(Team.name == team_name)
         )
-        if existing.scalar_one_or_none():
-            await message.answer("A team with this name already exists. Please choose a different name.")
-            return
-        
+        name_taken = existing.scalar_one_or_none() is not None
+    if name_taken:
+        await message.answer("A team with this name already exists. Please choose a different name.")
+        return
+
+    async with session_scope() as session:
         team = Team(name=team_name)
         session.add(team)
         await session.commit()
@@ -2611,16 +2544,17 @@ async def process_team_name(message: Message, state: FSMContext):
 async def view_team_details(callback: CallbackQuery):
     team_id = int(callback.data.split(":")[1])
     
-    async with async_session() as session:
+    async with session_scope() as session:
         result = await session.execute(
             select(Team).where(Team.id == team_id)
         )
         team = result.scalar_one_or_none()
         
-        if not team:
-            await callback.answer("Team not found.")
-            return
-        
+    if not team:
+        await callback.answer("Team not found.")
+        return
+
+    async with session_scope() as session:
         user_result = await session.execute(
             select(User).where(User.team_id == team_id, User.is_active == True)
         )
@@ -2651,7 +2585,7 @@ async def view_team_details(callback: CallbackQuery):
 async def delete_team(callback: CallbackQuery):
     team_id = int(callback.data.split(":")[1])
     
-    async with async_session() as session:
+    async with session_scope() as session:
         result = await session.execute(
             select(Team).where(Team.id == team_id)
         )
@@ -1,9 +1,10 @@
 from aiogram import Router, F
 from aiogram.types import Message, CallbackQuery, InlineKeyboardMarkup, InlineKeyboardButton
-from sqlalchemy import select
-from src.bot.database import async_session, User
+from src.bot.database import async_session, session_scope
 from src.bot.i18n import LANGUAGES, variants, msg
 from src.bot.utils.keyboards import get_main_menu_keyboard, get_language_selection_keyboard
+from src.bot.utils.permissions import get_current_user
+from src.bot.utils.user_cache import UserProfileCache
 import logging
 
 logger = logging.getLogger(__name__)
@@ -16,11 +17,7 @@ async def btn_language(message: Message):
         await message.answer("Database not available.")
         return
 
-    async with async_session() as session:
-        result = await session.execute(
-            select(User).where(User.telegram_id == message.from_user.id)
-        )
-        user = result.scalar_one_or_none()
+    user = await get_current_user(message.from_user.id)
 
     if not user:
         await message.answer("Please register first with /start")
@@ -47,19 +44,16 @@ async def set_language_callback(callback: CallbackQuery):
         await callback.answer("Database error", show_alert=True)
         return
 
-    async with async_session() as session:
-        result = await session.execute(
-            select(User).where(User.telegram_id == callback.from_user.id)
-        )
-        user = result.scalar_one_or_none()
-
-        if not user:
-            await callback.answer("User not found", show_alert=True)
-            return
+    user = await get_current_user(callback.from_user.id)
+    if not user:
+        await callback.answer("User not found", show_alert=True)
+        return
 
+    async with session_scope() as session:
         user.language = lang_code
         await session.commit()
         role = user.role
+    UserProfileCache.invalidate(callback.from_user.id)
 
     lang_set_key = f"language_set_{lang_code}"
     confirm = msg(lang_set_key, lang_code)
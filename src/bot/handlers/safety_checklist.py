@@ -9,10 +9,13 @@ from aiogram.fsm.state import State, StatesGroup
 from aiogram.types import Message, CallbackQuery, InlineKeyboardMarkup, InlineKeyboardButton, BufferedInputFile
 from sqlalchemy import select
 
-from src.bot.database import async_session, User, SafetyChecklist
+from src.bot.database import session_scope, User, SafetyChecklist
 from src.bot.database.models import UserRole
-from src.bot.i18n import variants as tv, msg as i18n_msg, get_recipient_lang
+from src.bot.i18n import variants as tv, msg as i18n_msg, get_recipient_lang, get_recipient_langs
 from src.bot.services.safety_checklist import SafetyChecklistService, SafetyChecklistPdfService
+from src.bot.services.document_registry import DocumentRegistry
+from src.bot.services.outbox import OutboxService
+from src.bot.utils.permissions import get_user
 from src.bot.utils.timezone import now_au_naive, format_au
 
 
@@ -145,9 +148,7 @@ def _review_actions_keyboard(checklist_id: int) -> InlineKeyboardMarkup:
 
 
 async def _get_current_user(telegram_id: int) -> User | None:
-    async with async_session() as session:
-        result = await session.execute(select(User).where(User.telegram_id == telegram_id, User.is_active == True))
-        return result.scalar_one_or_none()
+    return await get_user(telegram_id)
 
 
 async def _prompt_safety_state(message: Message, state: FSMContext, target_state: State, user: User | None = None):
@@ -469,13 +470,12 @@ async def process_selected_job(callback: CallbackQuery, state: FSMContext):
         return
 
     job_id = int(value)
-    async with async_session() as session:
-        result = await session.execute(select(User).where(User.telegram_id == callback.from_user.id, User.is_active == True))
-        user = result.scalar_one_or_none()
-        if not user:
-            await callback.answer("User not found", show_alert=True)
-            return
+    user = await _get_current_user(callback.from_user.id)
+    if not user:
+        await callback.answer("User not found", show_alert=True)
+        return
 
+    async with session_scope() as session:
         from src.bot.database import Job
         job_result = await session.execute(select(Job).where(Job.id == job_id, Job.subcontractor_id == user.id))
         job = job_result.scalar_one_or_none()
@@ -875,7 +875,7 @@ async def process_post_task_3(callback: CallbackQuery, state: FSMContext):
         )
 
         # Persist generated filename
-        async with async_session() as session:
+        async with session_scope() as session:
             db_result = await session.execute(select(SafetyChecklist).where(SafetyChecklist.id == checklist.id))
             db_checklist = db_result.scalar_one_or_none()
             if db_checklist:
@@ -890,8 +890,10 @@ async def process_post_task_3(callback: CallbackQuery, state: FSMContext):
         f"Checklist submitted successfully.\nChecklist ID: {checklist.id}\nStatus: PENDING"
     )
     if pdf_name and pdf_content:
-        await callback.message.answer_document(
-            BufferedInputFile(pdf_content, filename=pdf_name),
+        await DocumentRegistry.answer_document(
+            callback.message,
+            pdf_content,
+            pdf_name,
             caption=f"Checklist report #{checklist.id}",
         )
     else:
@@ -904,9 +906,10 @@ async def process_post_task_3(callback: CallbackQuery, state: FSMContext):
         selected_supervisor_id=selected_supervisor_id,
     )
     sender_name = user.first_name or user.username or f"User {user.id}"
+    langs = await get_recipient_langs(r.telegram_id for r in recipients)
     for recipient in recipients:
         try:
-            r_lang = await get_recipient_lang(recipient.telegram_id)
+            r_lang = langs[recipient.telegram_id]
             safe_str = "YES" if checklist.final_is_safe else "NO"
             await callback.bot.send_message(
                 recipient.telegram_id,
@@ -919,9 +922,11 @@ async def process_post_task_3(callback: CallbackQuery, state: FSMContext):
                 ),
             )
             if pdf_name and pdf_content:
-                await callback.bot.send_document(
+                await DocumentRegistry.send_document(
+                    callback.bot,
                     recipient.telegram_id,
-                    BufferedInputFile(pdf_content, filename=pdf_name),
+                    pdf_content,
+                    pdf_name,
                     caption=f"Safety checklist #{checklist.id}",
                 )
         except Exception:
@@ -937,7 +942,7 @@ async def btn_my_submissions(message: Message):
         await message.answer("Only subcontractors can access this section.")
         return
 
-    async with async_session() as session:
+    async with session_scope() as session:
         result = await session.execute(
             select(SafetyChecklist).where(SafetyChecklist.subcontractor_id == user.id).order_by(SafetyChecklist.created_at.desc()).limit(10)
         )
@@ -1023,8 +1028,10 @@ async def download_checklist_pdf(callback: CallbackQuery):
             bot=callback.bot,
             company_logo_path=os.path.join(os.getcwd(), "attached_assets", "company_logo.png"),
         )
-        await callback.message.answer_document(
-            BufferedInputFile(pdf_content, filename=pdf_name),
+        await DocumentRegistry.answer_document(
+            callback.message,
+            pdf_content,
+            pdf_name,
             caption=f"Safety checklist #{checklist.id}",
         )
         await callback.answer("PDF sent")
@@ -1138,7 +1145,7 @@ async def process_request_subcontractor(callback: CallbackQuery, state: FSMConte
         await callback.answer("Invalid subcontractor selection", show_alert=True)
         return
 
-    async with async_session() as session:
+    async with session_scope() as session:
         result = await session.execute(
             select(User).where(User.id == sub_id, User.role == UserRole.SUBCONTRACTOR, User.is_active == True)
         )
@@ -1211,7 +1218,7 @@ async def process_request_note(message: Message, state: FSMContext):
         return
 
     # Notify subcontractor
-    async with async_session() as session:
+    async with session_scope() as session:
         result = await session.execute(select(User).where(User.id == sub_id))
         sub = result.scalar_one_or_none()
 
@@ -1222,7 +1229,7 @@ async def process_request_note(message: Message, state: FSMContext):
             sub_lang = await get_recipient_lang(sub.telegram_id)
             raw_note = note or "No note provided."
             translated_note = await translate_text(raw_note, target_lang=sub_lang)
-            await message.bot.send_message(
+            await OutboxService.enqueue(
                 sub.telegram_id,
                 i18n_msg(
                     "safety_checklist_request", lang=sub_lang,
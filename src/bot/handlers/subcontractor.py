@@ -5,21 +5,22 @@ from aiogram.fsm.state import State, StatesGroup
 from aiogram.types import Message, CallbackQuery
 from aiogram.exceptions import TelegramBadRequest
 from sqlalchemy import select
-from src.bot.database import async_session, User, Job
+from src.bot.database import async_session, session_scope, User, Job
 from src.bot.database.models import UserRole, JobType, JobStatus, AvailabilityStatus
 from src.bot.services.jobs import JobService
 from src.bot.services.quotes import QuoteService
 from src.bot.services.availability import AvailabilityService
 from src.bot.services.pdf_generator import JobPdfService
-from src.bot.i18n import variants as tv, msg as i18n_msg, get_recipient_lang
-from src.bot.utils.permissions import require_role
+from src.bot.services.document_registry import DocumentRegistry
+from src.bot.services.outbox import OutboxService
+from src.bot.i18n import variants as tv, msg as i18n_msg, get_recipient_lang, get_recipient_langs
+from src.bot.utils.permissions import require_role, get_current_user
 from src.bot.utils.keyboards import (
     get_job_actions_keyboard, get_decline_reason_keyboard, get_back_keyboard,
     get_job_list_keyboard, get_unavailability_job_keyboard, get_weekly_availability_keyboard
 )
 from src.bot.database import UnavailabilityNotice, WeeklyAvailability
 from datetime import datetime
-from aiogram.types import BufferedInputFile
 import logging
 
 logger = logging.getLogger(__name__)
@@ -103,17 +104,12 @@ async def btn_my_availability(message: Message):
     
     from datetime import datetime, timedelta
     
-    async with async_session() as session:
-        # Get current user
-        user_result = await session.execute(
-            select(User).where(User.telegram_id == message.from_user.id)
-        )
-        user = user_result.scalar_one_or_none()
-        
-        if not user:
-            await message.answer("User not found.")
-            return
-        
+    user = await get_current_user(message.from_user.id)
+    if not user:
+        await message.answer("User not found.")
+        return
+    
+    async with session_scope() as session:
         # Calculate current week start (Monday)
         today = datetime.utcnow().date()
         days_since_monday = today.weekday()
@@ -186,14 +182,10 @@ async def check_subcontractor(message: Message) -> bool:
         await message.answer("Database not available.")
         return False
     
-    async with async_session() as session:
-        result = await session.execute(
-            select(User).where(User.telegram_id == message.from_user.id)
-        )
-        user = result.scalar_one_or_none()
-        if not user or user.role != UserRole.SUBCONTRACTOR:
-            await message.answer("You don't have permission for this action.")
-            return False
+    user = await get_current_user(message.from_user.id)
+    if not user or user.role != UserRole.SUBCONTRACTOR:
+        await message.answer("You don't have permission for this action.")
+        return False
     return True
 
 async def show_available_jobs(message: Message):
@@ -314,13 +306,9 @@ async def process_company_name_for_accept(message: Message, state: FSMContext):
     success, msg, supervisor_tg_id = await JobService.accept_job(job_id, message.from_user.id, company_name)
     
     if success:
-        async with async_session() as session:
-            result = await session.execute(
-                select(User).where(User.telegram_id == message.from_user.id)
-            )
-            user_obj = result.scalar_one_or_none()
-            sub_name = user_obj.first_name or user_obj.username or "A subcontractor"
-            sub_lang = getattr(user_obj, "language", "en") or "en"
+        user_obj = await get_current_user(message.from_user.id)
+        sub_name = user_obj.first_name or user_obj.username or "A subcontractor"
+        sub_lang = getattr(user_obj, "language", "en") or "en"
 
         await message.answer(
             i18n_msg("job_accepted_confirm", lang=sub_lang, job_id=job_id, title=job_title, company=company_name),
@@ -333,7 +321,7 @@ async def process_company_name_for_accept(message: Message, state: FSMContext):
             if bot:
                 try:
                     sup_lang = await get_recipient_lang(supervisor_tg_id)
-                    await bot.send_message(
+                    await OutboxService.enqueue(
                         supervisor_tg_id,
                         i18n_msg(
                             "job_accepted_by_sub", lang=sup_lang,
@@ -361,11 +349,7 @@ async def mark_job_done_callback(callback: CallbackQuery):
         await callback.answer("Job not found", show_alert=True)
         return
     
-    async with async_session() as session:
-        result = await session.execute(
-            select(User).where(User.telegram_id == callback.from_user.id)
-        )
-        user = result.scalar_one_or_none()
+    user = await get_current_user(callback.from_user.id)
     
     if not job:
         await callback.answer("Job not found", show_alert=True)
@@ -387,24 +371,21 @@ async def mark_job_done_callback(callback: CallbackQuery):
         await callback.answer("✅")
         
         # Notify Supervisor
-        async with async_session() as session:
+        async with session_scope() as session:
             sup_result = await session.execute(
                 select(User.telegram_id).where(User.id == job.supervisor_id)
             )
             supervisor_tg_id = sup_result.scalar()
-            
-            sub_result = await session.execute(
-                select(User).where(User.telegram_id == callback.from_user.id)
-            )
-            sub = sub_result.scalar_one_or_none()
-            sub_name = sub.first_name or sub.username or "A subcontractor"
+        
+        sub = await get_current_user(callback.from_user.id)
+        sub_name = sub.first_name or sub.username or "A subcontractor"
 
         if supervisor_tg_id:
             bot = callback.bot
             if bot:
                 try:
                     sup_lang = await get_recipient_lang(supervisor_tg_id)
-                    await bot.send_message(
+                    await OutboxService.enqueue(
                         supervisor_tg_id,
                         i18n_msg(
                             "job_marked_done_by_sub", lang=sup_lang,
@@ -521,16 +502,12 @@ async def finish_photo_submission(message: Message, state: FSMContext):
             if not bot:
                 logger.error("Bot instance is None, cannot notify supervisor")
             else:
-                async with async_session() as session:
-                    result = await session.execute(
-                        select(User).where(User.telegram_id == message.from_user.id)
-                    )
-                    sub = result.scalar_one_or_none()
-                    sub_name = sub.first_name or sub.username or "A subcontractor" if sub else "A subcontractor"
-                    company_name = ""
-                    job_obj = await JobService.get_job_by_id(job_id)
-                    if job_obj and job_obj.company_name:
-                        company_name = f"\nCompany: {job_obj.company_name}"
+                sub = await get_current_user(message.from_user.id)
+                sub_name = sub.first_name or sub.username or "A subcontractor" if sub else "A subcontractor"
+                company_name = ""
+                job_obj = await JobService.get_job_by_id(job_id)
+                if job_obj and job_obj.company_name:
+                    company_name = f"\nCompany: {job_obj.company_name}"
                 
                 try:
                     from src.bot.utils.translate import translate_text
@@ -559,16 +536,18 @@ async def finish_photo_submission(message: Message, state: FSMContext):
 
                     if job:
                         try:
-                            pdf_filename, pdf_content = await JobPdfService.build_job_completion_pdf(
+                            pdf_filename, pdf_content = await JobPdfService.get_job_completion_pdf(
                                 job=job,
                                 subcontractor_name=sub_name,
                                 notes=notes,
                                 photo_count=len(photos),
                                 bot=bot,
                             )
-                            await bot.send_document(
+                            await DocumentRegistry.send_document(
+                                bot,
                                 supervisor_tg_id,
-                                BufferedInputFile(pdf_content, filename=pdf_filename),
+                                pdf_content,
+                                pdf_filename,
                                 caption=f"Completion report PDF for Job #{job_id}"
                             )
                         except Exception as pdf_error:
@@ -665,43 +644,40 @@ async def process_quote_notes(message: Message, state: FSMContext):
         # Notify the supervisor who created the job
         job = await JobService.get_job_by_id(job_id)
         if job and job.supervisor_id:
-            async with async_session() as session:
+            async with session_scope() as session:
                 # Get supervisor's telegram_id
                 sup_result = await session.execute(
                     select(User).where(User.id == job.supervisor_id)
                 )
                 supervisor = sup_result.scalar_one_or_none()
-                
-                # Get subcontractor's name
-                sub_result = await session.execute(
-                    select(User).where(User.telegram_id == message.from_user.id)
-                )
-                subcontractor = sub_result.scalar_one_or_none()
-                sub_name = subcontractor.first_name or subcontractor.username or "A subcontractor" if subcontractor else "A subcontractor"
-                
-                if supervisor and supervisor.telegram_id:
-                    bot = message.bot
-                    if bot:
-                        try:
-                            from src.bot.utils.translate import translate_text
-                            sup_lang = await get_recipient_lang(supervisor.telegram_id)
-                            if notes:
-                                translated_quote_notes = await translate_text(notes, target_lang=sup_lang)
-                                notes_text = f"\nNotes: {translated_quote_notes}"
-                            else:
-                                notes_text = ""
-                            await bot.send_message(
-                                supervisor.telegram_id,
-                                i18n_msg(
-                                    "new_quote_received", lang=sup_lang,
-                                    job_id=job_id, title=job.title,
-                                    sub_name=sub_name, amount=amount,
-                                    notes=notes_text
-                                ),
-                                parse_mode="Markdown"
-                            )
-                        except Exception as e:
-                            logger.error(f"Failed to notify supervisor {supervisor.telegram_id} of quote: {e}")
+            
+            # Get subcontractor's name
+            subcontractor = await get_current_user(message.from_user.id)
+            sub_name = subcontractor.first_name or subcontractor.username or "A subcontractor" if subcontractor else "A subcontractor"
+            
+            if supervisor and supervisor.telegram_id:
+                bot = message.bot
+                if bot:
+                    try:
+                        from src.bot.utils.translate import translate_text
+                        sup_lang = await get_recipient_lang(supervisor.telegram_id)
+                        if notes:
+                            translated_quote_notes = await translate_text(notes, target_lang=sup_lang)
+                            notes_text = f"\nNotes: {translated_quote_notes}"
+                        else:
+                            notes_text = ""
+                        await OutboxService.enqueue(
+                            supervisor.telegram_id,
+                            i18n_msg(
+                                "new_quote_received", lang=sup_lang,
+                                job_id=job_id, title=job.title,
+                                sub_name=sub_name, amount=amount,
+                                notes=notes_text
+                            ),
+                            parse_mode="Markdown"
+                        )
+                    except Exception as e:
+                        logger.error(f"Failed to notify supervisor {supervisor.telegram_id} of quote: {e}")
     else:
         await message.answer(f"Error: {msg}")
     
@@ -744,7 +720,7 @@ async def process_completion_photo(message: Message, state: FSMContext):
     job_id = data.get('completing_job_id')
     photo = message.photo[-1]
     
-    async with async_session() as session:
+    async with session_scope() as session:
         result = await session.execute(select(Job).where(Job.id == job_id))
         job = result.scalar_one_or_none()
         if job:
@@ -952,15 +928,34 @@ async def process_unavailability_dates(message: Message, state: FSMContext):
     bot = message.bot
     notified_supervisors = []
     
-    async with async_session() as session:
-        # Get subcontractor info
-        sub_result = await session.execute(
-            select(User).where(User.telegram_id == message.from_user.id)
-        )
-        sub = sub_result.scalar_one_or_none()
-        sub_name = sub.first_name or sub.username or "A subcontractor" if sub else "A subcontractor"
-        
-        # Save the notice first to get the ID
+    sub = await get_current_user(message.from_user.id)
+    sub_name = sub.first_name or sub.username or "A subcontractor" if sub else "A subcontractor"
+    
+    from src.bot.utils.keyboards import get_unavailability_response_keyboard
+    from src.bot.utils.translate import translate_text
+    
+    # Build dates text once
+    dates_text = ""
+    if start_date and end_date:
+        dates_text = f"\nDates: {start_date.strftime('%d/%m/%Y')} - {end_date.strftime('%d/%m/%Y')}"
+    elif start_date:
+        dates_text = f"\nDate: {start_date.strftime('%d/%m/%Y')}"
+    
+    job = await JobService.get_job(job_id) if job_id else None
+    if job_id:
+        # Specific job unavailability - notify job's supervisor
+        supervisor_ids = {job.supervisor_id} if job else set()
+    else:
+        # General unavailability - notify all supervisors the sub has active jobs with
+        active_jobs = await JobService.get_subcontractor_active_jobs(message.from_user.id)
+        supervisor_ids = {
+            job.supervisor_id for job in active_jobs
+            if job.status in [JobStatus.ACCEPTED, JobStatus.IN_PROGRESS]
+        }
+    
+    # The notice is committed before anyone is notified (the buttons carry its
+    # id), and no transaction stays open across the translation calls below.
+    async with session_scope() as session:
         notice = UnavailabilityNotice(
             subcontractor_id=sub.id if sub else None,
             job_id=job_id,
@@ -970,121 +965,81 @@ async def process_unavailability_dates(message: Message, state: FSMContext):
             notified_supervisor_ids=""
         )
         session.add(notice)
-        await session.flush()  # Get the notice ID
         
-        from src.bot.utils.keyboards import get_unavailability_response_keyboard
-        
-        # Build dates text once
-        dates_text = ""
-        if start_date and end_date:
-            dates_text = f"\nDates: {start_date.strftime('%d/%m/%Y')} - {end_date.strftime('%d/%m/%Y')}"
-        elif start_date:
-            dates_text = f"\nDate: {start_date.strftime('%d/%m/%Y')}"
-        
-        notified_users = []
-        
-        if job_id:
-            # Specific job unavailability - notify job's supervisor
-            job = await JobService.get_job(job_id)
-            if job:
-                sup_result = await session.execute(
-                    select(User).where(User.id == job.supervisor_id)
-                )
-                supervisor = sup_result.scalar_one_or_none()
-                
-                if supervisor and bot:
-                    try:
-                        from src.bot.utils.translate import translate_text
-                        sup_lang = await get_recipient_lang(supervisor.telegram_id)
-                        t_reason = await translate_text(reason, target_lang=sup_lang)
-                        await bot.send_message(
-                            supervisor.telegram_id,
-                            i18n_msg(
-                                "unavailability_job_specific", lang=sup_lang,
-                                sub_name=sub_name, job_id=job.id,
-                                title=job.title, reason=t_reason, dates=dates_text
-                            ),
-                            reply_markup=get_unavailability_response_keyboard(notice.id, sub.id, lang=sup_lang),
-                            parse_mode="Markdown"
-                        )
-                        notified_users.append(supervisor.id)
-                    except Exception as e:
-                        logger.error(f"Failed to notify supervisor: {e}")
-        else:
-            # General unavailability - notify all supervisors the sub has active jobs with
-            active_jobs = await JobService.get_subcontractor_active_jobs(message.from_user.id)
-            supervisor_ids = set()
-            for job in active_jobs:
-                if job.status in [JobStatus.ACCEPTED, JobStatus.IN_PROGRESS]:
-                    supervisor_ids.add(job.supervisor_id)
-            
-            for sup_id in supervisor_ids:
-                sup_result = await session.execute(
-                    select(User).where(User.id == sup_id)
-                )
-                supervisor = sup_result.scalar_one_or_none()
-                
-                if supervisor and bot:
-                    try:
-                        from src.bot.utils.translate import translate_text
-                        sup_lang = await get_recipient_lang(supervisor.telegram_id)
-                        scope = i18n_msg("unavailability_scope_general", lang=sup_lang)
-                        t_reason = await translate_text(reason, target_lang=sup_lang)
-                        await bot.send_message(
-                            supervisor.telegram_id,
-                            i18n_msg(
-                                "unavailability_general", lang=sup_lang,
-                                sub_name=sub_name, scope=scope,
-                                job_info="", reason=t_reason, dates=dates_text
-                            ),
-                            reply_markup=get_unavailability_response_keyboard(notice.id, sub.id, lang=sup_lang),
-                            parse_mode="Markdown"
-                        )
-                        notified_users.append(supervisor.id)
-                    except Exception as e:
-                        logger.error(f"Failed to notify supervisor: {e}")
+        supervisors = []
+        if supervisor_ids:
+            sup_result = await session.execute(select(User).where(User.id.in_(supervisor_ids)))
+            supervisors = list(sup_result.scalars().all())
         
         # Also notify all admins, super admins, and all supervisors
         notify_result = await session.execute(
             select(User).where(User.role.in_([UserRole.ADMIN, UserRole.SUPER_ADMIN, UserRole.SUPERVISOR]))
         )
         notify_users = notify_result.scalars().all()
-        
-        for user in notify_users:
-            if user.id in notified_users:
-                continue  # Don't notify twice
-            if bot:
-                try:
-                    from src.bot.utils.translate import translate_text
-                    job_info = ""
-                    if job_id:
-                        job = await JobService.get_job(job_id)
-                        if job:
-                            job_info = f"Job #{job.id}: {job.title}\n"
-                    
-                    u_lang = await get_recipient_lang(user.telegram_id)
-                    scope = i18n_msg(
-                        "unavailability_scope_job" if job_id else "unavailability_scope_general",
-                        lang=u_lang
+        await session.commit()
+    
+    notified_users = []
+    
+    for supervisor in supervisors:
+        if bot:
+            try:
+                sup_lang = await get_recipient_lang(supervisor.telegram_id)
+                t_reason = await translate_text(reason, target_lang=sup_lang)
+                if job_id:
+                    text = i18n_msg(
+                        "unavailability_job_specific", lang=sup_lang,
+                        sub_name=sub_name, job_id=job.id,
+                        title=job.title, reason=t_reason, dates=dates_text
                     )
-                    t_reason = await translate_text(reason, target_lang=u_lang)
-                    await bot.send_message(
-                        user.telegram_id,
-                        i18n_msg(
-                            "unavailability_general", lang=u_lang,
-                            sub_name=sub_name, scope=scope,
-                            job_info=job_info,
-                            reason=t_reason, dates=dates_text
-                        ),
-                        reply_markup=get_unavailability_response_keyboard(notice.id, sub.id, lang=u_lang),
-                        parse_mode="Markdown"
+                else:
+                    scope = i18n_msg("unavailability_scope_general", lang=sup_lang)
+                    text = i18n_msg(
+                        "unavailability_general", lang=sup_lang,
+                        sub_name=sub_name, scope=scope,
+                        job_info="", reason=t_reason, dates=dates_text
                     )
-                    notified_users.append(user.id)
-                    logger.info(f"Notified {user.role.value} {user.telegram_id} about unavailability")
-                except Exception as e:
-                    logger.error(f"Failed to notify {user.role.value} {user.telegram_id}: {e}")
-        
-        # Update the notice with notified users
+                await OutboxService.enqueue(
+                    supervisor.telegram_id,
+                    text,
+                    reply_markup=get_unavailability_response_keyboard(notice.id, sub.id, lang=sup_lang),
+                    parse_mode="Markdown"
+                )
+                notified_users.append(supervisor.id)
+            except Exception as e:
+                logger.error(f"Failed to notify supervisor: {e}")
+    
+    langs = await get_recipient_langs(u.telegram_id for u in notify_users)
+    job_info = f"Job #{job.id}: {job.title}\n" if job else ""
+    
+    for user in notify_users:
+        if user.id in notified_users:
+            continue  # Don't notify twice
+        if bot:
+            try:
+                u_lang = langs[user.telegram_id]
+                scope = i18n_msg(
+                    "unavailability_scope_job" if job_id else "unavailability_scope_general",
+                    lang=u_lang
+                )
+                t_reason = await translate_text(reason, target_lang=u_lang)
+                await OutboxService.enqueue(
+                    user.telegram_id,
+                    i18n_msg(
+                        "unavailability_general", lang=u_lang,
+                        sub_name=sub_name, scope=scope,
+                        job_info=job_info,
+                        reason=t_reason, dates=dates_text
+                    ),
+                    reply_markup=get_unavailability_response_keyboard(notice.id, sub.id, lang=u_lang),
+                    parse_mode="Markdown"
+                )
+                notified_users.append(user.id)
+                logger.info(f"Notified {user.role.value} {user.telegram_id} about unavailability")
+            except Exception as e:
+                logger.error(f"Failed to notify {user.role.value} {user.telegram_id}: {e}")
+    
+    # Update the notice with notified users
+    async with session_scope() as session:
         notice.notified_supervisor_ids = ",".join(map(str, notified_users))
         await session.commit()
     
@@ -1117,16 +1072,17 @@ async def handle_weekly_availability_response(callback: CallbackQuery, state: FS
     avail_id = int(parts[1])
     action = parts[2]
     
-    async with async_session() as session:
+    async with session_scope() as session:
         result = await session.execute(
             select(WeeklyAvailability).where(WeeklyAvailability.id == avail_id)
         )
         availability = result.scalar_one_or_none()
         
-        if not availability:
-            await callback.answer("Survey not found", show_alert=True)
-            return
-        
+    if not availability:
+        await callback.answer("Survey not found", show_alert=True)
+        return
+
+    async with session_scope() as session:
         if action == "toggle" and len(parts) >= 4:
             day = parts[3]
             # Toggle the day
@@ -1186,13 +1142,17 @@ async def handle_weekly_availability_response(callback: CallbackQuery, state: FS
             
         elif action == "save":
             availability.responded_at = datetime.utcnow()
-            await session.commit()
             
             # Get subcontractor info for notification
             sub_result = await session.execute(
                 select(User).where(User.id == availability.subcontractor_id)
             )
             subcontractor = sub_result.scalar_one_or_none()
+            notify_result = await session.execute(
+                select(User).where(User.role == UserRole.ADMIN)
+            )
+            notify_users = notify_result.scalars().all()
+            await session.commit()
             sub_name = subcontractor.first_name or subcontractor.username or "Subcontractor" if subcontractor else "Subcontractor"
             
             # Build confirmation message
@@ -1213,15 +1173,12 @@ async def handle_weekly_availability_response(callback: CallbackQuery, state: FS
             # Notify managers only
             bot = callback.bot
             if bot:
-                notify_result = await session.execute(
-                    select(User).where(User.role == UserRole.ADMIN)
-                )
-                notify_users = notify_result.scalars().all()
+                langs = await get_recipient_langs(u.telegram_id for u in notify_users)
                 
                 for user in notify_users:
                     try:
-                        mgr_lang = await get_recipient_lang(user.telegram_id)
-                        await bot.send_message(
+                        mgr_lang = langs[user.telegram_id]
+                        await OutboxService.enqueue(
                             user.telegram_id,
                             i18n_msg(
                                 "availability_update", lang=mgr_lang,
@@ -1263,7 +1220,7 @@ async def process_weekly_availability_notes(message: Message, state: FSMContext)
     data = await state.get_data()
     avail_id = data.get("avail_id")
     
-    async with async_session() as session:
+    async with session_scope() as session:
         result = await session.execute(
             select(WeeklyAvailability).where(WeeklyAvailability.id == avail_id)
         )
@@ -1293,17 +1250,12 @@ async def handle_message_acknowledge(callback: CallbackQuery):
     
     from src.bot.database.models import BroadcastMessage, MessageResponse
     
-    async with async_session() as session:
-        # Get responder info
-        responder_result = await session.execute(
-            select(User).where(User.telegram_id == callback.from_user.id)
-        )
-        responder = responder_result.scalar_one_or_none()
-        
-        if not responder:
-            await callback.answer("User not found.")
-            return
-        
+    responder = await get_current_user(callback.from_user.id)
+    if not responder:
+        await callback.answer("User not found.")
+        return
+    
+    async with session_scope() as session:
         # Check if already responded
         existing = await session.execute(
             select(MessageResponse).where(
@@ -1311,21 +1263,24 @@ async def handle_message_acknowledge(callback: CallbackQuery):
                 MessageResponse.responder_id == responder.id
             )
         )
-        if existing.scalar_one_or_none():
-            sub_lang = await get_recipient_lang(callback.from_user.id)
-            await callback.answer(i18n_msg("msg_already_responded", lang=sub_lang))
-            return
-        
+        already_responded = existing.scalar_one_or_none() is not None
+    if already_responded:
+        sub_lang = await get_recipient_lang(callback.from_user.id)
+        await callback.answer(i18n_msg("msg_already_responded", lang=sub_lang))
+        return
+
+    async with session_scope() as session:
         # Get the broadcast message
         broadcast_result = await session.execute(
             select(BroadcastMessage).where(BroadcastMessage.id == broadcast_id)
         )
         broadcast = broadcast_result.scalar_one_or_none()
         
-        if not broadcast:
-            await callback.answer("Message not found.")
-            return
-        
+    if not broadcast:
+        await callback.answer("Message not found.")
+        return
+
+    async with session_scope() as session:
         # Save the response
         response = MessageResponse(
             broadcast_id=broadcast_id,
@@ -1333,31 +1288,31 @@ async def handle_message_acknowledge(callback: CallbackQuery):
             response_type="acknowledged"
         )
         session.add(response)
-        await session.commit()
         
         # Get sender info
         sender_result = await session.execute(
             select(User).where(User.id == broadcast.sender_id)
         )
         sender = sender_result.scalar_one_or_none()
-        
-        responder_name = responder.first_name or responder.username or "Subcontractor"
-        
-        # Notify the sender
-        if sender and bot:
-            try:
-                sender_lang = await get_recipient_lang(sender.telegram_id)
-                preview = broadcast.message[:100] + ("..." if len(broadcast.message) > 100 else "")
-                await bot.send_message(
-                    sender.telegram_id,
-                    i18n_msg(
-                        "message_acknowledged", lang=sender_lang,
-                        responder=responder_name, preview=preview
-                    ),
-                    parse_mode="Markdown"
-                )
-            except Exception as e:
-                logger.error(f"Failed to notify sender about acknowledgement: {e}")
+        await session.commit()
+    
+    responder_name = responder.first_name or responder.username or "Subcontractor"
+    
+    # Notify the sender
+    if sender and bot:
+        try:
+            sender_lang = await get_recipient_lang(sender.telegram_id)
+            preview = broadcast.message[:100] + ("..." if len(broadcast.message) > 100 else "")
+            await OutboxService.enqueue(
+                sender.telegram_id,
+                i18n_msg(
+                    "message_acknowledged", lang=sender_lang,
+                    responder=responder_name, preview=preview
+                ),
+                parse_mode="Markdown"
+            )
+        except Exception as e:
+            logger.error(f"Failed to notify sender about acknowledgement: {e}")
     
     # Update the message to show acknowledged
     sub_lang = await get_recipient_lang(callback.from_user.id)
@@ -1396,29 +1351,25 @@ async def process_message_reply(message: Message, state: FSMContext):
     
     from src.bot.database.models import BroadcastMessage, MessageResponse
     
-    async with async_session() as session:
-        # Get responder info
-        responder_result = await session.execute(
-            select(User).where(User.telegram_id == message.from_user.id)
-        )
-        responder = responder_result.scalar_one_or_none()
-        
-        if not responder:
-            await message.answer("User not found.")
-            await state.clear()
-            return
-        
+    responder = await get_current_user(message.from_user.id)
+    if not responder:
+        await message.answer("User not found.")
+        await state.clear()
+        return
+    
+    async with session_scope() as session:
         # Get the broadcast message
         broadcast_result = await session.execute(
             select(BroadcastMessage).where(BroadcastMessage.id == broadcast_id)
         )
         broadcast = broadcast_result.scalar_one_or_none()
         
-        if not broadcast:
-            await message.answer("Original message not found.")
-            await state.clear()
-            return
-        
+    if not broadcast:
+        await message.answer("Original message not found.")
+        await state.clear()
+        return
+
+    async with session_scope() as session:
         # Save the response
         response = MessageResponse(
             broadcast_id=broadcast_id,
@@ -1427,33 +1378,33 @@ async def process_message_reply(message: Message, state: FSMContext):
             reply_text=message.text
         )
         session.add(response)
-        await session.commit()
         
         # Get sender info
         sender_result = await session.execute(
             select(User).where(User.id == broadcast.sender_id)
         )
         sender = sender_result.scalar_one_or_none()
-        
-        responder_name = responder.first_name or responder.username or "Subcontractor"
-        
-        # Notify the sender with the reply (translated to sender's language)
-        if sender and bot:
-            try:
-                from src.bot.utils.translate import translate_text
-                sender_lang = await get_recipient_lang(sender.telegram_id)
-                preview = broadcast.message[:100] + ("..." if len(broadcast.message) > 100 else "")
-                translated_reply = await translate_text(message.text, target_lang=sender_lang)
-                await bot.send_message(
-                    sender.telegram_id,
-                    i18n_msg(
-                        "reply_received", lang=sender_lang,
-                        responder=responder_name, preview=preview, reply=translated_reply
-                    ),
-                    parse_mode="Markdown"
-                )
-            except Exception as e:
-                logger.error(f"Failed to notify sender about reply: {e}")
+        await session.commit()
+    
+    responder_name = responder.first_name or responder.username or "Subcontractor"
+    
+    # Notify the sender with the reply (translated to sender's language)
+    if sender and bot:
+        try:
+            from src.bot.utils.translate import translate_text
+            sender_lang = await get_recipient_lang(sender.telegram_id)
+            preview = broadcast.message[:100] + ("..." if len(broadcast.message) > 100 else "")
+            translated_reply = await translate_text(message.text, target_lang=sender_lang)
+            await OutboxService.enqueue(
+                sender.telegram_id,
+                i18n_msg(
+                    "reply_received", lang=sender_lang,
+                    responder=responder_name, preview=preview, reply=translated_reply
+                ),
+                parse_mode="Markdown"
+            )
+        except Exception as e:
+            logger.error(f"Failed to notify sender about reply: {e}")
     
     await message.answer(
         i18n_msg("msg_reply_sent", lang=sub_lang),
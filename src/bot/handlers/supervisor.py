@@ -1,19 +1,23 @@
 ﻿from datetime import datetime, timedelta
+from functools import partial
 from aiogram import Router, F
 from aiogram.filters import Command, StateFilter
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
-from aiogram.types import Message, CallbackQuery, BufferedInputFile
+from aiogram.types import Message, CallbackQuery
 from sqlalchemy import select
-from src.bot.database import async_session, User, Job, Quote
+from src.bot.database import async_session, session_scope, User, Job, Quote
 from src.bot.database.models import UserRole, JobType, JobStatus, AvailabilityStatus
 from src.bot.services.jobs import JobService
 from src.bot.services.quotes import QuoteService
 from src.bot.services.access_codes import AccessCodeService
 from src.bot.services.pdf_generator import JobPdfService
+from src.bot.services.dispatch import DispatchService
+from src.bot.services.document_registry import DocumentRegistry
+from src.bot.services.outbox import OutboxService
 from src.bot.handlers.admin import CreateCodeStates
-from src.bot.i18n import variants as tv, msg as i18n_msg, get_recipient_lang
-from src.bot.utils.permissions import require_role
+from src.bot.i18n import variants as tv, msg as i18n_msg, get_recipient_lang, LANGUAGES
+from src.bot.utils.permissions import require_role, get_current_user
 from src.bot.utils.keyboards import (
     get_job_type_keyboard, get_skip_keyboard,
     get_confirmation_keyboard, get_job_list_keyboard, get_main_menu_keyboard, 
@@ -66,14 +70,10 @@ async def btn_new_job(message: Message, state: FSMContext):
         await message.answer("Database not available.")
         return
     
-    async with async_session() as session:
-        result = await session.execute(
-            select(User).where(User.telegram_id == message.from_user.id)
-        )
-        user = result.scalar_one_or_none()
-        if not user or user.role not in [UserRole.SUPERVISOR, UserRole.ADMIN]:
-            await message.answer("You don't have permission to create jobs.")
-            return
+    user = await get_current_user(message.from_user.id)
+    if not user or user.role not in [UserRole.SUPERVISOR, UserRole.ADMIN]:
+        await message.answer("You don't have permission to create jobs.")
+        return
     
     await start_new_job(message, state)
 
@@ -319,11 +319,7 @@ async def show_team_selection(message: Message, state: FSMContext, telegram_id:
         await state.clear()
         return
     
-    async with async_session() as session:
-        result = await session.execute(
-            select(User).where(User.telegram_id == telegram_id)
-        )
-        supervisor = result.scalar_one_or_none()
+    supervisor = await get_current_user(telegram_id)
     
     if not supervisor:
         await message.answer("User not found. Please register first with /start")
@@ -378,6 +374,7 @@ async def process_team_send(callback: CallbackQuery, state: FSMContext):
         await callback.answer()
         return
     
+    answered = False
     if send_option == "draft":
         lang = await get_recipient_lang(callback.from_user.id)
         await callback.message.edit_text(
@@ -391,16 +388,7 @@ async def process_team_send(callback: CallbackQuery, state: FSMContext):
         if success:
             # Determine which subcontractors to notify
             logger.info(f"Starting notification process. send_option={send_option}")
-            async with async_session() as session:
-                from sqlalchemy import or_
-                
-                # First, log ALL users in the database for debugging
-                all_users_result = await session.execute(select(User))
-                all_users = list(all_users_result.scalars().all())
-                logger.info(f"Total users in database: {len(all_users)}")
-                for u in all_users:
-                    logger.info(f"  User {u.id}: role={u.role}, telegram_id={u.telegram_id}, team_id={u.team_id}")
-                
+            async with session_scope() as session:
                 if send_option == "all":
                     # Get ALL subcontractors regardless of availability
                     logger.info("Querying for ALL subcontractors (bot-wide)")
@@ -432,79 +420,91 @@ async def process_team_send(callback: CallbackQuery, state: FSMContext):
                         team_label = send_option.title()
                 
                 available_subs = list(result.scalars().all())
-                logger.info(f"=== JOB NOTIFICATION START ===")
-                logger.info(f"Job ID: {job.id}, Title: {job.title}")
-                logger.info(f"Send option: {send_option}")
-                logger.info(f"Found {len(available_subs)} subcontractors to notify")
-                
-                if len(available_subs) == 0:
-                    logger.warning("NO SUBCONTRACTORS FOUND! Check if any users have role=SUBCONTRACTOR in the database.")
-                
-                # Use callback.bot - the correct aiogram 3.x way to get the bot instance
-                bot = callback.bot
-                logger.info(f"Bot instance from callback: {bot}")
-                
-                notified_count = 0
-                failed_count = 0
-                
-                # Prepare deadline text
-                deadline_text = ""
-                if job.deadline:
-                    deadline_text = f"\nDeadline: {job.deadline.strftime('%d/%m/%Y')}"
-                
-                # Get supervisor photos
-                sup_photos = job.supervisor_photos.split(",") if job.supervisor_photos else []
+            
+            logger.info(f"=== JOB NOTIFICATION START ===")
+            logger.info(f"Job ID: {job.id}, Title: {job.title}")
+            logger.info(f"Send option: {send_option}")
+            logger.info(f"Found {len(available_subs)} subcontractors to notify")
+            
+            if len(available_subs) == 0:
+                logger.warning("NO SUBCONTRACTORS FOUND! Check if any users have role=SUBCONTRACTOR in the database.")
+            
+            # Use callback.bot - the correct aiogram 3.x way to get the bot instance
+            bot = callback.bot
+            
+            # Prepare deadline text
+            deadline_text = ""
+            if job.deadline:
+                deadline_text = f"\nDeadline: {job.deadline.strftime('%d/%m/%Y')}"
+            
+            # Get supervisor photos
+            sup_photos = job.supervisor_photos.split(",") if job.supervisor_photos else []
+            supervisor_name = callback.from_user.first_name or callback.from_user.username
+            
+            async def notify_sub(sub: User):
+                logger.info(f"[NOTIFY] Sending to subcontractor id={sub.id}, telegram_id={sub.telegram_id}, name={sub.first_name}")
+                sub_lang = sub.language if sub.language in LANGUAGES else "en"
+                await DispatchService.call(
+                    sub.telegram_id,
+                    bot.send_message,
+                    i18n_msg(
+                        "new_job_notification", lang=sub_lang,
+                        job_id=job.id, title=job.title,
+                        address=job.address or "N/A",
+                        price=job.preset_price or "N/A",
+                        deadline=deadline_text
+                    ),
+                    parse_mode="Markdown"
+                )
                 
-                for sub in available_subs:
-                    try:
-                        logger.info(f"[NOTIFY] Sending to subcontractor id={sub.id}, telegram_id={sub.telegram_id}, name={sub.first_name}")
-                        sub_lang = await get_recipient_lang(sub.telegram_id)
-                        await bot.send_message(
-                            sub.telegram_id,
-                            i18n_msg(
-                                "new_job_notification", lang=sub_lang,
-                                job_id=job.id, title=job.title,
-                                address=job.address or "N/A",
-                                price=job.preset_price or "N/A",
-                                deadline=deadline_text
-                            ),
-                            parse_mode="Markdown"
-                        )
-
-                        try:
-                            pdf_filename, pdf_content = await JobPdfService.build_job_dispatch_pdf(
-                                job=job,
-                                supervisor_name=callback.from_user.first_name or callback.from_user.username,
-                                recipient_name=sub.first_name or sub.username,
-                                bot=bot,
-                            )
-                            await bot.send_document(
-                                sub.telegram_id,
-                                BufferedInputFile(pdf_content, filename=pdf_filename),
-                                caption=f"Work order PDF for Job #{job.id}"
-                            )
-                        except Exception as pdf_error:
-                            logger.error(f"[PDF SEND FAILED] job_id={job.id} subcontractor={sub.telegram_id}: {pdf_error}")
-                        
-                        # Send supervisor photos if any
-                        if sup_photos:
-                            from aiogram.types import InputMediaPhoto
-                            if len(sup_photos) == 1:
-                                await bot.send_photo(sub.telegram_id, sup_photos[0], caption=" Repair photos for this job")
-                            else:
-                                media_group = [InputMediaPhoto(media=photo_id) for photo_id in sup_photos]
-                                media_group[0] = InputMediaPhoto(media=sup_photos[0], caption=" Repair photos for this job")
-                                await bot.send_media_group(sub.telegram_id, media_group)
-                        
-                        notified_count += 1
-                        logger.info(f"[NOTIFY SUCCESS] Notified subcontractor telegram_id={sub.telegram_id}")
-                    except Exception as e:
-                        failed_count += 1
-                        logger.error(f"[NOTIFY FAILED] subcontractor telegram_id={sub.telegram_id}: {e}", exc_info=True)
+                try:
+                    # Broadcast jobs are open to everyone, so all recipients share one render.
+                    pdf_filename, pdf_content = await JobPdfService.get_job_dispatch_pdf(
+                        job=job,
+                        supervisor_name=supervisor_name,
+                        recipient_name=None,
+                        bot=bot,
+                    )
+                    await DispatchService.call(
+                        sub.telegram_id,
+                        partial(DocumentRegistry.send_document, bot),
+                        pdf_content,
+                        pdf_filename,
+                        caption=f"Work order PDF for Job #{job.id}"
+                    )
+                except Exception as pdf_error:
+                    logger.error(f"[PDF SEND FAILED] job_id={job.id} subcontractor={sub.telegram_id}: {pdf_error}")
                 
-                logger.info(f"=== JOB NOTIFICATION COMPLETE ===")
-                logger.info(f"Total: {len(available_subs)}, Success: {notified_count}, Failed: {failed_count}")
+                # Send supervisor photos if any
+                if sup_photos:
+                    from aiogram.types import InputMediaPhoto
+                    if len(sup_photos) == 1:
+                        await DispatchService.call(sub.telegram_id, bot.send_photo, sup_photos[0], caption=" Repair photos for this job")
+                    else:
+                        media_group = [InputMediaPhoto(media=photo_id) for photo_id in sup_photos]
+                        media_group[0] = InputMediaPhoto(media=sup_photos[0], caption=" Repair photos for this job")
+                        await DispatchService.call(sub.telegram_id, bot.send_media_group, media_group)
                 
+                logger.info(f"[NOTIFY SUCCESS] Notified subcontractor telegram_id={sub.telegram_id}")
+            
+            async def report_progress(done: int, failed: int, total: int):
+                await callback.message.edit_text(
+                    f"*Sending Job #{job.id}...*\n\n"
+                    f"{job.title}\n"
+                    f"Sent to: {team_label}\n\n"
+                    f" Progress: {done}/{total} ({failed} failed)",
+                    parse_mode="Markdown"
+                )
+            
+            # Acknowledge the button now; the fan-out may outlive the callback query timeout.
+            await callback.answer("Sending job...")
+            answered = True
+            notified_count, failed_count = await DispatchService.fan_out(
+                available_subs, notify_sub, on_progress=report_progress
+            )
+            
+            logger.info(f"=== JOB NOTIFICATION COMPLETE ===")
+            logger.info(f"Total: {len(available_subs)}, Success: {notified_count}, Failed: {failed_count}")
             
             await callback.message.edit_text(
                 f"*Job Created & Sent!*\n\n"
@@ -522,7 +522,8 @@ async def process_team_send(callback: CallbackQuery, state: FSMContext):
             )
     
     await state.clear()
-    await callback.answer("Job created!")
+    if not answered:
+        await callback.answer("Job created!")
 
 @router.callback_query(F.data.startswith("confirm:save_pending"))
 async def confirm_save_pending(callback: CallbackQuery, state: FSMContext):
@@ -599,14 +600,10 @@ async def check_supervisor(message: Message) -> bool:
         await message.answer("Database not available.")
         return False
     
-    async with async_session() as session:
-        result = await session.execute(
-            select(User).where(User.telegram_id == message.from_user.id)
-        )
-        user = result.scalar_one_or_none()
-        if not user or user.role != UserRole.SUPERVISOR:
-            await message.answer("You don't have permission to view jobs.")
-            return False
+    user = await get_current_user(message.from_user.id)
+    if not user or user.role != UserRole.SUPERVISOR:
+        await message.answer("You don't have permission to view jobs.")
+        return False
     return True
 
 async def show_my_jobs(message: Message):
@@ -729,7 +726,7 @@ async def view_quote_detail(callback: CallbackQuery):
         return
     
     from src.bot.database import Quote
-    async with async_session() as session:
+    async with session_scope() as session:
         result = await session.execute(
             select(Quote, User).join(User, Quote.subcontractor_id == User.id).where(Quote.id == quote_id)
         )
@@ -788,14 +785,17 @@ async def accept_quote(callback: CallbackQuery):
                     try:
                         job = await JobService.get_job_by_id(job_id)
                         if job:
-                            pdf_filename, pdf_content = JobPdfService.build_job_dispatch_pdf(
+                            pdf_filename, pdf_content = await JobPdfService.get_job_dispatch_pdf(
                                 job=job,
                                 supervisor_name=callback.from_user.first_name or callback.from_user.username,
-                                recipient_name=None
+                                recipient_name=None,
+                                bot=bot,
                             )
-                            await bot.send_document(
+                            await DocumentRegistry.send_document(
+                                bot,
                                 sub_telegram_id,
-                                BufferedInputFile(pdf_content, filename=pdf_filename),
+                                pdf_content,
+                                pdf_filename,
                                 caption=f"Work order PDF for Job #{job_id}"
                             )
                     except Exception as pdf_error:
@@ -810,7 +810,7 @@ async def decline_quote_start(callback: CallbackQuery, state: FSMContext):
     quote_id = int(callback.data.split(":")[1])
     
     # Get quote info for display
-    async with async_session() as session:
+    async with session_scope() as session:
         result = await session.execute(
             select(Quote, User).join(User, Quote.subcontractor_id == User.id).where(Quote.id == quote_id)
         )
@@ -867,7 +867,7 @@ async def process_decline_reason(message: Message, state: FSMContext):
                     from src.bot.utils.translate import translate_text
                     sub_lang = await get_recipient_lang(sub_telegram_id)
                     translated_reason = await translate_text(reason, target_lang=sub_lang)
-                    await bot.send_message(
+                    await OutboxService.enqueue(
                         sub_telegram_id,
                         i18n_msg(
                             "quote_declined_notification", lang=sub_lang,
@@ -1008,16 +1008,17 @@ async def process_not_satisfied_reason(message: Message, state: FSMContext):
         await message.answer("Please provide a reason for your dissatisfaction:")
         return
     
-    async with async_session() as session:
+    async with session_scope() as session:
         # Get job details
         result = await session.execute(select(Job).where(Job.id == job_id))
         job = result.scalar_one_or_none()
         
-        if not job:
-            await message.answer("Job not found.")
-            await state.clear()
-            return
-        
+    if not job:
+        await message.answer("Job not found.")
+        await state.clear()
+        return
+
+    async with session_scope() as session:
         # Get subcontractor
         sub_result = await session.execute(
             select(User).where(User.id == job.subcontractor_id)
@@ -1033,10 +1034,9 @@ async def process_not_satisfied_reason(message: Message, state: FSMContext):
         if subcontractor:
             try:
                 from src.bot.utils.translate import translate_text
-                bot = message.bot
                 sub_lang = await get_recipient_lang(subcontractor.telegram_id)
                 translated_reason = await translate_text(reason, target_lang=sub_lang)
-                await bot.send_message(
+                await OutboxService.enqueue(
                     subcontractor.telegram_id,
                     i18n_msg(
                         "revision_requested", lang=sub_lang,
@@ -1063,11 +1063,7 @@ async def btn_view_availability(message: Message):
         await message.answer("Database not available.")
         return
 
-    async with async_session() as session:
-        result = await session.execute(
-            select(User).where(User.telegram_id == message.from_user.id)
-        )
-        user = result.scalar_one_or_none()
+    user = await get_current_user(message.from_user.id)
 
     if not user or user.role != UserRole.ADMIN:
         await message.answer("Only managers can view subcontractor availability.")
@@ -1087,7 +1083,7 @@ async def show_subcontractor_availability(message: Message):
     days_since_monday = today.weekday()
     current_monday = datetime.combine(today - timedelta(days=days_since_monday), datetime.min.time())
     
-    async with async_session() as session:
+    async with session_scope() as session:
         # Get all availability records for this week
         result = await session.execute(
             select(WeeklyAvailability, User).join(
@@ -1095,49 +1091,49 @@ async def show_subcontractor_availability(message: Message):
             ).where(WeeklyAvailability.week_start == current_monday)
         )
         responses = result.all()
+    
+    if not responses:
+        await message.answer(
+            " *Subcontractor Availability*\n\n"
+            "No availability data for this week yet.\n\n"
+            "Subcontractors receive availability surveys every thursday.",
+            parse_mode="Markdown"
+        )
+        return
+    
+    day_names = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday"]
+    
+    message_text = f" *Subcontractor Availability*\n"
+    message_text += f"Week of {current_monday.strftime('%d/%m/%Y')}\n\n"
+    
+    for avail, user in responses:
+        name = user.first_name or user.username or f"User {user.telegram_id}"
         
-        if not responses:
-            await message.answer(
-                " *Subcontractor Availability*\n\n"
-                "No availability data for this week yet.\n\n"
-                "Subcontractors receive availability surveys every thursday.",
-                parse_mode="Markdown"
-            )
-            return
-        
-        day_names = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday"]
-        
-        message_text = f" *Subcontractor Availability*\n"
-        message_text += f"Week of {current_monday.strftime('%d/%m/%Y')}\n\n"
-        
-        for avail, user in responses:
-            name = user.first_name or user.username or f"User {user.telegram_id}"
+        if avail.responded_at is None:
+            message_text += f"*{name}:*  No response yet\n\n"
+        else:
+            days_available = []
+            if avail.monday_available:
+                days_available.append("Mon")
+            if avail.tuesday_available:
+                days_available.append("Tue")
+            if avail.wednesday_available:
+                days_available.append("Wed")
+            if avail.thursday_available:
+                days_available.append("Thu")
+            if avail.friday_available:
+                days_available.append("Fri")
             
-            if avail.responded_at is None:
-                message_text += f"*{name}:*  No response yet\n\n"
+            if days_available:
+                message_text += f"*{name}:*  {', '.join(days_available)}\n"
             else:
-                days_available = []
-                if avail.monday_available:
-                    days_available.append("Mon")
-                if avail.tuesday_available:
-                    days_available.append("Tue")
-                if avail.wednesday_available:
-                    days_available.append("Wed")
-                if avail.thursday_available:
-                    days_available.append("Thu")
-                if avail.friday_available:
-                    days_available.append("Fri")
-                
-                if days_available:
-                    message_text += f"*{name}:*  {', '.join(days_available)}\n"
-                else:
-                    message_text += f"*{name}:*  Not available\n"
-                
-                if avail.notes:
-                    message_text += f"   _Notes: {avail.notes}_\n"
-                message_text += "\n"
-        
-        await message.answer(message_text, parse_mode="Markdown")
+                message_text += f"*{name}:*  Not available\n"
+            
+            if avail.notes:
+                message_text += f"   _Notes: {avail.notes}_\n"
+            message_text += "\n"
+    
+    await message.answer(message_text, parse_mode="Markdown")
 
 # ============= UNAVAILABILITY FEEDBACK HANDLERS =============
 
@@ -1188,49 +1184,44 @@ async def process_unavailability_feedback(message: Message, state: FSMContext):
         await state.clear()
         return
     
-    async with async_session() as session:
+    async with session_scope() as session:
         # Get the subcontractor
         sub_result = await session.execute(
             select(User).where(User.id == subcontractor_id)
         )
         subcontractor = sub_result.scalar_one_or_none()
+    
+    supervisor = await get_current_user(message.from_user.id)
+    
+    if subcontractor:
+        sup_name = supervisor.first_name or supervisor.username or "Your supervisor" if supervisor else "Your supervisor"
         
-        # Get the supervisor
-        sup_result = await session.execute(
-            select(User).where(User.telegram_id == message.from_user.id)
-        )
-        supervisor = sup_result.scalar_one_or_none()
-        
-        if subcontractor:
-            sup_name = supervisor.first_name or supervisor.username or "Your supervisor" if supervisor else "Your supervisor"
+        try:
+            from src.bot.utils.translate import translate_text
+            sub_lang = await get_recipient_lang(subcontractor.telegram_id)
+            translated_feedback = await translate_text(feedback, target_lang=sub_lang)
+            await OutboxService.enqueue(
+                subcontractor.telegram_id,
+                i18n_msg(
+                    "supervisor_feedback", lang=sub_lang,
+                    sup_name=sup_name, feedback=translated_feedback
+                ),
+                parse_mode="Markdown"
+            )
             
-            try:
-                from src.bot.utils.translate import translate_text
-                bot = message.bot
-                sub_lang = await get_recipient_lang(subcontractor.telegram_id)
-                translated_feedback = await translate_text(feedback, target_lang=sub_lang)
-                await bot.send_message(
-                    subcontractor.telegram_id,
-                    i18n_msg(
-                        "supervisor_feedback", lang=sub_lang,
-                        sup_name=sup_name, feedback=translated_feedback
-                    ),
-                    parse_mode="Markdown"
-                )
-                
-                await message.answer(
-                    " *Feedback Sent*\n\n"
-                    "Your feedback has been sent to the subcontractor.",
-                    parse_mode="Markdown"
-                )
-            except Exception as e:
-                logger.error(f"Failed to send feedback: {e}")
-                await message.answer(
-                    "Failed to send feedback. The subcontractor may have blocked the bot.",
-                    parse_mode="Markdown"
-                )
-        else:
-            await message.answer("Subcontractor not found.")
+            await message.answer(
+                " *Feedback Sent*\n\n"
+                "Your feedback has been sent to the subcontractor.",
+                parse_mode="Markdown"
+            )
+        except Exception as e:
+            logger.error(f"Failed to send feedback: {e}")
+            await message.answer(
+                "Failed to send feedback. The subcontractor may have blocked the bot.",
+                parse_mode="Markdown"
+            )
+    else:
+        await message.answer("Subcontractor not found.")
     
     await state.clear()
 
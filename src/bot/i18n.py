@@ -1214,6 +1214,11 @@ MESSAGES: dict[str, dict[str, str]] = {
         "ps": "*آرشیف بشپړ شو*\n\n*{count}* زوړ کارونه آرشیف شول.\n\nآرشیف شوي کارونه د 'View Archived' کې لیدل کیدی شي.",
         "my": "*သိမ်းဆည်းပြီးပြီ*\n\n*{count}* ဟောင်းသောအလုပ်များသိမ်းဆည်းပြီး။\n\nသိမ်းဆည်းထားသောအလုပ်များကို 'View Archived' တွင်ကြည့်နိုင်သည်။",
     },
+    "archive_progress": {
+        "en": "*Archiving...*\n\nArchived *{count}* jobs so far.",
+        "ps": "*آرشیف روان دی...*\n\nتر اوسه *{count}* کارونه آرشیف شول.",
+        "my": "*သိမ်းဆည်းနေသည်...*\n\nယခုအထိ *{count}* အလုပ်များသိမ်းဆည်းပြီး။",
+    },
     "archive_empty": {
         "en": "*Archive Jobs*\n\nNo jobs eligible for archiving at this time.\n\nJobs are automatically archived after 90 days.",
         "ps": "*د کارونو آرشیف*\n\nاوس مهال هیڅ کار د آرشیف وړ نه دی.\n\nکارونه د ۹۰ ورځو وروسته اتوماتیک آرشیف کیږي.",
@@ -1549,18 +1554,28 @@ MESSAGES: dict[str, dict[str, str]] = {
 
 async def get_recipient_lang(telegram_id: int) -> str:
     """Look up a user's stored language preference. Returns 'en' as fallback."""
+    from src.bot.middleware.user_context import current_user_for, is_missing
+    cached = current_user_for(telegram_id)
+    if not is_missing(cached):
+        lang = cached.language if cached else None
+        return lang if lang in LANGUAGES else "en"
+    return (await get_recipient_langs([telegram_id]))[telegram_id]
+
+
+async def get_recipient_langs(telegram_ids) -> dict[int, str]:
+    """Bulk variant of get_recipient_lang for fan-out loops (one query for all misses)."""
+    from src.bot.utils.user_cache import UserProfileCache
+    telegram_ids = list(telegram_ids)
     try:
-        from src.bot.database import async_session
-        from src.bot.database.models import User
-        from sqlalchemy import select
-        async with async_session() as session:
-            result = await session.execute(
-                select(User.language).where(User.telegram_id == telegram_id)
-            )
-            lang = result.scalar_one_or_none()
-            return lang if lang in LANGUAGES else "en"
+        profiles = await UserProfileCache.get_many(telegram_ids)
     except Exception:
-        return "en"
+        profiles = {}
+    langs = {}
+    for telegram_id in telegram_ids:
+        profile = profiles.get(telegram_id)
+        lang = profile.language if profile else None
+        langs[telegram_id] = lang if lang in LANGUAGES else "en"
+    return langs
 
 
 def msg(key: str, lang: str = DEFAULT_LANG, **kwargs) -> str:
@@ -6,17 +6,26 @@ import os
 
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
 
+from aiohttp import web
 from aiogram import Bot, Dispatcher
 from aiogram.client.default import DefaultBotProperties
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.client.telegram import TelegramAPIServer
 from aiogram.enums import ParseMode
 from src.bot.config import config
-from src.bot.database import init_db
-from src.bot.database.session import engine
-from src.bot.migrations.add_new_columns import run_migration
+from src.bot.database.session import engine, replica_engine
+from src.bot.migrations.ledger import run_pending_migrations
 from src.bot.services.access_codes import AccessCodeService
 from src.bot.services.scheduler import SchedulerService
+from src.bot.services.outbox import OutboxService
+from src.bot.services.leader import LeaderElection, SCHEDULER_LOCK_KEY
+from src.bot.services.fsm_storage import PostgresStorage
 from src.bot.handlers import auth_router, supervisor_router, subcontractor_router, admin_router, safety_checklist_router, language_router
 from src.bot.middleware.error_handler import setup_error_handlers
+from src.bot.middleware.db_session import DbSessionMiddleware
+from src.bot.middleware.user_context import CurrentUserMiddleware
+from src.bot.webhook import start_webhook, ALLOWED_UPDATES
+from src.bot.sharding import ShardSupervisor, use_global_rate_share
 
 logging.basicConfig(
     level=logging.INFO,
@@ -28,24 +37,51 @@ logger = logging.getLogger(__name__)
 bot: Bot | None = None
 dp: Dispatcher | None = None
 scheduler_task: asyncio.Task | None = None
+outbox_task: asyncio.Task | None = None
+webhook_runner: web.AppRunner | None = None
+shards: ShardSupervisor | None = None
+poll_task: asyncio.Task | None = None
+stopped = asyncio.Event()
+shutdown_task: asyncio.Task | None = None
 
 async def shutdown(sig=None):
-    global scheduler_task
-    
+    """Run the shutdown sequence once; later callers (signal handler, main's finally) wait for it."""
+    global shutdown_task
+    if shutdown_task is None:
+        shutdown_task = asyncio.create_task(_shutdown(sig))
+    await asyncio.shield(shutdown_task)
+
+async def _shutdown(sig=None):
     if sig:
         logger.info(f"Received signal {sig.name}, shutting down...")
     else:
         logger.info("Shutting down...")
     
-    if scheduler_task:
-        scheduler_task.cancel()
-        try:
-            await scheduler_task
-        except asyncio.CancelledError:
-            pass
+    for task in (scheduler_task, outbox_task):
+        if task:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+    
+    if webhook_runner:
+        # Stops accepting requests, lets in-flight updates finish, then runs
+        # the dispatcher shutdown hooks (FSM flush) and closes the bot session.
+        await webhook_runner.cleanup()
+    elif poll_task:
+        poll_task.cancel()
+    elif dp and not stopped.is_set():
+        await dp.stop_polling()
+    stopped.set()
+    
+    if shards:
+        # Workers drain their queues and flush their own FSM state.
+        await shards.stop()
     
     if dp:
-        await dp.stop_polling()
+        # Write out buffered FSM state before the engine goes away.
+        await dp.storage.close()
     
     if bot:
         await bot.session.close()
@@ -53,13 +89,40 @@ async def shutdown(sig=None):
     if engine:
         await engine.dispose()
     
+    if replica_engine:
+        await replica_engine.dispose()
+    
     logger.info("Shutdown complete")
 
 def handle_signal(sig):
     asyncio.create_task(shutdown(sig))
 
+def build_bot() -> Bot:
+    return Bot(
+        token=config.BOT_TOKEN,
+        session=AiohttpSession(api=TelegramAPIServer.from_base(config.TELEGRAM_API_URL)) if config.TELEGRAM_API_URL else None,
+        default=DefaultBotProperties(parse_mode=ParseMode.MARKDOWN)
+    )
+
+def build_dispatcher() -> Dispatcher:
+    # Conversation state lives in Postgres so it survives restarts and is shared by replicas.
+    # Only polling guarantees one consumer per chat, so only then may it be cached in-process.
+    dp = Dispatcher(storage=PostgresStorage(single_consumer=config.BOT_MODE == "polling"))
+    
+    setup_error_handlers(dp)
+    dp.update.outer_middleware(DbSessionMiddleware())
+    dp.update.outer_middleware(CurrentUserMiddleware())
+    
+    dp.include_router(auth_router)
+    dp.include_router(language_router)
+    dp.include_router(supervisor_router)
+    dp.include_router(subcontractor_router)
+    dp.include_router(safety_checklist_router)
+    dp.include_router(admin_router)
+    return dp
+
 async def main():
-    global bot, dp, scheduler_task
+    global bot, dp, scheduler_task, outbox_task, webhook_runner, shards, poll_task
     
     config.setup_logging()
     
@@ -71,19 +134,15 @@ async def main():
         logger.error("Database engine not initialized. Check DATABASE_URL.")
         sys.exit(1)
     
-    logger.info("Running database migrations...")
-    try:
-        await run_migration()
-        logger.info("Database migrations completed")
-    except Exception as e:
-        logger.warning(f"Migration warning (may be normal): {e}")
-    
-    logger.info("Initializing database...")
+    logger.info("Checking database schema...")
     try:
-        await init_db()
-        logger.info("Database initialized successfully")
+        applied = await run_pending_migrations()
+        if applied:
+            logger.info(f"Applied schema migrations: {', '.join(applied)}")
+        else:
+            logger.info("Database schema is up to date")
     except Exception as e:
-        logger.error(f"Failed to initialize database: {e}")
+        logger.error(f"Failed to migrate database: {e}")
         sys.exit(1)
     
     logger.info("Setting up bootstrap admin codes...")
@@ -93,22 +152,17 @@ async def main():
         logger.warning(f"Failed to create bootstrap codes: {e}")
     
     logger.info("Initializing bot...")
-    bot = Bot(
-        token=config.BOT_TOKEN,
-        default=DefaultBotProperties(parse_mode=ParseMode.MARKDOWN)
-    )
-    dp = Dispatcher()
+    bot = build_bot()
+    if config.WORKER_PROCESSES > 0:
+        # Handlers run in the worker processes; this one only receives and routes updates.
+        shards = ShardSupervisor(config.WORKER_PROCESSES)
+        shards.start()
+        use_global_rate_share(config.WORKER_PROCESSES)  # for the outbox worker below
+    else:
+        dp = build_dispatcher()
     
     SchedulerService.set_bot(bot)
-    
-    setup_error_handlers(dp)
-    
-    dp.include_router(auth_router)
-    dp.include_router(language_router)
-    dp.include_router(supervisor_router)
-    dp.include_router(subcontractor_router)
-    dp.include_router(safety_checklist_router)
-    dp.include_router(admin_router)
+    OutboxService.set_bot(bot)
     
     loop = asyncio.get_event_loop()
     for sig in (signal.SIGTERM, signal.SIGINT):
@@ -117,18 +171,37 @@ async def main():
         except NotImplementedError:
             pass
     
-    scheduler_task = asyncio.create_task(SchedulerService.run_scheduler())
+    # Only the elected replica runs the scheduler (reminders, auto-close, archiving);
+    # the outbox worker claims rows with leases and runs everywhere.
+    scheduler_task = asyncio.create_task(
+        LeaderElection("scheduler", SCHEDULER_LOCK_KEY, SchedulerService.run_scheduler).run()
+    )
+    outbox_task = asyncio.create_task(OutboxService.run_worker())
     
-    logger.info("Starting bot polling...")
+    logger.info(f"Starting bot in {config.BOT_MODE} mode...")
     logger.info(f"Environment: {config.ENVIRONMENT}")
     logger.info(f"Reminder hours: {config.RESPONSE_REMINDER_HOURS}")
     logger.info(f"Auto-close hours: {config.JOB_AUTO_CLOSE_HOURS}")
     
     try:
-        await dp.start_polling(bot, allowed_updates=["message", "callback_query"])
+        if config.BOT_MODE == "webhook":
+            webhook_runner = await start_webhook(dp, bot, shards)
+            await stopped.wait()
+        else:
+            # A webhook left behind by an earlier webhook deployment blocks getUpdates.
+            await bot.delete_webhook()
+            if shards:
+                poll_task = asyncio.create_task(shards.poll(bot, ALLOWED_UPDATES))
+                try:
+                    await poll_task
+                except asyncio.CancelledError:
+                    pass
+            else:
+                await dp.start_polling(bot, allowed_updates=ALLOWED_UPDATES, handle_signals=False)
     except Exception as e:
-        logger.error(f"Polling error: {e}")
+        logger.error(f"{config.BOT_MODE.capitalize()} error: {e}")
     finally:
+        stopped.set()
         await shutdown()
 
 if __name__ == "__main__":
@@ -1,3 +1,5 @@
 from .error_handler import setup_error_handlers
+from .db_session import DbSessionMiddleware
+from .user_context import CurrentUserMiddleware
 
-__all__ = ['setup_error_handlers']
+__all__ = ['setup_error_handlers', 'DbSessionMiddleware', 'CurrentUserMiddleware']
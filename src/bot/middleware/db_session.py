@@ -0,0 +1,46 @@
+from typing import Any, Awaitable, Callable
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject
+from src.bot.database import async_session
+from src.bot.database.session import bind_update_session, unbind_update_session
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class DbSessionMiddleware(BaseMiddleware):
+    """One ``AsyncSession`` per update.
+
+    The session is injected as ``session`` and exposed to handlers and
+    services through ``session_scope``/``transaction_scope``, which join it
+    instead of opening their own. Each scope block is one short transaction,
+    committed when the block exits (rolled back if it raises), so the
+    connection is only checked out while queries run; handlers do their
+    Telegram calls outside the blocks. Whatever a handler leaves open on the
+    session directly is committed once the handler returns and rolled back if
+    the handler raises.
+    """
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: dict[str, Any],
+    ) -> Any:
+        if not async_session:
+            return await handler(event, data)
+
+        async with async_session() as session:
+            data["session"] = session
+            token = bind_update_session(session)
+            try:
+                result = await handler(event, data)
+                if session.in_transaction():
+                    await session.commit()
+                return result
+            except Exception:
+                if session.in_transaction():
+                    await session.rollback()
+                raise
+            finally:
+                unbind_update_session(token)
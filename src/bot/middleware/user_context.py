@@ -0,0 +1,86 @@
+from contextvars import ContextVar
+from typing import Any, Awaitable, Callable
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject
+from sqlalchemy import select
+from src.bot.database import async_session, session_scope, User
+import logging
+
+logger = logging.getLogger(__name__)
+
+_MISSING = object()
+
+# (telegram_id, User | None) for the update being processed
+_current_user: ContextVar[tuple[int, User | None] | None] = ContextVar("current_user", default=None)
+
+
+def current_user_for(telegram_id: int) -> Any:
+    """The User row loaded for this update if it belongs to ``telegram_id``.
+
+    Returns the module-level ``_MISSING`` sentinel when nothing was loaded for
+    that id, so callers can tell "not cached" apart from "not registered".
+    """
+    cached = _current_user.get()
+    if cached is None or cached[0] != telegram_id:
+        return _MISSING
+    return cached[1]
+
+
+def is_missing(value: Any) -> bool:
+    return value is _MISSING
+
+
+def forget_current_user(telegram_id: int | None = None):
+    """Drop the per-update user after registration, role, language or account changes.
+
+    With ``telegram_id`` the row is only dropped if it belongs to that user.
+    """
+    cached = _current_user.get()
+    if cached is None or (telegram_id is not None and cached[0] != telegram_id):
+        return
+    _current_user.set(None)
+
+
+class CurrentUserMiddleware(BaseMiddleware):
+    """Loads the sender's User row once per update.
+
+    Handlers can accept ``db_user``, ``user_role``, ``user_team_id`` and
+    ``user_lang``; ``get_user``, ``get_user_role``, ``get_current_user`` and
+    ``get_recipient_lang`` reuse the same row instead of querying again.
+    Registered after ``DbSessionMiddleware`` so the row is loaded through the
+    update's session and stays attached to it. The load's transaction is
+    finished before the handler runs, so no connection sits idle in a
+    transaction while the handler talks to Telegram.
+    """
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: dict[str, Any],
+    ) -> Any:
+        from_user = data.get("event_from_user")
+        if not from_user or not async_session:
+            return await handler(event, data)
+
+        user = None
+        try:
+            async with session_scope() as session:
+                result = await session.execute(
+                    select(User).where(User.telegram_id == from_user.id)
+                )
+                user = result.scalar_one_or_none()
+        except Exception as e:
+            logger.error(f"Failed to load user context for {from_user.id}: {e}")
+            return await handler(event, data)
+
+        data["db_user"] = user
+        data["user_role"] = user.role if user else None
+        data["user_team_id"] = user.team_id if user else None
+        data["user_lang"] = (user.language or "en") if user else "en"
+
+        token = _current_user.set((from_user.id, user))
+        try:
+            return await handler(event, data)
+        finally:
+            _current_user.reset(token)
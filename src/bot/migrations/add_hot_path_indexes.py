@@ -0,0 +1,79 @@
+"""
+Migration adding secondary indexes for the scheduler and listing queries.
+
+Indexes are built CONCURRENTLY so existing deployments keep serving
+while they build; fresh databases get them from the model definitions.
+Applied once as a step of the schema ledger (see ledger.py).
+"""
+import asyncio
+from sqlalchemy import text
+from src.bot.database import engine as default_engine
+
+# Names must match the Index() declarations in database/models.py
+INDEXES = [
+    ("ix_jobs_sent_sent_at", "jobs",
+     "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_jobs_sent_sent_at ON jobs (sent_at) WHERE status = 'SENT'"),
+    ("ix_jobs_subcontractor_status", "jobs",
+     "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_jobs_subcontractor_status ON jobs (subcontractor_id, status)"),
+    ("ix_jobs_supervisor_status", "jobs",
+     "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_jobs_supervisor_status ON jobs (supervisor_id, status)"),
+    ("ix_jobs_created_id", "jobs",
+     "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_jobs_created_id ON jobs (created_at, id)"),
+    ("ix_quotes_job_id", "quotes",
+     "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_quotes_job_id ON quotes (job_id)"),
+    ("ix_users_role_active_team", "users",
+     "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_users_role_active_team ON users (role, is_active, team_id)"),
+    ("ix_weekly_availability_week_sub", "weekly_availability",
+     "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_weekly_availability_week_sub ON weekly_availability (week_start, subcontractor_id)"),
+    ("ix_safety_checklists_created_at", "safety_checklists",
+     "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_safety_checklists_created_at ON safety_checklists (created_at)"),
+]
+
+
+async def ensure_indexes(engine, indexes):
+    """Build each (name, table, ddl) index concurrently, rebuilding invalid leftovers.
+
+    Raises RuntimeError naming the indexes that could not be built.
+    """
+    failed = []
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction block.
+    async with engine.connect() as conn:
+        conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+        for name, table, ddl in indexes:
+            try:
+                exists = await conn.scalar(text("SELECT to_regclass(:table) IS NOT NULL"), {"table": table})
+                if not exists:
+                    continue
+
+                # An interrupted concurrent build leaves an INVALID index behind
+                # that IF NOT EXISTS would happily skip.
+                invalid = await conn.scalar(text(
+                    "SELECT NOT i.indisvalid FROM pg_index i "
+                    "JOIN pg_class c ON c.oid = i.indexrelid WHERE c.relname = :name"
+                ), {"name": name})
+                if invalid:
+                    await conn.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {name}"))
+                    print(f"Dropped invalid index {name}")
+
+                await conn.execute(text(ddl))
+                print(f"Ensured index {name}")
+            except Exception as e:
+                failed.append(name)
+                print(f"Index {name} could not be created: {e}")
+
+    if failed:
+        # Leave the ledger step pending so the next start retries it.
+        raise RuntimeError(f"Indexes not created: {', '.join(failed)}")
+
+
+async def run_migration(engine=None):
+    engine = engine or default_engine
+    if not engine:
+        print("DATABASE_URL not set")
+        return
+
+    await ensure_indexes(engine, INDEXES)
+    print("Index migration completed!")
+
+if __name__ == "__main__":
+    asyncio.run(run_migration())
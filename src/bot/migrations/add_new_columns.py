@@ -1,24 +1,27 @@
 """
 Migration script to add new columns to the database.
-Run this once to update the database schema.
+Applied once as step 1 of the schema ledger (see ledger.py); can still be
+run by hand against DATABASE_URL.
 """
 import asyncio
 import os
 from sqlalchemy.ext.asyncio import create_async_engine
 from sqlalchemy import text
 
-async def run_migration():
-    database_url = os.getenv("DATABASE_URL", "")
-    if not database_url:
-        print("DATABASE_URL not set")
-        return
-    
-    if database_url.startswith("postgres://"):
-        database_url = database_url.replace("postgres://", "postgresql+asyncpg://", 1)
-    elif database_url.startswith("postgresql://"):
-        database_url = database_url.replace("postgresql://", "postgresql+asyncpg://", 1)
-    
-    engine = create_async_engine(database_url)
+async def run_migration(engine=None):
+    owns_engine = engine is None
+    if owns_engine:
+        database_url = os.getenv("DATABASE_URL", "")
+        if not database_url:
+            print("DATABASE_URL not set")
+            return
+        
+        if database_url.startswith("postgres://"):
+            database_url = database_url.replace("postgres://", "postgresql+asyncpg://", 1)
+        elif database_url.startswith("postgresql://"):
+            database_url = database_url.replace("postgresql://", "postgresql+asyncpg://", 1)
+        
+        engine = create_async_engine(database_url)
     
     async with engine.begin() as conn:
         # Add company_name to jobs table
@@ -485,7 +488,8 @@ async def run_migration():
         except Exception as e:
             print(f"language column may already exist: {e}")
 
-    await engine.dispose()
+    if owns_engine:
+        await engine.dispose()
     print("Migration completed!")
 
 if __name__ == "__main__":
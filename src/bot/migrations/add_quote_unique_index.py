@@ -0,0 +1,56 @@
+"""
+Migration adding a partial unique index so a subcontractor has at most one
+live (not declined) quote per job; QuoteService.submit_quote relies on it.
+
+Existing duplicates are resolved first by declining all but one per
+(job, subcontractor) - the accepted quote if any, else the earliest - so
+no quote row (possibly referenced by jobs.accepted_quote_id) is deleted.
+Applied once as a step of the schema ledger (see ledger.py).
+"""
+import asyncio
+from sqlalchemy import text
+from src.bot.database import engine as default_engine
+from src.bot.migrations.add_hot_path_indexes import ensure_indexes
+
+# Name must match the Index() declaration on Quote in database/models.py
+INDEXES = [
+    ("uq_quotes_job_sub_active", "quotes",
+     "CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS uq_quotes_job_sub_active "
+     "ON quotes (job_id, subcontractor_id) WHERE NOT is_declined"),
+]
+
+DEDUPE_SQL = """
+    UPDATE quotes q
+    SET is_declined = TRUE,
+        decline_reason = COALESCE(q.decline_reason, 'Duplicate submission')
+    FROM (
+        SELECT id, ROW_NUMBER() OVER (
+            PARTITION BY job_id, subcontractor_id
+            ORDER BY COALESCE(is_accepted, FALSE) DESC, submitted_at, id
+        ) AS rn
+        FROM quotes
+        WHERE NOT is_declined
+    ) ranked
+    WHERE q.id = ranked.id AND ranked.rn > 1
+"""
+
+
+async def run_migration(engine=None):
+    engine = engine or default_engine
+    if not engine:
+        print("DATABASE_URL not set")
+        return
+
+    async with engine.begin() as conn:
+        exists = await conn.scalar(text("SELECT to_regclass('quotes') IS NOT NULL"))
+        if not exists:
+            return
+        result = await conn.execute(text(DEDUPE_SQL))
+        print(f"Declined {result.rowcount} duplicate quotes")
+
+    # A duplicate inserted between the two steps fails the build; the ledger retries.
+    await ensure_indexes(engine, INDEXES)
+    print("Quote unique index migration completed!")
+
+if __name__ == "__main__":
+    asyncio.run(run_migration())
@@ -0,0 +1,33 @@
+"""
+Migration adding ``submitted_at`` to jobs and their cold-storage copy.
+
+Set when a subcontractor submits a job for review; the completion report
+shows it instead of the time the PDF happened to be rendered, so a cached
+report stays correct. Jobs submitted before this step keep NULL.
+Applied once as a step of the schema ledger (see ledger.py).
+"""
+import asyncio
+from sqlalchemy import text
+from src.bot.database import engine as default_engine
+
+TABLES = ["jobs", "jobs_archive"]
+
+
+async def run_migration(engine=None):
+    engine = engine or default_engine
+    if not engine:
+        print("DATABASE_URL not set")
+        return
+
+    async with engine.begin() as conn:
+        for table in TABLES:
+            exists = await conn.scalar(text("SELECT to_regclass(:table) IS NOT NULL"), {"table": table})
+            if not exists:
+                continue
+            await conn.execute(text(f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS submitted_at TIMESTAMP WITHOUT TIME ZONE"))
+            print(f"Added submitted_at column to {table}")
+
+    print("submitted_at migration completed!")
+
+if __name__ == "__main__":
+    asyncio.run(run_migration())
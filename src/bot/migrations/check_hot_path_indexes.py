@@ -0,0 +1,143 @@
+"""
+EXPLAIN-based check that the scheduler and listing queries use the
+indexes from add_hot_path_indexes.
+
+    python -m src.bot.migrations.check_hot_path_indexes
+
+Sequential scans are disabled for the check so that small development
+databases still show which index the planner *can* use. Exits non-zero
+if any query no longer matches its index.
+"""
+import asyncio
+import json
+import sys
+from datetime import datetime, timedelta
+from sqlalchemy import select, and_, text
+from sqlalchemy.dialects import postgresql
+from src.bot.database import engine, Job, JobArchive, Quote, User, WeeklyAvailability, SafetyChecklist
+from src.bot.database.models import JobStatus, UserRole
+from src.bot.utils.pagination import PAGE_SIZE, _keyset_query, encode_cursor
+
+
+def hot_path_queries() -> list[tuple[str, object, str]]:
+    """(label, statement, expected index) mirroring the queries in services/ and handlers/."""
+    now = datetime.utcnow()
+    week_start = (now - timedelta(days=now.weekday())).replace(hour=0, minute=0, second=0, microsecond=0)
+    # Built by the pagination helper itself, so the check sees the SQL the app sends.
+    cursor = encode_cursor(now, 1_000_000)
+    history = select(Job).where(Job.status != JobStatus.ARCHIVED)
+    return [
+        (
+            "scheduler: response reminders",
+            select(Job).where(and_(
+                Job.status == JobStatus.SENT,
+                Job.sent_at < now - timedelta(hours=24),
+                Job.reminder_sent == False,
+                Job.subcontractor_id != None,
+            )),
+            "ix_jobs_sent_sent_at",
+        ),
+        (
+            "scheduler: auto-close",
+            select(Job).where(and_(Job.status == JobStatus.SENT, Job.sent_at < now - timedelta(hours=72))),
+            "ix_jobs_sent_sent_at",
+        ),
+        (
+            "supervisor: my jobs",
+            select(Job).where(
+                Job.supervisor_id == 1,
+                Job.status.in_([JobStatus.SENT, JobStatus.ACCEPTED, JobStatus.IN_PROGRESS]),
+            ).order_by(Job.created_at.desc()),
+            "ix_jobs_supervisor_status",
+        ),
+        (
+            "subcontractor: active jobs",
+            select(Job).where(
+                Job.subcontractor_id == 1,
+                Job.status.in_([JobStatus.ACCEPTED, JobStatus.IN_PROGRESS]),
+            ).order_by(Job.created_at.desc()),
+            "ix_jobs_subcontractor_status",
+        ),
+        (
+            "job history: first page",
+            _keyset_query(history, Job, None, False, PAGE_SIZE),
+            "ix_jobs_created_id",
+        ),
+        (
+            "job history: older page",
+            _keyset_query(history, Job, cursor, False, PAGE_SIZE),
+            "ix_jobs_created_id",
+        ),
+        (
+            "job history: newer page",
+            _keyset_query(history, Job, cursor, True, PAGE_SIZE),
+            "ix_jobs_created_id",
+        ),
+        (
+            "archive: cold tier page",
+            _keyset_query(select(JobArchive), JobArchive, cursor, False, PAGE_SIZE),
+            "ix_jobs_archive_created_id",
+        ),
+        (
+            "quotes for job",
+            select(Quote).where(Quote.job_id == 1).order_by(Quote.submitted_at),
+            "ix_quotes_job_id",
+        ),
+        (
+            "active subcontractors in team",
+            select(User).where(User.role == UserRole.SUBCONTRACTOR, User.is_active == True, User.team_id == 1),
+            "ix_users_role_active_team",
+        ),
+        (
+            "weekly availability overview",
+            select(WeeklyAvailability).where(WeeklyAvailability.week_start == week_start),
+            "ix_weekly_availability_week_sub",
+        ),
+        (
+            "weekly availability for subcontractor",
+            select(WeeklyAvailability).where(
+                WeeklyAvailability.subcontractor_id == 1,
+                WeeklyAvailability.week_start == week_start,
+            ),
+            "ix_weekly_availability_week_sub",
+        ),
+        (
+            "recent safety checklists",
+            select(SafetyChecklist).order_by(SafetyChecklist.created_at.desc()).limit(20),
+            "ix_safety_checklists_created_at",
+        ),
+    ]
+
+
+def _index_names(plan: dict) -> set[str]:
+    names = {plan["Index Name"]} if "Index Name" in plan else set()
+    for child in plan.get("Plans", []):
+        names |= _index_names(child)
+    return names
+
+
+async def run_check() -> bool:
+    if not engine:
+        print("DATABASE_URL not set")
+        return False
+
+    ok = True
+    async with engine.connect() as conn:
+        await conn.execute(text("SET LOCAL enable_seqscan = off"))
+        for label, stmt, expected in hot_path_queries():
+            sql = str(stmt.compile(dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True}))
+            raw = await conn.scalar(text(f"EXPLAIN (FORMAT JSON) {sql}"))
+            plan = (json.loads(raw) if isinstance(raw, str) else raw)[0]["Plan"]
+            used = _index_names(plan)
+            if expected in used:
+                print(f"OK    {label}: {expected}")
+            else:
+                ok = False
+                print(f"FAIL  {label}: expected {expected}, plan uses {sorted(used) or 'no index'}")
+        await conn.rollback()
+
+    await engine.dispose()
+    return ok
+
+if __name__ == "__main__":
+    sys.exit(0 if asyncio.run(run_check()) else 1)
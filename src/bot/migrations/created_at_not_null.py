@@ -0,0 +1,37 @@
+"""
+Migration making ``created_at`` NOT NULL on the keyset-paginated tables.
+
+Keyset pages filter and order on the bare ``(created_at, id)`` pair so the
+planner can walk the ``(created_at, id)`` indexes; that needs no NULLs in the
+column. Rows missing a timestamp are backfilled with the epoch, which keeps
+them where they sorted before (oldest, last page).
+Applied once as a step of the schema ledger (see ledger.py).
+"""
+import asyncio
+from sqlalchemy import text
+from src.bot.database import engine as default_engine
+
+TABLES = ["users", "jobs", "jobs_archive"]
+
+
+async def run_migration(engine=None):
+    engine = engine or default_engine
+    if not engine:
+        print("DATABASE_URL not set")
+        return
+
+    async with engine.begin() as conn:
+        for table in TABLES:
+            exists = await conn.scalar(text("SELECT to_regclass(:table) IS NOT NULL"), {"table": table})
+            if not exists:
+                continue
+            result = await conn.execute(text(
+                f"UPDATE {table} SET created_at = TIMESTAMP '1970-01-01' WHERE created_at IS NULL"
+            ))
+            await conn.execute(text(f"ALTER TABLE {table} ALTER COLUMN created_at SET NOT NULL"))
+            print(f"{table}.created_at is NOT NULL ({result.rowcount} rows backfilled)")
+
+    print("created_at migration completed!")
+
+if __name__ == "__main__":
+    asyncio.run(run_migration())
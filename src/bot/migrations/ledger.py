@@ -0,0 +1,128 @@
+"""
+Schema version ledger.
+
+Every schema change is a numbered step below. Applied steps are recorded in
+``schema_migrations``, so a start against an up-to-date database costs one
+query, and only pending steps ever run. Steps must be idempotent: a fresh
+database runs all of them against the current models.
+
+    python -m src.bot.migrations.ledger
+"""
+import asyncio
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
+from src.bot.database import engine as default_engine, Base, JobArchive, QuoteArchive, FsmState
+from src.bot.migrations import add_new_columns, add_hot_path_indexes, add_quote_unique_index, created_at_not_null, add_submitted_at
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Arbitrary constant shared by every replica; serializes concurrent deploys.
+LOCK_KEY = 7_241_001
+
+
+async def _legacy_columns(engine):
+    await add_new_columns.run_migration(engine)
+
+
+async def _create_all(engine):
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+
+async def _hot_path_indexes(engine):
+    await add_hot_path_indexes.run_migration(engine)
+
+
+async def _archive_tables(engine):
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all, tables=[JobArchive.__table__, QuoteArchive.__table__])
+
+
+async def _fsm_table(engine):
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all, tables=[FsmState.__table__])
+
+
+async def _quote_unique_index(engine):
+    await add_quote_unique_index.run_migration(engine)
+
+
+async def _created_at_not_null(engine):
+    await created_at_not_null.run_migration(engine)
+
+
+async def _submitted_at(engine):
+    await add_submitted_at.run_migration(engine)
+
+
+# (version, name, step) - append only, never renumber.
+MIGRATIONS = [
+    (1, "legacy_add_new_columns", _legacy_columns),
+    (2, "create_all", _create_all),
+    (3, "hot_path_indexes", _hot_path_indexes),
+    # Re-runs the (idempotent) index list for ix_jobs_created_id.
+    (4, "jobs_keyset_index", _hot_path_indexes),
+    (5, "cold_storage_tables", _archive_tables),
+    (6, "quotes_unique_active", _quote_unique_index),
+    (7, "fsm_states_table", _fsm_table),
+    (8, "created_at_not_null", _created_at_not_null),
+    (9, "jobs_submitted_at", _submitted_at),
+]
+
+
+async def _current_version(conn) -> int:
+    try:
+        return await conn.scalar(text("SELECT COALESCE(MAX(version), 0) FROM schema_migrations")) or 0
+    except DBAPIError:
+        # No ledger yet.
+        await conn.rollback()
+        return 0
+
+
+async def run_pending_migrations(engine=None) -> list[str]:
+    """Apply every step newer than the recorded schema version.
+
+    Returns the names of the steps applied. Raises if a step fails; steps
+    before it stay recorded and the failed one is retried on the next start.
+    """
+    engine = engine or default_engine
+    if not engine:
+        return []
+
+    latest = MIGRATIONS[-1][0]
+    async with engine.connect() as conn:
+        if await _current_version(conn) >= latest:
+            return []
+
+    applied = []
+    async with engine.connect() as conn:
+        conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+        await conn.execute(text("SELECT pg_advisory_lock(:key)"), {"key": LOCK_KEY})
+        try:
+            await conn.execute(text("""
+                CREATE TABLE IF NOT EXISTS schema_migrations (
+                    version INTEGER PRIMARY KEY,
+                    name VARCHAR(100) NOT NULL,
+                    applied_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+                )
+            """))
+            # Another replica may have migrated while we waited for the lock.
+            version = await _current_version(conn)
+            for step_version, name, step in MIGRATIONS:
+                if step_version <= version:
+                    continue
+                logger.info(f"Applying schema migration {step_version}: {name}")
+                await step(engine)
+                await conn.execute(
+                    text("INSERT INTO schema_migrations (version, name) VALUES (:version, :name)"),
+                    {"version": step_version, "name": name},
+                )
+                applied.append(name)
+        finally:
+            await conn.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": LOCK_KEY})
+
+    return applied
+
+if __name__ == "__main__":
+    print(asyncio.run(run_pending_migrations()))
@@ -1,9 +1,11 @@
 from datetime import datetime
 from sqlalchemy import select
-from src.bot.database import async_session, AccessCode, User, Team
+from sqlalchemy.ext.asyncio import AsyncSession
+from src.bot.database import async_session, transaction_scope, commit_scope, AccessCode, User, Team
 from src.bot.database.models import UserRole
 from src.bot.config import config
 from src.bot.utils.roles import role_display_name
+from src.bot.utils.user_cache import UserProfileCache
 import logging
 
 logger = logging.getLogger(__name__)
@@ -66,6 +68,7 @@ class AccessCodeService:
                     session.add(user)
                 
                 await session.commit()
+                UserProfileCache.invalidate(telegram_id)
                 return True, "Welcome! You have been registered as a General Manager."
             
             result = await session.execute(
@@ -110,6 +113,7 @@ class AccessCodeService:
             access_code.current_uses += 1
             
             await session.commit()
+            UserProfileCache.invalidate(telegram_id)
             
             role_name = role_display_name(access_code.role)
             return True, f"Welcome! You have been registered as a {role_name}."
@@ -155,12 +159,13 @@ class AccessCodeService:
         region_id: int | None = None,
         custom_role_id: int | None = None,
         created_by_id: int | None = None,
-        max_uses: int = 1
+        max_uses: int = 1,
+        session: AsyncSession | None = None
     ) -> bool:
         if not async_session:
             return False
 
-        async with async_session() as session:
+        async with transaction_scope(session) as session:
             existing = await session.execute(
                 select(AccessCode).where(AccessCode.code == code)
             )
@@ -178,5 +183,5 @@ class AccessCodeService:
                 is_active=True
             )
             session.add(access_code)
-            await session.commit()
+            await commit_scope(session)
             return True
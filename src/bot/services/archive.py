@@ -1,7 +1,13 @@
 from datetime import datetime, timedelta
-from sqlalchemy import select, and_
-from src.bot.database import async_session, Job
+from typing import Awaitable, Callable
+from sqlalchemy import select, update, insert, delete, exists, and_, or_, func
+from sqlalchemy.ext.asyncio import AsyncSession
+from src.bot.database import (
+    async_session, session_scope, read_scope, transaction_scope, commit_scope, Job, Quote, JobArchive, QuoteArchive,
+    SafetyChecklist, SafetyChecklistRequest, UnavailabilityNotice
+)
 from src.bot.database.models import JobStatus
+from src.bot.utils.pagination import fetch_merged_page, NEXT, PAGE_SIZE
 from src.bot.config import config
 import logging
 
@@ -9,49 +15,196 @@ logger = logging.getLogger(__name__)
 
 class ArchiveService:
     @staticmethod
-    async def archive_old_jobs() -> int:
+    async def archive_old_jobs(
+        batch_size: int | None = None,
+        on_progress: Callable[[int], Awaitable[None]] | None = None
+    ) -> int:
+        """
+        Archive finished jobs older than ARCHIVE_AFTER_DAYS in chunks.
+        
+        Each chunk is one UPDATE ... WHERE id IN (SELECT ... LIMIT n) RETURNING id,
+        committed on its own, so memory and lock time stay bounded by the chunk
+        size. An interrupted run simply resumes on the next call, and rows
+        locked by a concurrent run are skipped rather than waited on.
+        on_progress, if given, is awaited with the running total after each chunk.
+        
+        Returns: number of jobs archived
+        """
         if not async_session:
             return 0
         
+        batch_size = batch_size or config.ARCHIVE_BATCH_SIZE
         cutoff_date = datetime.utcnow() - timedelta(days=config.ARCHIVE_AFTER_DAYS)
         
-        async with async_session() as session:
-            result = await session.execute(
-                select(Job).where(
+        total = 0
+        while True:
+            batch = (
+                select(Job.id)
+                .where(
                     and_(
                         Job.status.in_([JobStatus.COMPLETED, JobStatus.CANCELLED]),
                         Job.created_at < cutoff_date,
                         Job.archived_at == None
                     )
                 )
+                .order_by(Job.id)
+                .limit(batch_size)
+                .with_for_update(skip_locked=True)
+            )
+            stmt = (
+                update(Job)
+                .where(Job.id.in_(batch.scalar_subquery()))
+                .values(status=JobStatus.ARCHIVED, archived_at=datetime.utcnow())
+                .returning(Job.id)
+                .execution_options(synchronize_session=False)
             )
-            jobs = result.scalars().all()
             
-            count = 0
-            for job in jobs:
-                job.status = JobStatus.ARCHIVED
-                job.archived_at = datetime.utcnow()
-                count += 1
+            async with async_session() as session:
+                result = await session.execute(stmt)
+                archived_ids = result.scalars().all()
+                await session.commit()
             
-            await session.commit()
+            if not archived_ids:
+                break
             
-            if count > 0:
-                logger.info(f"Archived {count} jobs older than {config.ARCHIVE_AFTER_DAYS} days")
+            total += len(archived_ids)
+            logger.info(f"Archived chunk of {len(archived_ids)} jobs ({total} so far)")
+            if on_progress:
+                await on_progress(total)
             
-            return count
+            if len(archived_ids) < batch_size:
+                break
+        
+        if total > 0:
+            logger.info(f"Archived {total} jobs older than {config.ARCHIVE_AFTER_DAYS} days")
+        
+        return total
     
     @staticmethod
-    async def get_archived_jobs(team_id: int | None = None, limit: int = 50) -> list[Job]:
+    async def move_to_cold_storage(batch_size: int | None = None) -> int:
+        """
+        Move ARCHIVED jobs and their quotes into jobs_archive / quotes_archive.
+        
+        Runs in committed chunks like archive_old_jobs: each chunk copies the
+        rows and deletes them from the hot tables in one transaction, so a
+        job is always in exactly one tier. Jobs still referenced by safety
+        checklists, checklist requests or unavailability notices stay put,
+        since those tables keep foreign keys to jobs.
+        
+        Returns: number of jobs moved
+        """
         if not async_session:
-            return []
+            return 0
+        
+        batch_size = batch_size or config.ARCHIVE_BATCH_SIZE
+        jobs, quotes = Job.__table__, Quote.__table__
+        
+        referenced = or_(
+            exists().where(SafetyChecklist.job_id == Job.id),
+            exists().where(SafetyChecklistRequest.job_id == Job.id),
+            exists().where(UnavailabilityNotice.job_id == Job.id),
+        )
+        batch = (
+            select(Job.id)
+            .where(Job.status == JobStatus.ARCHIVED, ~referenced)
+            .order_by(Job.id)
+            .limit(batch_size)
+            .with_for_update(skip_locked=True)
+        )
         
-        async with async_session() as session:
-            query = select(Job).where(Job.status == JobStatus.ARCHIVED)
+        total = 0
+        while True:
+            async with async_session() as session:
+                job_ids = (await session.execute(batch)).scalars().all()
+                if not job_ids:
+                    break
+                
+                quote_ids = select(quotes.c.id).where(quotes.c.job_id.in_(job_ids))
+                await session.execute(
+                    insert(JobArchive.__table__).from_select(
+                        [c.name for c in jobs.c], select(*jobs.c).where(jobs.c.id.in_(job_ids))
+                    )
+                )
+                await session.execute(
+                    insert(QuoteArchive.__table__).from_select(
+                        [c.name for c in quotes.c], select(*quotes.c).where(quotes.c.job_id.in_(job_ids))
+                    )
+                )
+                # jobs.accepted_quote_id -> quotes and quotes.job_id -> jobs: break the cycle first
+                await session.execute(
+                    update(jobs).where(jobs.c.accepted_quote_id.in_(quote_ids)).values(accepted_quote_id=None)
+                )
+                await session.execute(delete(quotes).where(quotes.c.job_id.in_(job_ids)))
+                await session.execute(delete(jobs).where(jobs.c.id.in_(job_ids)))
+                await session.commit()
+            
+            total += len(job_ids)
+            if len(job_ids) < batch_size:
+                break
+        
+        if total > 0:
+            logger.info(f"Moved {total} archived jobs to cold storage")
+        
+        return total
+    
+    @staticmethod
+    async def get_archived_jobs_page(
+        team_id: int | None = None,
+        cursor: str | None = None,
+        direction: str = NEXT,
+        page_size: int = PAGE_SIZE,
+        session: AsyncSession | None = None
+    ) -> tuple[list[Job | JobArchive], str | None, str | None]:
+        """
+        One keyset page of archived jobs across both tiers, newest first.
+        Returns: (jobs, prev_cursor, next_cursor)
+        """
+        if not async_session:
+            return [], None, None
+        
+        async with read_scope(session) as session:
+            hot = select(Job).where(Job.status == JobStatus.ARCHIVED)
+            cold = select(JobArchive)
             
             if team_id:
-                query = query.where(Job.team_id == team_id)
+                hot = hot.where(Job.team_id == team_id)
+                cold = cold.where(JobArchive.team_id == team_id)
+            
+            return await fetch_merged_page(session, [(hot, Job), (cold, JobArchive)], cursor, direction, page_size)
+    
+    @staticmethod
+    async def count_archived_jobs(team_id: int | None = None, session: AsyncSession | None = None) -> int:
+        if not async_session:
+            return 0
+        
+        async with read_scope(session) as session:
+            hot = select(func.count(Job.id)).where(Job.status == JobStatus.ARCHIVED)
+            cold = select(func.count(JobArchive.id))
             
-            query = query.order_by(Job.archived_at.desc()).limit(limit)
+            if team_id:
+                hot = hot.where(Job.team_id == team_id)
+                cold = cold.where(JobArchive.team_id == team_id)
             
-            result = await session.execute(query)
-            return list(result.scalars().all())
+            return (await session.scalar(hot) or 0) + (await session.scalar(cold) or 0)
+    
+    @staticmethod
+    async def get_job(job_id: int, session: AsyncSession | None = None) -> Job | JobArchive | None:
+        """Look a job up in the hot table, then in cold storage (read-only use)."""
+        if not async_session:
+            return None
+        
+        async with session_scope(session) as session:
+            job = await session.get(Job, job_id)
+            if job is None:
+                job = await session.get(JobArchive, job_id)
+            return job
+    
+    @staticmethod
+    async def delete_cold_job(job_id: int, session: AsyncSession | None = None) -> None:
+        if not async_session:
+            return
+        
+        async with transaction_scope(session) as session:
+            await session.execute(delete(QuoteArchive).where(QuoteArchive.job_id == job_id))
+            await session.execute(delete(JobArchive).where(JobArchive.id == job_id))
+            await commit_scope(session)
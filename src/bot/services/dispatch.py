@@ -0,0 +1,164 @@
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Iterable
+from aiogram.exceptions import TelegramRetryAfter
+from src.bot.config import config
+from src.bot.database import isolate_update_session
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class TokenBucket:
+    """Classic token bucket: ``rate`` tokens per second, bursting up to ``capacity``."""
+
+    def __init__(self, rate: float, capacity: float | None = None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else rate
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    @property
+    def idle(self) -> bool:
+        self._refill()
+        return self._tokens >= self.capacity
+
+    async def acquire(self):
+        # Waiters queue on the lock, so tokens are handed out in FIFO order.
+        async with self._lock:
+            while True:
+                self._refill()
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+class TelegramRateLimiter:
+    """Global + per-chat token buckets mirroring Telegram's outbound limits."""
+
+    MAX_CHAT_BUCKETS = 10000
+
+    def __init__(self, global_rate: float, per_chat_rate: float, per_chat_burst: float):
+        self.global_bucket = TokenBucket(global_rate)
+        self.per_chat_rate = per_chat_rate
+        self.per_chat_burst = per_chat_burst
+        self._chat_buckets: OrderedDict[int, TokenBucket] = OrderedDict()
+
+    def _chat_bucket(self, chat_id: int) -> TokenBucket:
+        bucket = self._chat_buckets.get(chat_id)
+        if bucket is None:
+            bucket = TokenBucket(self.per_chat_rate, self.per_chat_burst)
+            self._chat_buckets[chat_id] = bucket
+            # Drop idle buckets once the map grows; an idle bucket is full anyway.
+            while len(self._chat_buckets) > self.MAX_CHAT_BUCKETS:
+                oldest_id, oldest = next(iter(self._chat_buckets.items()))
+                if not oldest.idle:
+                    break
+                del self._chat_buckets[oldest_id]
+        else:
+            self._chat_buckets.move_to_end(chat_id)
+        return bucket
+
+    async def wait(self, chat_id: int):
+        # Per-chat first so a slow chat never holds a global token while it waits.
+        await self._chat_bucket(chat_id).acquire()
+        await self.global_bucket.acquire()
+
+
+class DispatchService:
+    limiter = TelegramRateLimiter(
+        global_rate=config.TELEGRAM_GLOBAL_RATE,
+        per_chat_rate=config.TELEGRAM_PER_CHAT_RATE,
+        per_chat_burst=config.TELEGRAM_PER_CHAT_BURST,
+    )
+    MAX_RETRIES = 3
+
+    @classmethod
+    async def call(
+        cls, chat_id: int, method: Callable[..., Awaitable[Any]], *args,
+        max_retries: int | None = None, **kwargs
+    ) -> Any:
+        """Invoke a Bot API method for ``chat_id`` through the rate limiter.
+
+        ``TelegramRetryAfter`` is honoured by sleeping for the requested period
+        and retrying, up to ``max_retries`` (default ``MAX_RETRIES``) times;
+        with ``max_retries=0`` it is raised straight away.
+        """
+        retries = cls.MAX_RETRIES if max_retries is None else max_retries
+        attempt = 0
+        while True:
+            await cls.limiter.wait(chat_id)
+            try:
+                return await method(chat_id, *args, **kwargs)
+            except TelegramRetryAfter as e:
+                attempt += 1
+                if attempt > retries:
+                    raise
+                logger.warning(f"Flood control for chat {chat_id}, retrying in {e.retry_after}s")
+                await asyncio.sleep(e.retry_after)
+
+    @classmethod
+    async def fan_out(
+        cls,
+        recipients: Iterable[Any],
+        deliver: Callable[[Any], Awaitable[None]],
+        on_progress: Callable[[int, int, int], Awaitable[None]] | None = None,
+        concurrency: int | None = None,
+        progress_interval: float = 2.0,
+    ) -> tuple[int, int]:
+        """Run ``deliver(recipient)`` for every recipient concurrently.
+
+        ``deliver`` should route its Bot API calls through :meth:`call` so the
+        global and per-chat limits hold across all concurrent deliveries.
+        ``on_progress(done, failed, total)`` is called at most once per
+        ``progress_interval`` seconds while the fan-out runs.
+
+        Returns: (sent_count, failed_count)
+        """
+        recipients = list(recipients)
+        total = len(recipients)
+        semaphore = asyncio.Semaphore(concurrency or config.DISPATCH_CONCURRENCY)
+        counts = {"sent": 0, "failed": 0}
+
+        async def worker(recipient):
+            isolate_update_session()
+            async with semaphore:
+                try:
+                    await deliver(recipient)
+                    counts["sent"] += 1
+                except Exception as e:
+                    counts["failed"] += 1
+                    logger.error(f"[DISPATCH FAILED] recipient={recipient!r}: {e}")
+
+        async def reporter():
+            last = None
+            while True:
+                await asyncio.sleep(progress_interval)
+                current = (counts["sent"] + counts["failed"], counts["failed"])
+                if current != last:
+                    last = current
+                    try:
+                        await on_progress(current[0], current[1], total)
+                    except Exception as e:
+                        logger.warning(f"Dispatch progress update failed: {e}")
+
+        progress_task = asyncio.create_task(reporter()) if on_progress and total else None
+        try:
+            await asyncio.gather(*(worker(r) for r in recipients))
+        finally:
+            if progress_task:
+                progress_task.cancel()
+                try:
+                    await progress_task
+                except asyncio.CancelledError:
+                    pass
+
+        return counts["sent"], counts["failed"]
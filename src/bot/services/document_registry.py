@@ -0,0 +1,93 @@
+import asyncio
+import hashlib
+from collections import OrderedDict
+from typing import Any
+from aiogram.exceptions import TelegramBadRequest
+from aiogram.types import BufferedInputFile, Message
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class DocumentRegistry:
+    """Remembers the Telegram ``file_id`` of every generated document we upload.
+
+    Documents are keyed by a hash of their bytes and filename. The first send
+    uploads the bytes; every later send of the same artifact reuses the
+    ``file_id`` Telegram returned, so nothing is re-uploaded.
+    """
+
+    MAX_ENTRIES = 2048
+    _file_ids: "OrderedDict[str, str]" = OrderedDict()
+    _inflight: dict[str, asyncio.Future] = {}
+
+    @staticmethod
+    def artifact_key(content: bytes, filename: str) -> str:
+        digest = hashlib.sha256(content)
+        digest.update(b"\0" + filename.encode("utf-8"))
+        return digest.hexdigest()
+
+    @classmethod
+    def _remember(cls, key: str, file_id: str):
+        cls._file_ids[key] = file_id
+        cls._file_ids.move_to_end(key)
+        while len(cls._file_ids) > cls.MAX_ENTRIES:
+            cls._file_ids.popitem(last=False)
+
+    @classmethod
+    async def send_document(
+        cls,
+        bot: Any,
+        chat_id: int,
+        content: bytes,
+        filename: str,
+        caption: str | None = None,
+        **kwargs,
+    ) -> Message:
+        key = cls.artifact_key(content, filename)
+
+        # Another send of the same artifact is uploading right now; wait for its file_id.
+        pending = cls._inflight.get(key)
+        if pending is not None and key not in cls._file_ids:
+            try:
+                await asyncio.shield(pending)
+            except Exception:
+                pass
+
+        file_id = cls._file_ids.get(key)
+        if file_id:
+            try:
+                return await bot.send_document(chat_id, file_id, caption=caption, **kwargs)
+            except TelegramBadRequest as e:
+                # Stale or foreign file_id - forget it and upload again.
+                logger.warning(f"Cached file_id for {filename} rejected, re-uploading: {e}")
+                cls._file_ids.pop(key, None)
+
+        future = asyncio.get_running_loop().create_future()
+        cls._inflight.setdefault(key, future)
+        try:
+            message = await bot.send_document(
+                chat_id,
+                BufferedInputFile(content, filename=filename),
+                caption=caption,
+                **kwargs,
+            )
+            if message and message.document:
+                cls._remember(key, message.document.file_id)
+            return message
+        finally:
+            if cls._inflight.get(key) is future:
+                del cls._inflight[key]
+            future.set_result(None)
+
+    @classmethod
+    async def answer_document(
+        cls,
+        message: Message,
+        content: bytes,
+        filename: str,
+        caption: str | None = None,
+        **kwargs,
+    ) -> Message:
+        """Registry-backed equivalent of ``message.answer_document``."""
+        return await cls.send_document(message.bot, message.chat.id, content, filename, caption=caption, **kwargs)
@@ -0,0 +1,312 @@
+import asyncio
+import copy
+import json
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta
+from enum import Enum
+from typing import Any, Mapping
+from aiogram.exceptions import DataNotDictLikeError
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import BaseStorage, DefaultKeyBuilder, StateType, StorageKey
+from sqlalchemy import Text, cast, delete, or_, select
+from sqlalchemy.dialects.postgresql import JSONB, insert as pg_insert
+from src.bot.config import config
+from src.bot.database import async_session, FsmState
+from src.bot.database.models import UserRole, JobStatus, JobType, AvailabilityStatus, TeamType
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Enums handlers keep in FSM data; they are restored as members, not bare values.
+_ENUMS = {cls.__name__: cls for cls in (UserRole, JobStatus, JobType, AvailabilityStatus, TeamType)}
+
+
+class _FsmEncoder(json.JSONEncoder):
+    def default(self, o):
+        if isinstance(o, datetime):
+            return {"__datetime__": o.isoformat()}
+        if isinstance(o, date):
+            return {"__date__": o.isoformat()}
+        if isinstance(o, Enum) and type(o).__name__ in _ENUMS:
+            return {"__enum__": type(o).__name__, "value": o.value}
+        return super().default(o)
+
+
+def _decode_hook(obj: dict):
+    if len(obj) == 1 and "__datetime__" in obj:
+        return datetime.fromisoformat(obj["__datetime__"])
+    if len(obj) == 1 and "__date__" in obj:
+        return date.fromisoformat(obj["__date__"])
+    if len(obj) == 2 and "__enum__" in obj and obj["__enum__"] in _ENUMS:
+        return _ENUMS[obj["__enum__"]](obj["value"])
+    return obj
+
+
+def encode_data(data: Mapping[str, Any]) -> str:
+    return json.dumps(data, cls=_FsmEncoder, ensure_ascii=False)
+
+
+def decode_data(payload: str | None) -> dict[str, Any]:
+    return json.loads(payload, object_hook=_decode_hook) if payload else {}
+
+
+_MISSING = object()
+
+
+@dataclass
+class _Record:
+    state: Any = _MISSING
+    data: Any = _MISSING
+    dirty: set[str] = field(default_factory=set)  # "state" / "data" not yet written
+    version: int = 0
+    loaded_at: float = 0.0
+    failures: int = 0  # consecutive flushes that could not write it
+    loading: asyncio.Lock = field(default_factory=asyncio.Lock)
+
+
+class PostgresStorage(BaseStorage):
+    """aiogram FSM storage in the ``fsm_states`` table.
+
+    By default every call goes straight to the table: reads always see the
+    latest write from any process, ``set_state``/``set_data`` are one upsert
+    and ``update_data`` is one upsert that merges the new keys in SQL and
+    returns the result. Use this whenever several processes may handle the
+    same chat (webhook replicas behind a load balancer).
+
+    With ``single_consumer`` (polling: one process, or one shard per chat)
+    nobody else writes this process's keys, so they are cached and written
+    behind: writes land in a per-key record and are flushed together after
+    ``FSM_FLUSH_DELAY_MS``, so the several ``update_data``/``set_state`` calls
+    of one handler cost a single upsert. A crash can lose at most the last
+    flush window of writes; clean records are dropped after ``CACHE_SECONDS``
+    to bound memory. A failed flush is retried key by key, so one bad key
+    cannot hold the others back; a key that still fails after
+    ``MAX_FLUSH_ATTEMPTS`` flushes is logged and dropped.
+
+    In both modes a cleared key (no state, empty data) is deleted instead of
+    stored, and keys idle for ``FSM_STATE_TTL_HOURS`` are removed by
+    :meth:`purge_expired`.
+    """
+
+    CACHE_SECONDS = 60.0
+    MAX_FLUSH_ATTEMPTS = 5
+
+    def __init__(self, single_consumer: bool = False, flush_delay: float | None = None):
+        self.key_builder = DefaultKeyBuilder(with_bot_id=True, with_destiny=True)
+        self.single_consumer = single_consumer
+        self.flush_delay = flush_delay if flush_delay is not None else config.FSM_FLUSH_DELAY_MS / 1000
+        self._records: dict[str, _Record] = {}
+        self._dirty: set[str] = set()
+        self._flush_task: asyncio.Task | None = None
+        self._flush_lock = asyncio.Lock()
+
+    def _fresh(self, record: _Record) -> bool:
+        return (
+            bool(record.dirty)
+            or record.loading.locked()
+            or asyncio.get_running_loop().time() - record.loaded_at < self.CACHE_SECONDS
+        )
+
+    async def _record(self, key: StorageKey, need: str | None = None) -> tuple[str, _Record]:
+        """The record for ``key``; reads the row if ``need`` ("state"/"data") is not known yet."""
+        k = self.key_builder.build(key)
+        record = self._records.get(k)
+        if record is None or not self._fresh(record):
+            record = self._records[k] = _Record()
+
+        if need and getattr(record, need) is _MISSING:
+            # One read per key; concurrent callers wait for it and share the record.
+            async with record.loading:
+                if getattr(record, need) is _MISSING:
+                    row = await self._read_row(k)
+                    # Fields written while we were reading win over the row.
+                    if "state" not in record.dirty:
+                        record.state = row.state if row else None
+                    if "data" not in record.dirty:
+                        record.data = decode_data(row.data_json) if row else {}
+                    record.loaded_at = asyncio.get_running_loop().time()
+        return k, record
+
+    def _mark_dirty(self, k: str, record: _Record, part: str):
+        record.dirty.add(part)
+        record.version += 1
+        self._dirty.add(k)
+        if self._flush_task is None:
+            self._flush_task = asyncio.create_task(self._flush_later())
+
+    async def _flush_later(self):
+        await asyncio.sleep(self.flush_delay)
+        self._flush_task = None
+        await self.flush()
+
+    async def _read_row(self, k: str):
+        async with async_session() as session:
+            return (await session.execute(
+                select(FsmState.state, FsmState.data_json).where(FsmState.key == k)
+            )).first()
+
+    async def _write_through(self, k: str, merge: bool = False, **values) -> str | None:
+        """Upsert ``values`` for ``k`` and return the stored ``data_json``; a cleared key is deleted.
+
+        With ``merge`` the given ``data_json`` keys are merged into the stored ones.
+        """
+        async with async_session() as session:
+            stmt = pg_insert(FsmState).values(key=k, updated_at=datetime.utcnow(), **values)
+            set_ = {c: stmt.excluded[c] for c in ["updated_at", *values]}
+            if merge:
+                set_["data_json"] = cast(
+                    cast(FsmState.data_json, JSONB).op("||")(cast(stmt.excluded.data_json, JSONB)), Text
+                )
+            data_json = await session.scalar(
+                stmt.on_conflict_do_update(index_elements=[FsmState.key], set_=set_).returning(FsmState.data_json)
+            )
+            if values.get("state", "") is None or values.get("data_json") == "{}":
+                await session.execute(delete(FsmState).where(
+                    FsmState.key == k, FsmState.state.is_(None), or_(FsmState.data_json == "{}", FsmState.data_json.is_(None))
+                ))
+            await session.commit()
+            return data_json
+
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        state = state.state if isinstance(state, State) else state
+        if not self.single_consumer:
+            await self._write_through(self.key_builder.build(key), state=state)
+            return
+        k, record = await self._record(key)
+        record.state = state
+        self._mark_dirty(k, record, "state")
+
+    async def get_state(self, key: StorageKey) -> str | None:
+        if not self.single_consumer:
+            row = await self._read_row(self.key_builder.build(key))
+            return row.state if row else None
+        _, record = await self._record(key, "state")
+        return record.state
+
+    async def set_data(self, key: StorageKey, data: Mapping[str, Any]) -> None:
+        if not isinstance(data, dict):
+            raise DataNotDictLikeError(f"Data must be a dict or dict-like object, got {type(data).__name__}")
+        if not self.single_consumer:
+            await self._write_through(self.key_builder.build(key), data_json=encode_data(data))
+            return
+        k, record = await self._record(key)
+        record.data = copy.deepcopy(data)
+        self._mark_dirty(k, record, "data")
+
+    async def get_data(self, key: StorageKey) -> dict[str, Any]:
+        if not self.single_consumer:
+            row = await self._read_row(self.key_builder.build(key))
+            return decode_data(row.data_json) if row else {}
+        _, record = await self._record(key, "data")
+        return copy.deepcopy(record.data)
+
+    async def update_data(self, key: StorageKey, data: Mapping[str, Any]) -> dict[str, Any]:
+        if not self.single_consumer:
+            # Merged in SQL: concurrent updates from other processes are not overwritten.
+            return decode_data(await self._write_through(
+                self.key_builder.build(key), data_json=encode_data(data), merge=True
+            ))
+        k, record = await self._record(key, "data")
+        record.data.update(copy.deepcopy(data))
+        self._mark_dirty(k, record, "data")
+        return copy.deepcopy(record.data)
+
+    async def _write_records(self, snapshot: dict[str, _Record]):
+        """Write the pending parts of ``snapshot`` in one transaction."""
+        now = datetime.utcnow()
+        cleared, by_parts = [], {}
+        for k, record in snapshot.items():
+            if record.dirty == {"state", "data"} and record.state is None and not record.data:
+                cleared.append(k)
+                continue
+            row = {"key": k, "updated_at": now}
+            if "state" in record.dirty:
+                row["state"] = record.state
+            if "data" in record.dirty:
+                row["data_json"] = encode_data(record.data)
+            by_parts.setdefault(frozenset(record.dirty), []).append(row)
+
+        async with async_session() as session:
+            if cleared:
+                await session.execute(delete(FsmState).where(FsmState.key.in_(cleared)))
+            for rows in by_parts.values():
+                stmt = pg_insert(FsmState).values(rows)
+                columns = ["updated_at"] + [c for c in ("state", "data_json") if c in rows[0]]
+                await session.execute(stmt.on_conflict_do_update(
+                    index_elements=[FsmState.key],
+                    set_={c: stmt.excluded[c] for c in columns},
+                ))
+            await session.commit()
+
+    async def _write_isolated(self, snapshot: dict[str, _Record]) -> set[str]:
+        """Write ``snapshot`` in one go, or key by key if that fails. Returns the keys that failed."""
+        try:
+            await self._write_records(snapshot)
+            return set()
+        except Exception as e:
+            if len(snapshot) == 1:
+                logger.error(f"FSM storage flush failed for {next(iter(snapshot))}: {e}")
+                return set(snapshot)
+            logger.error(f"FSM storage flush failed for {len(snapshot)} keys, retrying one by one: {e}")
+
+        failed = set()
+        for k, record in snapshot.items():
+            try:
+                await self._write_records({k: record})
+            except Exception as e:
+                logger.error(f"FSM storage flush failed for {k}: {e}")
+                failed.add(k)
+        return failed
+
+    async def flush(self):
+        """Write every pending record now. Failed writes stay pending and are retried."""
+        async with self._flush_lock:
+            keys, self._dirty = self._dirty, set()
+            snapshot = {k: self._records[k] for k in keys if k in self._records}
+            if not snapshot:
+                return
+
+            versions = {k: record.version for k, record in snapshot.items()}
+            failed = await self._write_isolated(snapshot)
+
+            loaded_at = asyncio.get_running_loop().time()
+            for k, record in snapshot.items():
+                if k in failed:
+                    record.failures += 1
+                    if record.failures < self.MAX_FLUSH_ATTEMPTS:
+                        self._dirty.add(k)
+                        continue
+                    logger.error(f"Dropping FSM state for {k} after {record.failures} failed writes")
+                    if self._records.get(k) is record:
+                        del self._records[k]
+                    self._dirty.discard(k)
+                    continue
+                record.failures = 0
+                # Written again during the flush: leave it pending for the next one.
+                if record.version == versions[k]:
+                    record.dirty.clear()
+                    record.loaded_at = loaded_at
+            if failed and self._dirty and self._flush_task is None:
+                self._flush_task = asyncio.create_task(self._flush_later())
+            self._prune()
+
+    def _prune(self):
+        for k in [k for k, record in self._records.items() if not self._fresh(record)]:
+            del self._records[k]
+
+    async def close(self) -> None:
+        if self._flush_task is not None:
+            self._flush_task.cancel()
+            self._flush_task = None
+        await self.flush()
+
+    @staticmethod
+    async def purge_expired(ttl_hours: int | None = None) -> int:
+        """Delete states untouched for ``FSM_STATE_TTL_HOURS``. Returns the number removed."""
+        if not async_session:
+            return 0
+        cutoff = datetime.utcnow() - timedelta(hours=ttl_hours or config.FSM_STATE_TTL_HOURS)
+        async with async_session() as session:
+            result = await session.execute(delete(FsmState).where(FsmState.updated_at < cutoff))
+            await session.commit()
+            return result.rowcount or 0
@@ -1,11 +1,19 @@
 from datetime import datetime
-from sqlalchemy import select, or_
-from src.bot.database import async_session, Job, User
+from sqlalchemy import select, update, or_, func
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased
+from src.bot.database import async_session, session_scope, read_scope, transaction_scope, commit_scope, Job, JobArchive, User
 from src.bot.database.models import JobType, JobStatus, UserRole, AvailabilityStatus
+from src.bot.utils.pagination import fetch_page, NEXT, PAGE_SIZE
+from src.bot.services.timers import TimerService
+from src.bot.services.archive import ArchiveService
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Returned when a conditional transition finds the job already moved on
+STALE_JOB_MESSAGE = "This job was just updated by someone else. Please refresh and try again."
+
 class JobService:
     @staticmethod
     async def create_job(
@@ -17,12 +25,13 @@ class JobService:
         preset_price: str = None,
         team_id: int = None,
         supervisor_photos: str = None,
-        deadline: datetime = None
+        deadline: datetime = None,
+        session: AsyncSession | None = None
     ) -> Job | None:
         if not async_session:
             return None
         
-        async with async_session() as session:
+        async with transaction_scope(session) as session:
             job = Job(
                 title=title,
                 description=description,
@@ -37,16 +46,16 @@ class JobService:
                 created_at=datetime.utcnow()
             )
             session.add(job)
-            await session.commit()
+            await commit_scope(session)
             await session.refresh(job)
             return job
     
     @staticmethod
-    async def send_job(job_id: int, subcontractor_id: int = None) -> tuple[bool, str]:
+    async def send_job(job_id: int, subcontractor_id: int = None, session: AsyncSession | None = None) -> tuple[bool, str]:
         if not async_session:
             return False, "Database not available"
         
-        async with async_session() as session:
+        async with transaction_scope(session) as session:
             result = await session.execute(select(Job).where(Job.id == job_id))
             job = result.scalar_one_or_none()
             
@@ -77,16 +86,17 @@ class JobService:
             job.status = JobStatus.SENT
             job.sent_at = datetime.utcnow()
             
-            await session.commit()
+            await TimerService.schedule_job(job, session)
+            await commit_scope(session)
             return True, "Job sent successfully"
     
     @staticmethod
-    async def send_job_to_all(job_id: int) -> tuple[bool, str]:
+    async def send_job_to_all(job_id: int, session: AsyncSession | None = None) -> tuple[bool, str]:
         """Send job to all available subcontractors (no specific assignment)."""
         if not async_session:
             return False, "Database not available"
         
-        async with async_session() as session:
+        async with transaction_scope(session) as session:
             result = await session.execute(select(Job).where(Job.id == job_id))
             job = result.scalar_one_or_none()
             
@@ -104,27 +114,16 @@ class JobService:
             job.status = JobStatus.SENT
             job.sent_at = datetime.utcnow()
             
-            await session.commit()
+            await TimerService.schedule_job(job, session)
+            await commit_scope(session)
             return True, "Job broadcast to all subcontractors"
     
     @staticmethod
-    async def accept_job(job_id: int, telegram_id: int, company_name: str = None) -> tuple[bool, str, int | None]:
+    async def accept_job(job_id: int, telegram_id: int, company_name: str = None, session: AsyncSession | None = None) -> tuple[bool, str, int | None]:
         if not async_session:
             return False, "Database not available", None
         
-        async with async_session() as session:
-            job_result = await session.execute(select(Job).where(Job.id == job_id))
-            job = job_result.scalar_one_or_none()
-            
-            if not job:
-                return False, "Job not found", None
-            
-            if job.status == JobStatus.ARCHIVED:
-                return False, "Cannot modify archived job", None
-            
-            if job.status not in [JobStatus.SENT, JobStatus.CREATED]:
-                return False, f"Job cannot be accepted (current status: {job.status.value})", None
-            
+        async with transaction_scope(session) as session:
             user_result = await session.execute(
                 select(User).where(User.telegram_id == telegram_id)
             )
@@ -133,11 +132,33 @@ class JobService:
             if not user:
                 return False, "User not found", None
             
-            job.status = JobStatus.ACCEPTED
-            job.subcontractor_id = user.id
-            job.accepted_at = datetime.utcnow()
+            # Check-and-claim in one statement: of several concurrent claimants
+            # exactly one matches, the rest see zero rows and lose at once.
+            values = {
+                "status": JobStatus.ACCEPTED,
+                "subcontractor_id": user.id,
+                "accepted_at": datetime.utcnow(),
+            }
             if company_name:
-                job.company_name = company_name
+                values["company_name"] = company_name
+            claim_result = await session.execute(
+                update(Job)
+                .where(Job.id == job_id, Job.status.in_([JobStatus.SENT, JobStatus.CREATED]))
+                .values(**values)
+                .returning(Job)
+                .execution_options(populate_existing=True)
+            )
+            job = claim_result.scalar_one_or_none()
+            
+            if not job:
+                status = await session.scalar(select(Job.status).where(Job.id == job_id))
+                if status is None:
+                    return False, "Job not found", None
+                if status == JobStatus.ARCHIVED:
+                    return False, "Cannot modify archived job", None
+                if status == JobStatus.ACCEPTED:
+                    return False, "This job has already been taken by another subcontractor", None
+                return False, f"Job cannot be accepted (current status: {status.value})", None
             
             # Get supervisor's telegram_id for notification
             sup_result = await session.execute(
@@ -145,136 +166,160 @@ class JobService:
             )
             supervisor_tg_id = sup_result.scalar()
             
-            await session.commit()
+            await TimerService.schedule_job(job, session)
+            await commit_scope(session)
             return True, "Job accepted successfully", supervisor_tg_id
     
     @staticmethod
-    async def start_job(job_id: int, telegram_id: int) -> tuple[bool, str]:
+    async def _transition(session: AsyncSession, job_id: int, expected_status: JobStatus, **values) -> bool:
+        """
+        Conditional write for a state transition: applies ``values`` only if the
+        job is still in the status the caller validated against.
+        Returns False if someone else moved the job in between.
+        """
+        result = await session.execute(
+            update(Job)
+            .where(Job.id == job_id, Job.status == expected_status)
+            .values(**values)
+            .returning(Job.id)
+        )
+        return result.scalar_one_or_none() is not None
+    
+    @staticmethod
+    async def start_job(job_id: int, telegram_id: int, session: AsyncSession | None = None) -> tuple[bool, str]:
         if not async_session:
             return False, "Database not available"
         
-        async with async_session() as session:
-            job_result = await session.execute(select(Job).where(Job.id == job_id))
-            job = job_result.scalar_one_or_none()
-            
-            if not job:
+        async with transaction_scope(session) as session:
+            actor = aliased(User)
+            row = (await session.execute(
+                select(Job.status, Job.subcontractor_id, actor.id.label("actor_id"))
+                .select_from(Job)
+                .outerjoin(actor, actor.telegram_id == telegram_id)
+                .where(Job.id == job_id)
+            )).first()
+            
+            if not row:
                 return False, "Job not found"
             
-            if job.status == JobStatus.ARCHIVED:
+            if row.status == JobStatus.ARCHIVED:
                 return False, "Cannot modify archived job"
             
-            if job.status != JobStatus.ACCEPTED:
-                return False, f"Job must be accepted before starting (current status: {job.status.value})"
-            
-            user_result = await session.execute(
-                select(User).where(User.telegram_id == telegram_id)
-            )
-            user = user_result.scalar_one_or_none()
+            if row.status != JobStatus.ACCEPTED:
+                return False, f"Job must be accepted before starting (current status: {row.status.value})"
             
-            if not user or job.subcontractor_id != user.id:
+            if not row.actor_id or row.subcontractor_id != row.actor_id:
                 return False, "You are not assigned to this job"
             
-            job.status = JobStatus.IN_PROGRESS
-            job.started_at = datetime.utcnow()
+            if not await JobService._transition(
+                session, job_id, row.status,
+                status=JobStatus.IN_PROGRESS, started_at=datetime.utcnow()
+            ):
+                return False, STALE_JOB_MESSAGE
             
-            await session.commit()
+            await commit_scope(session)
             return True, "Job started"
     
     @staticmethod
-    async def submit_job(job_id: int, telegram_id: int, notes: str = None, photo_id: str = None) -> tuple[bool, str, int | None]:
+    async def submit_job(job_id: int, telegram_id: int, notes: str = None, photo_id: str = None, session: AsyncSession | None = None) -> tuple[bool, str, int | None]:
         if not async_session:
             return False, "Database not available", None
         
-        async with async_session() as session:
-            job_result = await session.execute(select(Job).where(Job.id == job_id))
-            job = job_result.scalar_one_or_none()
+        async with transaction_scope(session) as session:
+            actor = aliased(User)
+            supervisor = aliased(User)
+            row = (await session.execute(
+                select(
+                    Job.status, Job.subcontractor_id,
+                    actor.id.label("actor_id"), supervisor.telegram_id.label("supervisor_tg_id")
+                )
+                .select_from(Job)
+                .outerjoin(actor, actor.telegram_id == telegram_id)
+                .outerjoin(supervisor, supervisor.id == Job.supervisor_id)
+                .where(Job.id == job_id)
+            )).first()
             
-            if not job:
+            if not row:
                 return False, "Job not found", None
             
-            if job.status == JobStatus.ARCHIVED:
+            if row.status == JobStatus.ARCHIVED:
                 return False, "Cannot modify archived job", None
             
-            if job.status not in [JobStatus.IN_PROGRESS, JobStatus.ACCEPTED]:
-                return False, f"Job cannot be submitted (current status: {job.status.value})", None
+            if row.status not in [JobStatus.IN_PROGRESS, JobStatus.ACCEPTED]:
+                return False, f"Job cannot be submitted (current status: {row.status.value})", None
             
-            user_result = await session.execute(
-                select(User).where(User.telegram_id == telegram_id)
-            )
-            user = user_result.scalar_one_or_none()
-            
-            if not user:
+            if not row.actor_id:
                 return False, "User not found", None
             
-            if job.subcontractor_id != user.id:
+            if row.subcontractor_id != row.actor_id:
                 return False, "You are not assigned to this job", None
             
-            job.status = JobStatus.SUBMITTED
+            values = {"status": JobStatus.SUBMITTED, "submitted_at": datetime.utcnow()}
             if photo_id:
-                job.photos = photo_id
+                values["photos"] = photo_id
             if notes:
-                job.description = (job.description or "") + f"\n\n[Submission Notes]: {notes}"
+                values["description"] = func.coalesce(Job.description, "") + f"\n\n[Submission Notes]: {notes}"
             
-            # Get supervisor telegram_id for notification
-            sup_result = await session.execute(
-                select(User.telegram_id).where(User.id == job.supervisor_id)
-            )
-            supervisor_tg_id = sup_result.scalar()
+            if not await JobService._transition(session, job_id, row.status, **values):
+                return False, STALE_JOB_MESSAGE, None
             
-            await session.commit()
-            return True, "Job submitted for review", supervisor_tg_id
+            await commit_scope(session)
+            return True, "Job submitted for review", row.supervisor_tg_id
     
     @staticmethod
-    async def complete_job(job_id: int, telegram_id: int, is_supervisor: bool = False) -> tuple[bool, str]:
+    async def complete_job(job_id: int, telegram_id: int, is_supervisor: bool = False, session: AsyncSession | None = None) -> tuple[bool, str]:
         if not async_session:
             return False, "Database not available"
         
-        async with async_session() as session:
-            job_result = await session.execute(select(Job).where(Job.id == job_id))
-            job = job_result.scalar_one_or_none()
-            
-            if not job:
+        async with transaction_scope(session) as session:
+            actor = aliased(User)
+            row = (await session.execute(
+                select(Job.status, Job.supervisor_id, Job.subcontractor_id, actor.id.label("actor_id"))
+                .select_from(Job)
+                .outerjoin(actor, actor.telegram_id == telegram_id)
+                .where(Job.id == job_id)
+            )).first()
+            
+            if not row:
                 return False, "Job not found"
             
-            if job.status == JobStatus.ARCHIVED:
+            if row.status == JobStatus.ARCHIVED:
                 return False, "Cannot modify archived job"
             
-            if job.status == JobStatus.COMPLETED:
+            if row.status == JobStatus.COMPLETED:
                 return False, "Job is already completed"
             
-            if job.status == JobStatus.CANCELLED:
+            if row.status == JobStatus.CANCELLED:
                 return False, "Cannot complete a cancelled job"
             
-            user_result = await session.execute(
-                select(User).where(User.telegram_id == telegram_id)
-            )
-            user = user_result.scalar_one_or_none()
-            
-            if not user:
+            if not row.actor_id:
                 return False, "User not found"
             
             if is_supervisor:
                 # Supervisors can only complete jobs that have been submitted
-                if job.status != JobStatus.SUBMITTED:
+                if row.status != JobStatus.SUBMITTED:
                     return False, "Job must be submitted by subcontractor before you can mark it complete. Wait for the subcontractor to submit with photo proof."
-                if job.supervisor_id != user.id:
+                if row.supervisor_id != row.actor_id:
                     return False, "You don't have permission to complete this job"
             else:
-                if job.subcontractor_id != user.id:
+                if row.subcontractor_id != row.actor_id:
                     return False, "You are not assigned to this job"
             
-            job.status = JobStatus.COMPLETED
-            job.completed_at = datetime.utcnow()
+            if not await JobService._transition(
+                session, job_id, row.status,
+                status=JobStatus.COMPLETED, completed_at=datetime.utcnow()
+            ):
+                return False, STALE_JOB_MESSAGE
             
-            await session.commit()
+            await commit_scope(session)
             return True, "Job marked as complete"
     
     @staticmethod
-    async def get_submitted_jobs_for_supervisor(telegram_id: int) -> list:
+    async def get_submitted_jobs_for_supervisor(telegram_id: int, session: AsyncSession | None = None) -> list:
         if not async_session:
             return []
         
-        async with async_session() as session:
+        async with session_scope(session) as session:
             user_result = await session.execute(
                 select(User).where(User.telegram_id == telegram_id)
             )
@@ -292,43 +337,46 @@ class JobService:
             return list(result.scalars().all())
     
     @staticmethod
-    async def cancel_job(job_id: int, telegram_id: int) -> tuple[bool, str]:
+    async def cancel_job(job_id: int, telegram_id: int, session: AsyncSession | None = None) -> tuple[bool, str]:
         if not async_session:
             return False, "Database not available"
         
-        async with async_session() as session:
-            job_result = await session.execute(select(Job).where(Job.id == job_id))
-            job = job_result.scalar_one_or_none()
-            
-            if not job:
+        async with transaction_scope(session) as session:
+            actor = aliased(User)
+            row = (await session.execute(
+                select(Job.status, Job.supervisor_id, actor.id.label("actor_id"))
+                .select_from(Job)
+                .outerjoin(actor, actor.telegram_id == telegram_id)
+                .where(Job.id == job_id)
+            )).first()
+            
+            if not row:
                 return False, "Job not found"
             
-            if job.status == JobStatus.ARCHIVED:
+            if row.status == JobStatus.ARCHIVED:
                 return False, "Cannot modify archived job"
             
-            if job.status in [JobStatus.COMPLETED, JobStatus.CANCELLED]:
-                return False, f"Job cannot be cancelled (current status: {job.status.value})"
+            if row.status in [JobStatus.COMPLETED, JobStatus.CANCELLED]:
+                return False, f"Job cannot be cancelled (current status: {row.status.value})"
             
-            user_result = await session.execute(
-                select(User).where(User.telegram_id == telegram_id)
-            )
-            user = user_result.scalar_one_or_none()
-            
-            if not user or job.supervisor_id != user.id:
+            if not row.actor_id or row.supervisor_id != row.actor_id:
                 return False, "You don't have permission to cancel this job"
             
-            job.status = JobStatus.CANCELLED
-            job.cancelled_at = datetime.utcnow()
+            if not await JobService._transition(
+                session, job_id, row.status,
+                status=JobStatus.CANCELLED, cancelled_at=datetime.utcnow()
+            ):
+                return False, STALE_JOB_MESSAGE
             
-            await session.commit()
+            await commit_scope(session)
             return True, "Job cancelled"
     
     @staticmethod
-    async def decline_job(job_id: int, telegram_id: int, reason: str = None) -> tuple[bool, str]:
+    async def decline_job(job_id: int, telegram_id: int, reason: str = None, session: AsyncSession | None = None) -> tuple[bool, str]:
         if not async_session:
             return False, "Database not available"
         
-        async with async_session() as session:
+        async with transaction_scope(session) as session:
             job_result = await session.execute(select(Job).where(Job.id == job_id))
             job = job_result.scalar_one_or_none()
             
@@ -350,15 +398,16 @@ class JobService:
             job.status = JobStatus.SENT
             job.subcontractor_id = None
             
-            await session.commit()
+            await TimerService.schedule_job(job, session)
+            await commit_scope(session)
             return True, "Job declined"
     
     @staticmethod
-    async def get_supervisor_jobs(telegram_id: int, status_filter: list[JobStatus] = None) -> list:
+    async def get_supervisor_jobs(telegram_id: int, status_filter: list[JobStatus] = None, session: AsyncSession | None = None) -> list:
         if not async_session:
             return []
         
-        async with async_session() as session:
+        async with session_scope(session) as session:
             user_result = await session.execute(
                 select(User).where(User.telegram_id == telegram_id)
             )
@@ -381,7 +430,7 @@ class JobService:
             return list(result.scalars().all())
     
     @staticmethod
-    async def get_pending_jobs_for_subcontractor(telegram_id: int) -> list:
+    async def get_pending_jobs_for_subcontractor(telegram_id: int, session: AsyncSession | None = None) -> list:
         """Get jobs available for a subcontractor to accept or quote on.
         
         Only shows jobs that are:
@@ -391,7 +440,7 @@ class JobService:
         if not async_session:
             return []
         
-        async with async_session() as session:
+        async with session_scope(session) as session:
             user_result = await session.execute(
                 select(User).where(User.telegram_id == telegram_id)
             )
@@ -415,11 +464,11 @@ class JobService:
             return list(result.scalars().all())
     
     @staticmethod
-    async def get_subcontractor_active_jobs(telegram_id: int) -> list:
+    async def get_subcontractor_active_jobs(telegram_id: int, session: AsyncSession | None = None) -> list:
         if not async_session:
             return []
         
-        async with async_session() as session:
+        async with session_scope(session) as session:
             user_result = await session.execute(
                 select(User).where(User.telegram_id == telegram_id)
             )
@@ -437,27 +486,72 @@ class JobService:
             return list(result.scalars().all())
     
     @staticmethod
-    async def get_job_history(team_id: int = None, limit: int = 50) -> list:
+    async def count_jobs_by_status(
+        team_id: int = None,
+        region_id: int = None,
+        since: datetime = None,
+        until: datetime = None,
+        include_archived: bool = False,
+        session: AsyncSession | None = None
+    ) -> dict[JobStatus, int]:
+        """
+        Job counts per status in one GROUP BY query, optionally limited to a
+        team, a region and/or a created_at window [since, until).
+        include_archived also counts archived jobs, in both storage tiers.
+        Statuses without jobs are omitted; keys follow JobStatus order.
+        """
         if not async_session:
-            return []
+            return {}
         
-        async with async_session() as session:
+        async with read_scope(session) as session:
+            counts = {}
+            for model in (Job, JobArchive) if include_archived else (Job,):
+                query = select(model.status, func.count(model.id)).group_by(model.status)
+                
+                if not include_archived:
+                    query = query.where(model.status != JobStatus.ARCHIVED)
+                if team_id:
+                    query = query.where(model.team_id == team_id)
+                if region_id:
+                    query = query.where(model.region_id == region_id)
+                if since:
+                    query = query.where(model.created_at >= since)
+                if until:
+                    query = query.where(model.created_at < until)
+                
+                for status, count in (await session.execute(query)).all():
+                    counts[status] = counts.get(status, 0) + count
+            return {status: counts[status] for status in JobStatus if counts.get(status)}
+    
+    @staticmethod
+    async def get_job_history_page(
+        team_id: int = None,
+        cursor: str | None = None,
+        direction: str = NEXT,
+        page_size: int = PAGE_SIZE,
+        session: AsyncSession | None = None
+    ) -> tuple[list, str | None, str | None]:
+        """
+        One keyset page of non-archived jobs, newest first.
+        Returns: (jobs, prev_cursor, next_cursor)
+        """
+        if not async_session:
+            return [], None, None
+        
+        async with read_scope(session) as session:
             query = select(Job).where(Job.status != JobStatus.ARCHIVED)
             
             if team_id:
                 query = query.where(Job.team_id == team_id)
             
-            query = query.order_by(Job.created_at.desc()).limit(limit)
-            
-            result = await session.execute(query)
-            return list(result.scalars().all())
+            return await fetch_page(session, query, Job, cursor, direction, page_size)
     
     @staticmethod
-    async def get_available_subcontractors(team_id: int = None) -> list:
+    async def get_available_subcontractors(team_id: int = None, session: AsyncSession | None = None) -> list:
         if not async_session:
             return []
         
-        async with async_session() as session:
+        async with session_scope(session) as session:
             result = await session.execute(
                 select(User).where(
                     User.role == UserRole.SUBCONTRACTOR,
@@ -468,11 +562,10 @@ class JobService:
             return list(result.scalars().all())
     
     @staticmethod
-    async def get_job_by_id(job_id: int) -> Job | None:
-        if not async_session:
-            return None
-        
-        async with async_session() as session:
-            result = await session.execute(select(Job).where(Job.id == job_id))
-            return result.scalar_one_or_none()
+    async def get_job_by_id(job_id: int, session: AsyncSession | None = None) -> Job | JobArchive | None:
+        """The job from the hot table, or from cold storage once archived there.
+
+        A cold job is only good for display: transitions match hot rows only.
+        """
+        return await ArchiveService.get_job(job_id, session)
     
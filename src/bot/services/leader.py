@@ -0,0 +1,86 @@
+import asyncio
+from typing import Awaitable, Callable
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import NullPool
+from src.bot.config import config
+from src.bot.database import engine
+from src.bot.database.session import ASYNC_DATABASE_URL, get_connect_args
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Advisory lock keys; keep distinct from migrations.ledger.LOCK_KEY.
+SCHEDULER_LOCK_KEY = 7_241_002
+
+
+class LeaderElection:
+    """Run ``work`` on exactly one replica, elected with a Postgres advisory lock.
+
+    Every replica keeps trying ``pg_try_advisory_lock`` on a dedicated
+    connection from its own unpooled engine, so the lock never occupies a
+    slot of the shared pool and a dropped connection is closed, not handed
+    back to another caller still holding the lock. The winner runs ``work`` and pings that connection every
+    heartbeat; if the ping fails (database restart, network loss) it cancels
+    ``work`` and goes back to campaigning. Session-level advisory locks die
+    with their connection, so when the leader's process dies another replica
+    takes over within one heartbeat interval.
+    """
+
+    def __init__(self, name: str, lock_key: int, work: Callable[[], Awaitable[None]], heartbeat: float | None = None):
+        self.name = name
+        self.lock_key = lock_key
+        self.work = work
+        self.heartbeat = heartbeat or config.LEADER_HEARTBEAT_SECONDS
+        self.is_leader = False
+
+    async def run(self):
+        if not engine:
+            return
+
+        lock_engine = create_async_engine(ASYNC_DATABASE_URL, poolclass=NullPool, connect_args=get_connect_args())
+        try:
+            await self._campaign(lock_engine)
+        finally:
+            await lock_engine.dispose()
+
+    async def _campaign(self, lock_engine):
+        while True:
+            try:
+                async with lock_engine.connect() as conn:
+                    conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+                    acquired = await conn.scalar(text("SELECT pg_try_advisory_lock(:key)"), {"key": self.lock_key})
+                    if acquired:
+                        await self._lead(conn)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Leader election for {self.name} failed: {e}")
+            await asyncio.sleep(self.heartbeat)
+
+    async def _lead(self, conn):
+        self.is_leader = True
+        logger.info(f"Acquired {self.name} leadership")
+        task = asyncio.create_task(self.work())
+        try:
+            while True:
+                done, _ = await asyncio.wait({task}, timeout=self.heartbeat)
+                if done:
+                    # work() returned or crashed on its own; release and campaign again.
+                    if not task.cancelled() and task.exception():
+                        logger.error(f"{self.name} stopped with error: {task.exception()}")
+                    return
+                await asyncio.wait_for(conn.execute(text("SELECT 1")), timeout=self.heartbeat)
+        finally:
+            self.is_leader = False
+            task.cancel()
+            try:
+                await task
+            except (asyncio.CancelledError, Exception):
+                pass
+            logger.info(f"Released {self.name} leadership")
+            try:
+                await conn.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": self.lock_key})
+            except Exception:
+                # Connection is gone, and the lock with it.
+                pass
@@ -0,0 +1,298 @@
+import asyncio
+from datetime import datetime, timedelta
+from sqlalchemy import select, update, delete, text
+from sqlalchemy.ext.asyncio import AsyncSession
+from aiogram.exceptions import TelegramRetryAfter, TelegramForbiddenError, TelegramBadRequest
+from aiogram.types import InlineKeyboardMarkup
+from src.bot.database import engine, async_session, NotificationOutbox
+from src.bot.services.dispatch import DispatchService
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class OutboxService:
+    """Durable notification queue.
+
+    Handlers and background jobs call :meth:`enqueue`; :meth:`run_worker`
+    claims due rows in batches, delivers them through the rate limiter and
+    retries failures with exponential backoff. A chat's rows in a batch are
+    sent one after another in id order; when one fails, the chat's later
+    rows are put back behind it instead of overtaking it. A claimed row's
+    ``next_attempt_at`` doubles as its lease, so rows held by a crashed
+    worker become due again once the lease expires. Deliveries that have not
+    finished ``LEASE_MARGIN_SECONDS`` before the lease ends are abandoned and
+    rescheduled rather than risk a second worker sending the same row.
+
+    Enqueuing issues a ``NOTIFY`` in the caller's transaction, so workers in
+    any process wake up exactly when the rows commit.
+    """
+
+    bot = None
+    BATCH_SIZE = 50
+    LEASE_SECONDS = 120
+    LEASE_MARGIN_SECONDS = 15
+    NOTIFY_CHANNEL = "notification_outbox"
+    MAX_ATTEMPTS = 8
+    BASE_BACKOFF_SECONDS = 5
+    MAX_BACKOFF_SECONDS = 3600
+    IDLE_POLL_SECONDS = 5
+    RETENTION_DAYS = 7
+
+    _wakeup: asyncio.Event | None = None
+
+    @classmethod
+    def set_bot(cls, bot):
+        cls.bot = bot
+
+    @classmethod
+    def _notify_worker(cls, *args):
+        if cls._wakeup is not None:
+            cls._wakeup.set()
+
+    @classmethod
+    async def _notify_on_commit(cls, session: AsyncSession):
+        """NOTIFY workers when ``session``'s current transaction commits (once per transaction)."""
+        transaction = session.sync_session.get_transaction()
+        if transaction is not None and session.info.get("outbox_notified") is transaction:
+            return
+        await session.execute(text("SELECT pg_notify(:channel, '')"), {"channel": cls.NOTIFY_CHANNEL})
+        session.info["outbox_notified"] = session.sync_session.get_transaction()
+
+    @staticmethod
+    def _row(chat_id: int, text: str, parse_mode: str | None, reply_markup: InlineKeyboardMarkup | None) -> NotificationOutbox:
+        return NotificationOutbox(
+            chat_id=chat_id,
+            body=text,
+            parse_mode=parse_mode,
+            reply_markup_json=reply_markup.model_dump_json(exclude_none=True) if reply_markup else None,
+            status="PENDING",
+            attempts=0,
+            next_attempt_at=datetime.utcnow(),
+            created_at=datetime.utcnow(),
+        )
+
+    @classmethod
+    async def enqueue(
+        cls,
+        chat_id: int,
+        text: str,
+        parse_mode: str | None = None,
+        reply_markup: InlineKeyboardMarkup | None = None,
+        session: AsyncSession | None = None,
+    ) -> bool:
+        """Queue a message for delivery.
+
+        When ``session`` is given the row joins the caller's transaction and is
+        only delivered once the caller commits.
+        """
+        return await cls.enqueue_many([(chat_id, text, parse_mode, reply_markup)], session=session) == 1
+
+    @classmethod
+    async def enqueue_many(
+        cls,
+        messages: list[tuple[int, str, str | None, InlineKeyboardMarkup | None]],
+        session: AsyncSession | None = None,
+    ) -> int:
+        if not messages:
+            return 0
+        rows = [cls._row(*m) for m in messages]
+
+        if session is not None:
+            session.add_all(rows)
+            await cls._notify_on_commit(session)
+            return len(rows)
+
+        if not async_session:
+            return 0
+        async with async_session() as own_session:
+            own_session.add_all(rows)
+            await cls._notify_on_commit(own_session)
+            await own_session.commit()
+        return len(rows)
+
+    @classmethod
+    async def claim_batch(cls) -> list[NotificationOutbox]:
+        now = datetime.utcnow()
+        async with async_session() as session:
+            due_ids = (
+                select(NotificationOutbox.id)
+                .where(
+                    NotificationOutbox.status == "PENDING",
+                    NotificationOutbox.next_attempt_at <= now,
+                )
+                .order_by(NotificationOutbox.next_attempt_at, NotificationOutbox.id)
+                .limit(cls.BATCH_SIZE)
+                .with_for_update(skip_locked=True)
+                .scalar_subquery()
+            )
+            result = await session.execute(
+                update(NotificationOutbox)
+                .where(NotificationOutbox.id.in_(due_ids))
+                .values(
+                    attempts=NotificationOutbox.attempts + 1,
+                    next_attempt_at=now + timedelta(seconds=cls.LEASE_SECONDS),
+                )
+                .returning(NotificationOutbox)
+                .execution_options(synchronize_session=False)
+            )
+            rows = list(result.scalars().all())
+            await session.commit()
+            return rows
+
+    @classmethod
+    def _backoff(cls, attempts: int) -> timedelta:
+        seconds = min(cls.MAX_BACKOFF_SECONDS, cls.BASE_BACKOFF_SECONDS * (2 ** max(0, attempts - 1)))
+        return timedelta(seconds=seconds)
+
+    @classmethod
+    async def _deliver(cls, row: NotificationOutbox, deadline: float) -> dict:
+        reply_markup = (
+            InlineKeyboardMarkup.model_validate_json(row.reply_markup_json)
+            if row.reply_markup_json else None
+        )
+        kwargs = {"reply_markup": reply_markup}
+        if row.parse_mode:
+            kwargs["parse_mode"] = row.parse_mode  # otherwise keep the bot's default
+        try:
+            # No in-place RetryAfter sleeps: they could outlive the lease. Flood
+            # control reschedules the row below instead.
+            await asyncio.wait_for(
+                DispatchService.call(row.chat_id, cls.bot.send_message, row.body, max_retries=0, **kwargs),
+                timeout=deadline - asyncio.get_running_loop().time(),
+            )
+            return {"status": "SENT", "sent_at": datetime.utcnow(), "last_error": None}
+        except asyncio.TimeoutError:
+            # Still waiting on the rate limiter when the lease ran low; not the message's fault.
+            return {"attempts": row.attempts - 1, "next_attempt_at": datetime.utcnow(), "last_error": "Lease expired before delivery"}
+        except TelegramRetryAfter as e:
+            # Flood control is not the message's fault - don't burn an attempt.
+            return {
+                "attempts": row.attempts - 1,
+                "next_attempt_at": datetime.utcnow() + timedelta(seconds=e.retry_after),
+                "last_error": str(e),
+            }
+        except (TelegramForbiddenError, TelegramBadRequest) as e:
+            # Blocked bot, deleted chat or malformed message: retrying will not help.
+            logger.warning(f"Outbox message {row.id} to {row.chat_id} dropped: {e}")
+            return {"status": "FAILED", "last_error": str(e)}
+        except Exception as e:
+            if row.attempts >= cls.MAX_ATTEMPTS:
+                logger.error(f"Outbox message {row.id} to {row.chat_id} failed permanently: {e}")
+                return {"status": "FAILED", "last_error": str(e)}
+            logger.warning(f"Outbox message {row.id} to {row.chat_id} failed (attempt {row.attempts}): {e}")
+            return {"next_attempt_at": datetime.utcnow() + cls._backoff(row.attempts), "last_error": str(e)}
+
+    @classmethod
+    async def process_batch(cls) -> int:
+        deadline = asyncio.get_running_loop().time() + cls.LEASE_SECONDS - cls.LEASE_MARGIN_SECONDS
+        rows = await cls.claim_batch()
+        if not rows:
+            return 0
+
+        outcomes: dict[int, dict] = {}
+        by_chat: dict[int, list[NotificationOutbox]] = {}
+        for row in sorted(rows, key=lambda row: row.id):
+            by_chat.setdefault(row.chat_id, []).append(row)
+
+        async def deliver(chat_rows: list[NotificationOutbox]):
+            # One chat's messages go out in order; only different chats run concurrently.
+            for i, row in enumerate(chat_rows):
+                outcomes[row.id] = await cls._deliver(row, deadline)
+                if outcomes[row.id].get("status") != "SENT":
+                    # Hold the rest back until this one is due again, so they stay behind it.
+                    due = outcomes[row.id].get("next_attempt_at") or datetime.utcnow()
+                    for later in chat_rows[i + 1:]:
+                        outcomes[later.id] = {"attempts": later.attempts - 1, "next_attempt_at": due}
+                    break
+
+        await DispatchService.fan_out(by_chat.values(), deliver)
+
+        async with async_session() as session:
+            for row_id, values in outcomes.items():
+                await session.execute(
+                    update(NotificationOutbox).where(NotificationOutbox.id == row_id).values(**values)
+                )
+            await session.commit()
+        return len(rows)
+
+    @classmethod
+    async def purge_delivered(cls) -> int:
+        cutoff = datetime.utcnow() - timedelta(days=cls.RETENTION_DAYS)
+        async with async_session() as session:
+            result = await session.execute(
+                delete(NotificationOutbox).where(
+                    NotificationOutbox.status.in_(["SENT", "FAILED"]),
+                    NotificationOutbox.created_at < cutoff,
+                )
+            )
+            await session.commit()
+            return result.rowcount or 0
+
+    @classmethod
+    async def run_worker(cls):
+        if not async_session or not cls.bot:
+            return
+
+        logger.info("Starting notification outbox worker")
+        cls._wakeup = asyncio.Event()
+        last_purge = datetime.min
+        listener, listener_raw = None, None
+        next_listen_at = datetime.min
+        while True:
+            try:
+                if (listener_raw is None or listener_raw.is_closed()) and datetime.utcnow() >= next_listen_at:
+                    await cls._unlisten(listener, listener_raw)
+                    listener, listener_raw = await cls._listen()
+                    next_listen_at = datetime.utcnow() + timedelta(minutes=1)
+                # Cleared before the batch so a NOTIFY arriving mid-batch is not lost.
+                cls._wakeup.clear()
+                processed = await cls.process_batch()
+                if datetime.utcnow() - last_purge > timedelta(hours=6):
+                    purged = await cls.purge_delivered()
+                    if purged:
+                        logger.info(f"Purged {purged} old outbox rows")
+                    last_purge = datetime.utcnow()
+                if processed:
+                    continue
+                try:
+                    await asyncio.wait_for(cls._wakeup.wait(), timeout=cls.IDLE_POLL_SECONDS)
+                except asyncio.TimeoutError:
+                    pass
+            except asyncio.CancelledError:
+                logger.info("Outbox worker cancelled")
+                break
+            except Exception as e:
+                logger.error(f"Outbox worker error: {e}")
+                await asyncio.sleep(cls.IDLE_POLL_SECONDS)
+        await cls._unlisten(listener, listener_raw)
+
+    @classmethod
+    async def _listen(cls):
+        """A connection LISTENing on NOTIFY_CHANNEL and its asyncpg connection, or (None, None) (the worker then just polls)."""
+        conn = None
+        try:
+            conn = await engine.connect()
+            raw = (await conn.get_raw_connection()).driver_connection
+            await raw.add_listener(cls.NOTIFY_CHANNEL, cls._notify_worker)
+            return conn, raw
+        except Exception as e:
+            logger.warning(f"Outbox LISTEN unavailable, polling every {cls.IDLE_POLL_SECONDS}s: {e}")
+            if conn is not None:
+                try:
+                    await conn.close()
+                except Exception:
+                    pass
+            return None, None
+
+    @classmethod
+    async def _unlisten(cls, conn, raw):
+        """Drop the LISTEN before ``conn`` goes back to the pool."""
+        if conn is None:
+            return
+        try:
+            if raw is not None and not raw.is_closed():
+                await raw.remove_listener(cls.NOTIFY_CHANNEL, cls._notify_worker)
+            await conn.close()
+        except Exception:
+            pass
@@ -1,15 +1,22 @@
+from collections import OrderedDict
 from datetime import datetime
-import os
-import tempfile
-from typing import Any
+import asyncio
+import hashlib
+from typing import Any, Awaitable, Callable
 
 from fpdf import FPDF
 
 from src.bot.database.models import Job, JobType
-from src.bot.utils.timezone import format_au, now_au_naive
+from src.bot.services.photo_cache import PhotoCache
+from src.bot.utils.timezone import format_au
 
 
 class JobPdfService:
+    # Rendered PDFs keyed by (kind, job_id, content_version) -> (filename, bytes)
+    _ARTIFACT_CACHE_MAX = 64
+    _artifact_cache: "OrderedDict[tuple[str, int, str], tuple[str, bytes]]" = OrderedDict()
+    _inflight: dict[tuple[str, int, str], asyncio.Future] = {}
+
     @staticmethod
     def _safe(value: str | None) -> str:
         if value is None:
@@ -41,27 +48,11 @@ class JobPdfService:
             return []
         return [photo_id.strip() for photo_id in raw_ids.split(",") if photo_id.strip()][:max_count]
 
-    @staticmethod
-    async def _download_temp_photo(bot: Any, file_id: str) -> str:
-        tg_file = await bot.get_file(file_id)
-        downloaded = await bot.download_file(tg_file.file_path)
-
-        if hasattr(downloaded, "seek"):
-            downloaded.seek(0)
-        content = downloaded.read()
-
-        suffix = os.path.splitext(tg_file.file_path or "")[1].lower()
-        if suffix not in {".jpg", ".jpeg", ".png", ".webp"}:
-            suffix = ".jpg"
-
-        with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as temp_file:
-            temp_file.write(content)
-            return temp_file.name
-
     @classmethod
-    async def _add_photo_gallery(cls, pdf: FPDF, bot: Any | None, photo_ids: list[str], section_title: str):
+    async def _add_photo_gallery(cls, pdf: FPDF, bot: Any | None, photo_ids: list[str], section_title: str) -> bool:
+        """Embed the photos; False if any of them could not be downloaded."""
         if not bot or not photo_ids:
-            return
+            return True
 
         pdf.set_font("Helvetica", "B", 11)
         pdf.cell(0, 8, cls._safe(section_title), ln=True)
@@ -70,27 +61,21 @@ class JobPdfService:
         added = 0
 
         for idx, photo_id in enumerate(photo_ids, start=1):
-            temp_path = None
             try:
-                temp_path = await cls._download_temp_photo(bot, photo_id)
+                image = await PhotoCache.get_image(bot, photo_id)
                 pdf.set_font("Helvetica", size=10)
                 pdf.cell(0, 7, f"Photo {idx}", ln=True)
-                pdf.image(temp_path, w=page_width)
+                pdf.image(image, w=page_width)
                 pdf.ln(2)
                 added += 1
             except Exception:
                 continue
-            finally:
-                if temp_path and os.path.exists(temp_path):
-                    try:
-                        os.remove(temp_path)
-                    except OSError:
-                        pass
 
         if added == 0:
             pdf.set_font("Helvetica", size=10)
             pdf.multi_cell(0, 7, "No photos could be embedded into this PDF.")
         pdf.ln(1)
+        return added == len(photo_ids)
 
     @classmethod
     def _base_pdf(cls, title: str) -> FPDF:
@@ -100,9 +85,6 @@ class JobPdfService:
         pdf.set_font("Helvetica", "B", 16)
         pdf.cell(0, 10, cls._safe(title), ln=True)
         pdf.ln(3)
-        pdf.set_font("Helvetica", size=11)
-        pdf.cell(0, 8, f"Generated: {format_au(now_au_naive())} AEST/AEDT", ln=True)
-        pdf.ln(2)
         return pdf
 
     @classmethod
@@ -114,6 +96,97 @@ class JobPdfService:
         pdf.multi_cell(0, 8, safe_value)
         pdf.ln(1)
 
+    @staticmethod
+    def content_version(*parts: Any) -> str:
+        """Stable fingerprint of everything that ends up in a rendered document."""
+        return hashlib.sha1(repr(parts).encode("utf-8")).hexdigest()[:16]
+
+    @staticmethod
+    def _output(pdf: FPDF) -> bytes:
+        out = pdf.output(dest="S")
+        if isinstance(out, str):
+            return out.encode("latin-1")
+        return bytes(out)
+
+    @classmethod
+    async def _cached_artifact(
+        cls,
+        key: tuple[str, int, str],
+        render: Callable[[], Awaitable[tuple[tuple[str, bytes], bool]]],
+    ) -> tuple[str, bytes]:
+        """``render()`` returns the artifact and whether it is complete; incomplete ones are not cached."""
+        cached = cls._artifact_cache.get(key)
+        if cached is not None:
+            cls._artifact_cache.move_to_end(key)
+            return cached
+
+        # Concurrent callers for the same artifact share a single render.
+        pending = cls._inflight.get(key)
+        if pending is not None:
+            return await asyncio.shield(pending)
+
+        future = asyncio.get_running_loop().create_future()
+        cls._inflight[key] = future
+        try:
+            artifact, complete = await render()
+        except BaseException as e:
+            future.set_exception(e)
+            future.exception()  # mark retrieved when nobody else is waiting
+            raise
+        finally:
+            cls._inflight.pop(key, None)
+
+        future.set_result(artifact)
+        if not complete:
+            # A photo failed to download: render again next time rather than keep the gap.
+            return artifact
+        cls._artifact_cache[key] = artifact
+        while len(cls._artifact_cache) > cls._ARTIFACT_CACHE_MAX:
+            cls._artifact_cache.popitem(last=False)
+        return artifact
+
+    @classmethod
+    async def get_job_dispatch_pdf(
+        cls,
+        job: Job,
+        supervisor_name: str | None = None,
+        recipient_name: str | None = None,
+        bot: Any | None = None,
+    ) -> tuple[str, bytes]:
+        """Cached :meth:`build_job_dispatch_pdf`.
+
+        Broadcasts pass ``recipient_name=None`` so every recipient shares one
+        rendered document; the key changes whenever any rendered field does.
+        """
+        version = cls.content_version(
+            job.title, job.job_type, supervisor_name, recipient_name, job.address,
+            job.description, job.preset_price, job.deadline, job.created_at,
+            job.supervisor_photos, bot is not None,
+        )
+        return await cls._cached_artifact(
+            ("dispatch", job.id, version),
+            lambda: cls._render_job_dispatch_pdf(job, supervisor_name, recipient_name, bot),
+        )
+
+    @classmethod
+    async def get_job_completion_pdf(
+        cls,
+        job: Job,
+        subcontractor_name: str | None = None,
+        notes: str | None = None,
+        photo_count: int = 0,
+        bot: Any | None = None,
+    ) -> tuple[str, bytes]:
+        """Cached :meth:`build_job_completion_pdf`."""
+        version = cls.content_version(
+            job.title, job.job_type, subcontractor_name, job.company_name, job.address,
+            notes, photo_count, job.accepted_at, job.submitted_at, job.photos, bot is not None,
+        )
+        return await cls._cached_artifact(
+            ("completion", job.id, version),
+            lambda: cls._render_job_completion_pdf(job, subcontractor_name, notes, photo_count, bot),
+        )
+
     @classmethod
     async def build_job_dispatch_pdf(
         cls,
@@ -122,6 +195,17 @@ class JobPdfService:
         recipient_name: str | None = None,
         bot: Any | None = None,
     ) -> tuple[str, bytes]:
+        artifact, _ = await cls._render_job_dispatch_pdf(job, supervisor_name, recipient_name, bot)
+        return artifact
+
+    @classmethod
+    async def _render_job_dispatch_pdf(
+        cls,
+        job: Job,
+        supervisor_name: str | None,
+        recipient_name: str | None,
+        bot: Any | None,
+    ) -> tuple[tuple[str, bytes], bool]:
         pdf = cls._base_pdf(f"Work Order - Job #{job.id}")
 
         cls._add_field(pdf, "Job ID:", str(job.id))
@@ -134,19 +218,13 @@ class JobPdfService:
         cls._add_field(pdf, "Preset Price:", job.preset_price)
         cls._add_field(pdf, "Deadline:", cls._fmt_dt(job.deadline))
         cls._add_field(pdf, "Created At:", cls._fmt_dt(job.created_at))
-        await cls._add_photo_gallery(
+        complete = await cls._add_photo_gallery(
             pdf,
             bot,
             cls._extract_photo_ids(job.supervisor_photos),
             "Job Photos:",
         )
-
-        out = pdf.output(dest="S")
-        if isinstance(out, str):
-            content = out.encode("latin-1")
-        else:
-            content = bytes(out)
-        return f"job_{job.id}_work_order.pdf", content
+        return (f"job_{job.id}_work_order.pdf", cls._output(pdf)), complete
 
     @classmethod
     async def build_job_completion_pdf(
@@ -157,6 +235,18 @@ class JobPdfService:
         photo_count: int = 0,
         bot: Any | None = None,
     ) -> tuple[str, bytes]:
+        artifact, _ = await cls._render_job_completion_pdf(job, subcontractor_name, notes, photo_count, bot)
+        return artifact
+
+    @classmethod
+    async def _render_job_completion_pdf(
+        cls,
+        job: Job,
+        subcontractor_name: str | None,
+        notes: str | None,
+        photo_count: int,
+        bot: Any | None,
+    ) -> tuple[tuple[str, bytes], bool]:
         pdf = cls._base_pdf(f"Completion Report - Job #{job.id}")
 
         cls._add_field(pdf, "Job ID:", str(job.id))
@@ -168,17 +258,11 @@ class JobPdfService:
         cls._add_field(pdf, "Submitted Notes:", notes)
         cls._add_field(pdf, "Submitted Photos:", str(photo_count))
         cls._add_field(pdf, "Accepted At:", cls._fmt_dt(job.accepted_at))
-        cls._add_field(pdf, "Submitted At:", format_au(now_au_naive()))
-        await cls._add_photo_gallery(
+        cls._add_field(pdf, "Submitted At:", cls._fmt_dt(job.submitted_at))
+        complete = await cls._add_photo_gallery(
             pdf,
             bot,
             cls._extract_photo_ids(job.photos),
             "Completion Photos:",
         )
-
-        out = pdf.output(dest="S")
-        if isinstance(out, str):
-            content = out.encode("latin-1")
-        else:
-            content = bytes(out)
-        return f"job_{job.id}_completion_report.pdf", content
+        return (f"job_{job.id}_completion_report.pdf", cls._output(pdf)), complete
@@ -0,0 +1,203 @@
+import asyncio
+import hashlib
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from io import BytesIO
+from typing import Any
+from src.bot.config import config
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class PhotoCache:
+    """On-disk, content-addressed cache of Telegram photos used in PDF galleries.
+
+    Files are stored under their ``file_unique_id`` (stable across bots and
+    re-sends), evicted least-recently-used once the directory exceeds
+    ``PHOTO_CACHE_MAX_MB``. Callers get the bytes back in memory, ready to hand
+    to ``FPDF.image``. Which ``file_unique_id`` a ``file_id`` resolves to is
+    kept next to the photos (``file_ids/``, one small file per ``file_id``,
+    oldest pruned past ``MAX_ID_MAPPINGS``), so a restarted or sibling process
+    serves cached photos without a ``getFile`` call first.
+
+    Disk I/O runs in worker threads, so the index is guarded by a
+    ``threading.Lock``; the per-photo asyncio locks are reference-counted and
+    dropped only once nobody is waiting on them.
+    """
+
+    MAX_ID_MAPPINGS = 4096
+
+    _index: "OrderedDict[str, int] | None" = None  # file_unique_id -> size, oldest first
+    _total_bytes = 0
+    _unique_ids: "OrderedDict[str, str]" = OrderedDict()  # file_id -> file_unique_id, in front of file_ids/
+    _id_files: int | None = None  # mapping files on disk, counted on first write
+    _locks: dict[str, asyncio.Lock] = {}
+    _lock_users: dict[str, int] = {}  # unique_id -> coroutines holding or waiting on _locks[unique_id]
+    _index_lock = threading.Lock()
+
+    @staticmethod
+    def _cache_dir() -> str:
+        return config.PHOTO_CACHE_DIR or os.path.join(tempfile.gettempdir(), "taskrelay_photos")
+
+    @classmethod
+    def _path(cls, unique_id: str) -> str:
+        return os.path.join(cls._cache_dir(), unique_id)
+
+    @classmethod
+    def _id_path(cls, file_id: str) -> str:
+        return os.path.join(cls._cache_dir(), "file_ids", hashlib.sha1(file_id.encode()).hexdigest())
+
+    @classmethod
+    def _load_index(cls):
+        """Scan the cache directory once. Call with ``_index_lock`` held."""
+        if cls._index is not None:
+            return
+        directory = cls._cache_dir()
+        os.makedirs(directory, exist_ok=True)
+        entries = []
+        for entry in os.scandir(directory):
+            if entry.is_file():
+                stat = entry.stat()
+                entries.append((stat.st_mtime, entry.name, stat.st_size))
+        entries.sort()
+        cls._index = OrderedDict((name, size) for _, name, size in entries)
+        cls._total_bytes = sum(cls._index.values())
+
+    @classmethod
+    def _read(cls, unique_id: str) -> bytes | None:
+        with cls._index_lock:
+            cls._load_index()
+            if unique_id not in cls._index:
+                return None
+        path = cls._path(unique_id)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+            os.utime(path)  # keep recency across restarts
+        except OSError:
+            with cls._index_lock:
+                cls._total_bytes -= cls._index.pop(unique_id, 0)
+            return None
+        with cls._index_lock:
+            if unique_id in cls._index:
+                cls._index.move_to_end(unique_id)
+        return data
+
+    @classmethod
+    def _write(cls, unique_id: str, data: bytes):
+        with cls._index_lock:
+            cls._load_index()
+        path = cls._path(unique_id)
+        fd, temp_path = tempfile.mkstemp(dir=cls._cache_dir())
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(temp_path, path)
+
+        max_bytes = config.PHOTO_CACHE_MAX_MB * 1024 * 1024
+        with cls._index_lock:
+            cls._total_bytes += len(data) - cls._index.pop(unique_id, 0)
+            cls._index[unique_id] = len(data)
+            while cls._total_bytes > max_bytes and len(cls._index) > 1:
+                oldest, size = cls._index.popitem(last=False)
+                cls._total_bytes -= size
+                try:
+                    os.remove(cls._path(oldest))
+                except OSError:
+                    pass
+
+    @classmethod
+    def _read_unique_id(cls, file_id: str) -> str | None:
+        try:
+            with open(cls._id_path(file_id), encoding="ascii") as f:
+                return f.read().strip() or None
+        except OSError:
+            return None
+
+    @classmethod
+    def _write_unique_id(cls, file_id: str, unique_id: str):
+        path = cls._id_path(file_id)
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+        existed = os.path.exists(path)
+        fd, temp_path = tempfile.mkstemp(dir=directory, prefix=".")
+        with os.fdopen(fd, "w", encoding="ascii") as f:
+            f.write(unique_id)
+        os.replace(temp_path, path)
+
+        with cls._index_lock:
+            if cls._id_files is None:
+                cls._id_files = sum(1 for entry in os.scandir(directory) if not entry.name.startswith("."))
+            elif not existed:
+                cls._id_files += 1
+            if cls._id_files <= cls.MAX_ID_MAPPINGS:
+                return
+            entries = sorted(
+                (entry.stat().st_mtime, entry.path)
+                for entry in os.scandir(directory) if not entry.name.startswith(".")
+            )
+            # Drop the oldest quarter; a dropped file_id just costs one getFile again.
+            excess = len(entries) - cls.MAX_ID_MAPPINGS * 3 // 4
+            for _, stale in entries[:max(excess, 0)]:
+                try:
+                    os.remove(stale)
+                except OSError:
+                    pass
+            cls._id_files = len(entries) - max(excess, 0)
+
+    @classmethod
+    def _remember_unique_id(cls, file_id: str, unique_id: str):
+        cls._unique_ids[file_id] = unique_id
+        cls._unique_ids.move_to_end(file_id)
+        while len(cls._unique_ids) > cls.MAX_ID_MAPPINGS:
+            cls._unique_ids.popitem(last=False)
+
+    @classmethod
+    async def get_bytes(cls, bot: Any, file_id: str) -> bytes:
+        unique_id = cls._unique_ids.get(file_id) or await asyncio.to_thread(cls._read_unique_id, file_id)
+        if unique_id:
+            cls._remember_unique_id(file_id, unique_id)
+            data = await asyncio.to_thread(cls._read, unique_id)
+            if data is not None:
+                return data
+
+        tg_file = await bot.get_file(file_id)
+        unique_id = tg_file.file_unique_id
+        if cls._unique_ids.get(file_id) != unique_id:
+            try:
+                await asyncio.to_thread(cls._write_unique_id, file_id, unique_id)
+            except OSError as e:
+                logger.warning(f"Could not record photo {unique_id}: {e}")
+        cls._remember_unique_id(file_id, unique_id)
+
+        # One download per photo even when several PDFs are rendered at once.
+        lock = cls._locks.setdefault(unique_id, asyncio.Lock())
+        cls._lock_users[unique_id] = cls._lock_users.get(unique_id, 0) + 1
+        try:
+            async with lock:
+                data = await asyncio.to_thread(cls._read, unique_id)
+                if data is not None:
+                    return data
+
+                downloaded = await bot.download_file(tg_file.file_path)
+                if hasattr(downloaded, "seek"):
+                    downloaded.seek(0)
+                data = downloaded.read()
+
+                try:
+                    await asyncio.to_thread(cls._write, unique_id, data)
+                except OSError as e:
+                    logger.warning(f"Could not cache photo {unique_id}: {e}")
+                return data
+        finally:
+            cls._lock_users[unique_id] -= 1
+            if not cls._lock_users[unique_id]:
+                del cls._lock_users[unique_id]
+                cls._locks.pop(unique_id, None)
+
+    @classmethod
+    async def get_image(cls, bot: Any, file_id: str) -> BytesIO:
+        """Photo bytes wrapped for ``FPDF.image``."""
+        return BytesIO(await cls.get_bytes(bot, file_id))
@@ -1,75 +1,107 @@
 from datetime import datetime
-from sqlalchemy import select
-from src.bot.database import async_session, Quote, Job, User
+from sqlalchemy import select, update, literal, false, text, String, Text, DateTime
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased
+from src.bot.database import async_session, session_scope, transaction_scope, commit_scope, Quote, Job, User
 from src.bot.database.models import JobStatus, JobType
+from src.bot.services.timers import TimerService
+from src.bot.services.jobs import STALE_JOB_MESSAGE
 import logging
 
 logger = logging.getLogger(__name__)
 
 class QuoteService:
     @staticmethod
-    async def submit_quote(job_id: int, telegram_id: int, amount: str, notes: str = None) -> tuple[bool, str]:
+    async def submit_quote(job_id: int, telegram_id: int, amount: str, notes: str = None, session: AsyncSession | None = None) -> tuple[bool, str]:
         if not async_session:
             return False, "Database not available"
         
-        async with async_session() as session:
-            job_result = await session.execute(select(Job).where(Job.id == job_id))
-            job = job_result.scalar_one_or_none()
-            
-            if not job:
-                return False, "Job not found"
-            
-            if job.status == JobStatus.ARCHIVED:
-                return False, "Cannot quote on archived job"
-            
-            if job.job_type != JobType.QUOTE:
-                return False, "This job does not accept quotes"
-            
-            if job.status not in [JobStatus.SENT]:
-                return False, "Job is no longer accepting quotes"
-            
-            user_result = await session.execute(
-                select(User).where(User.telegram_id == telegram_id)
+        async with transaction_scope(session) as session:
+            # Validation, duplicate check and insert in one statement: the SELECT
+            # yields a row only for a SENT quote job and an active user, and the
+            # partial unique index turns a second live quote into a no-op.
+            source = select(
+                Job.id,
+                User.id,
+                literal(amount, String),
+                literal(notes, Text),
+                literal(datetime.utcnow(), DateTime),
+                false(),
+                false(),
+            ).where(
+                Job.id == job_id,
+                Job.status == JobStatus.SENT,
+                Job.job_type == JobType.QUOTE,
+                User.telegram_id == telegram_id,
+                User.is_active == True,
             )
-            user = user_result.scalar_one_or_none()
-            
-            if not user:
-                return False, "User not found"
-            
-            if not user.is_active:
-                return False, "Your account is not active"
-            
-            existing_quote = await session.execute(
-                select(Quote).where(
-                    Quote.job_id == job_id,
-                    Quote.subcontractor_id == user.id,
-                    Quote.is_declined == False
+            result = await session.execute(
+                pg_insert(Quote)
+                .from_select(
+                    ["job_id", "subcontractor_id", "amount", "notes", "submitted_at", "is_accepted", "is_declined"],
+                    source,
                 )
+                .on_conflict_do_nothing(
+                    index_elements=["job_id", "subcontractor_id"],
+                    index_where=text("NOT is_declined"),
+                )
+                .returning(Quote.id)
             )
-            active_quote = existing_quote.scalar_one_or_none()
-            if active_quote:
-                if active_quote.is_accepted:
-                    return False, "Your quote was already accepted for this job"
-                return False, "You have already submitted a quote for this job"
-            
-            quote = Quote(
-                job_id=job_id,
-                subcontractor_id=user.id,
-                amount=amount,
-                notes=notes,
-                submitted_at=datetime.utcnow()
-            )
-            session.add(quote)
-            await session.commit()
+            
+            if result.scalar_one_or_none() is None:
+                # Slow path only: work out which check failed.
+                return await QuoteService._submit_failure_reason(session, job_id, telegram_id)
+            
+            await commit_scope(session)
             
             return True, f"Quote of {amount} submitted successfully"
     
     @staticmethod
-    async def get_quotes_for_job(job_id: int) -> list:
+    async def _submit_failure_reason(session: AsyncSession, job_id: int, telegram_id: int) -> tuple[bool, str]:
+        job = await session.get(Job, job_id)
+        
+        if not job:
+            return False, "Job not found"
+        
+        if job.status == JobStatus.ARCHIVED:
+            return False, "Cannot quote on archived job"
+        
+        if job.job_type != JobType.QUOTE:
+            return False, "This job does not accept quotes"
+        
+        if job.status not in [JobStatus.SENT]:
+            return False, "Job is no longer accepting quotes"
+        
+        user_result = await session.execute(
+            select(User).where(User.telegram_id == telegram_id)
+        )
+        user = user_result.scalar_one_or_none()
+        
+        if not user:
+            return False, "User not found"
+        
+        if not user.is_active:
+            return False, "Your account is not active"
+        
+        existing_quote = await session.execute(
+            select(Quote).where(
+                Quote.job_id == job_id,
+                Quote.subcontractor_id == user.id,
+                Quote.is_declined == False
+            )
+        )
+        active_quote = existing_quote.scalar_one_or_none()
+        if active_quote and active_quote.is_accepted:
+            return False, "Your quote was already accepted for this job"
+        return False, "You have already submitted a quote for this job"
+    
+    @staticmethod
+    async def get_quotes_for_job(job_id: int, session: AsyncSession | None = None) -> list:
         if not async_session:
             return []
         
-        async with async_session() as session:
+        async with session_scope(session) as session:
             result = await session.execute(
                 select(Quote, User).join(User, Quote.subcontractor_id == User.id).where(
                     Quote.job_id == job_id
@@ -78,7 +110,7 @@ class QuoteService:
             return list(result.all())
     
     @staticmethod
-    async def accept_quote(quote_id: int, supervisor_telegram_id: int) -> tuple[bool, str, int, int, str, str]:
+    async def accept_quote(quote_id: int, supervisor_telegram_id: int, session: AsyncSession | None = None) -> tuple[bool, str, int, int, str, str]:
         """
         Accept a quote and assign job to subcontractor.
         Returns: (success, message, subcontractor_telegram_id, job_id, job_title, quote_amount)
@@ -86,58 +118,90 @@ class QuoteService:
         if not async_session:
             return False, "Database not available", 0, 0, "", ""
         
-        async with async_session() as session:
-            quote_result = await session.execute(
-                select(Quote).where(Quote.id == quote_id)
-            )
-            quote = quote_result.scalar_one_or_none()
+        async with transaction_scope(session) as session:
+            row = (await QuoteService._read_quote(session, quote_id, supervisor_telegram_id)).first()
             
-            if not quote:
+            if not row:
                 return False, "Quote not found", 0, 0, "", ""
             
-            job_result = await session.execute(select(Job).where(Job.id == quote.job_id))
-            job = job_result.scalar_one_or_none()
-            
-            if not job:
+            if row.job_status is None:
                 return False, "Job not found", 0, 0, "", ""
             
-            if job.status == JobStatus.ARCHIVED:
+            if row.job_status == JobStatus.ARCHIVED:
                 return False, "Cannot modify archived job", 0, 0, "", ""
             
-            if job.status not in [JobStatus.SENT]:
-                return False, f"Job is not accepting quotes (status: {job.status.value})", 0, 0, "", ""
+            if row.job_status not in [JobStatus.SENT]:
+                return False, f"Job is not accepting quotes (status: {row.job_status.value})", 0, 0, "", ""
             
-            sup_result = await session.execute(
-                select(User).where(User.telegram_id == supervisor_telegram_id)
-            )
-            supervisor = sup_result.scalar_one_or_none()
-            
-            if not supervisor or job.supervisor_id != supervisor.id:
+            if not row.supervisor_id or row.job_supervisor_id != row.supervisor_id:
                 return False, "You don't have permission to accept quotes for this job", 0, 0, "", ""
             
-            # Get subcontractor telegram_id
-            sub_result = await session.execute(
-                select(User).where(User.id == quote.subcontractor_id)
+            # Claim the job and mark the quote in one statement; the job update
+            # only matches while the job is still SENT, so a concurrent accept
+            # or close leaves the quote untouched too.
+            claimed = (
+                update(Job)
+                .where(Job.id == row.job_id, Job.status == JobStatus.SENT)
+                .values(
+                    status=JobStatus.ACCEPTED,
+                    subcontractor_id=row.subcontractor_id,
+                    accepted_quote_id=quote_id,
+                    accepted_at=datetime.utcnow(),
+                )
+                .returning(
+                    Job.id, Job.status, Job.sent_at, Job.subcontractor_id, Job.reminder_sent,
+                    Job.deadline, Job.deadline_reminder_sent, Job.deadline_overdue_sent,
+                )
+                .cte("claimed")
             )
-            subcontractor = sub_result.scalar_one_or_none()
-            sub_telegram_id = subcontractor.telegram_id if subcontractor else 0
-            
-            quote.is_accepted = True
-            job.status = JobStatus.ACCEPTED
-            job.subcontractor_id = quote.subcontractor_id
-            job.accepted_quote_id = quote.id
-            job.accepted_at = datetime.utcnow()
+            result = await session.execute(
+                update(Quote)
+                .where(Quote.id == quote_id, Quote.job_id == claimed.c.id)
+                .values(is_accepted=True)
+                .returning(*claimed.c)
+                .execution_options(synchronize_session=False)
+            )
+            job = result.first()
+            if not job:
+                return False, STALE_JOB_MESSAGE, 0, 0, "", ""
             
-            await session.commit()
+            await TimerService.schedule_job(job, session)
+            await commit_scope(session)
             
-            return True, f"Quote accepted! Job assigned to subcontractor.", sub_telegram_id, job.id, job.title, quote.amount
+            return True, f"Quote accepted! Job assigned to subcontractor.", row.sub_telegram_id or 0, row.job_id, row.job_title, row.amount
     
     @staticmethod
-    async def get_other_quote_subcontractors(job_id: int, accepted_subcontractor_id: int) -> list[int]:
+    async def _read_quote(session: AsyncSession, quote_id: int, supervisor_telegram_id: int):
+        """
+        One joined read of a quote with its job, the acting supervisor's id
+        and the quoting subcontractor's telegram id.
+        """
+        supervisor = aliased(User)
+        subcontractor = aliased(User)
+        return await session.execute(
+            select(
+                Quote.amount,
+                Quote.subcontractor_id,
+                Job.id.label("job_id"),
+                Job.title.label("job_title"),
+                Job.status.label("job_status"),
+                Job.supervisor_id.label("job_supervisor_id"),
+                supervisor.id.label("supervisor_id"),
+                subcontractor.telegram_id.label("sub_telegram_id"),
+            )
+            .select_from(Quote)
+            .outerjoin(Job, Job.id == Quote.job_id)
+            .outerjoin(supervisor, supervisor.telegram_id == supervisor_telegram_id)
+            .outerjoin(subcontractor, subcontractor.id == Quote.subcontractor_id)
+            .where(Quote.id == quote_id)
+        )
+    
+    @staticmethod
+    async def get_other_quote_subcontractors(job_id: int, accepted_subcontractor_id: int, session: AsyncSession | None = None) -> list[int]:
         if not async_session:
             return []
         
-        async with async_session() as session:
+        async with session_scope(session) as session:
             result = await session.execute(
                 select(Quote, User).join(User, Quote.subcontractor_id == User.id).where(
                     Quote.job_id == job_id,
@@ -147,59 +211,49 @@ class QuoteService:
             return [user.telegram_id for quote, user in result.all()]
     
     @staticmethod
-    async def decline_quote(quote_id: int, supervisor_telegram_id: int, reason: str) -> tuple[bool, str, int, int, str]:
+    async def decline_quote(quote_id: int, supervisor_telegram_id: int, reason: str, session: AsyncSession | None = None) -> tuple[bool, str, int, int, str]:
         """
         Decline a quote and return job to available status.
+        An accepted quote cannot be declined - the job is already assigned
+        from it - and gets the stale-job message instead.
         Returns: (success, message, subcontractor_telegram_id, job_id, job_title)
         """
         if not async_session:
             return False, "Database not available", 0, 0, ""
         
-        async with async_session() as session:
-            quote_result = await session.execute(
-                select(Quote).where(Quote.id == quote_id)
-            )
-            quote = quote_result.scalar_one_or_none()
+        async with transaction_scope(session) as session:
+            row = (await QuoteService._read_quote(session, quote_id, supervisor_telegram_id)).first()
             
-            if not quote:
+            if not row:
                 return False, "Quote not found", 0, 0, ""
             
-            job_result = await session.execute(select(Job).where(Job.id == quote.job_id))
-            job = job_result.scalar_one_or_none()
-            
-            if not job:
+            if row.job_status is None:
                 return False, "Job not found", 0, 0, ""
             
-            sup_result = await session.execute(
-                select(User).where(User.telegram_id == supervisor_telegram_id)
-            )
-            supervisor = sup_result.scalar_one_or_none()
-            
-            if not supervisor or job.supervisor_id != supervisor.id:
+            if not row.supervisor_id or row.job_supervisor_id != row.supervisor_id:
                 return False, "You don't have permission to decline quotes for this job", 0, 0, ""
             
-            # Get subcontractor telegram_id
-            sub_result = await session.execute(
-                select(User).where(User.id == quote.subcontractor_id)
+            # Mark quote as declined; an already accepted quote stays accepted.
+            result = await session.execute(
+                update(Quote)
+                .where(Quote.id == quote_id, Quote.is_accepted.is_not(True))
+                .values(is_declined=True, decline_reason=reason)
+                .returning(Quote.id)
             )
-            subcontractor = sub_result.scalar_one_or_none()
-            sub_telegram_id = subcontractor.telegram_id if subcontractor else 0
-            
-            # Mark quote as declined
-            quote.is_declined = True
-            quote.decline_reason = reason
+            if result.scalar_one_or_none() is None:
+                return False, STALE_JOB_MESSAGE, 0, 0, ""
             
-            await session.commit()
+            await commit_scope(session)
             
-            return True, "Quote declined", sub_telegram_id, job.id, job.title
+            return True, "Quote declined", row.sub_telegram_id or 0, row.job_id, row.job_title
     
     @staticmethod
-    async def can_resubmit_quote(job_id: int, telegram_id: int) -> tuple[bool, str]:
+    async def can_resubmit_quote(job_id: int, telegram_id: int, session: AsyncSession | None = None) -> tuple[bool, str]:
         """Check if a subcontractor can resubmit a quote (only if previous was declined)."""
         if not async_session:
             return False, "Database not available"
         
-        async with async_session() as session:
+        async with session_scope(session) as session:
             user_result = await session.execute(
                 select(User).where(User.telegram_id == telegram_id)
             )
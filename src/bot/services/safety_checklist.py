@@ -1,6 +1,5 @@
 import json
 import os
-import tempfile
 from datetime import datetime, date
 from io import StringIO
 from typing import Any
@@ -9,8 +8,9 @@ from fpdf import FPDF
 from sqlalchemy import select, or_, func
 from sqlalchemy.exc import SQLAlchemyError
 
-from src.bot.database import async_session, SafetyChecklist, SafetyChecklistAudit, SafetyChecklistRequest, User, Job
+from src.bot.database import async_session, read_scope, SafetyChecklist, SafetyChecklistAudit, SafetyChecklistRequest, User, Job
 from src.bot.database.models import UserRole, JobStatus
+from src.bot.services.photo_cache import PhotoCache
 from src.bot.utils.timezone import now_au_naive, format_au
 
 
@@ -215,7 +215,7 @@ class SafetyChecklistService:
     async def list_checklists(limit: int = 30, status: str | None = None, keyword: str | None = None) -> list[SafetyChecklist]:
         if not async_session:
             return []
-        async with async_session() as session:
+        async with read_scope() as session:
             q = select(SafetyChecklist).order_by(SafetyChecklist.created_at.desc()).limit(limit)
             if status:
                 q = q.where(SafetyChecklist.status == status.upper())
@@ -330,23 +330,6 @@ class SafetyChecklistPdfService:
             return "N/A"
         return str(value).encode("latin-1", errors="replace").decode("latin-1")
 
-    @staticmethod
-    async def _download_temp_photo(bot: Any, file_id: str) -> str:
-        tg_file = await bot.get_file(file_id)
-        downloaded = await bot.download_file(tg_file.file_path)
-
-        if hasattr(downloaded, "seek"):
-            downloaded.seek(0)
-        data = downloaded.read()
-
-        suffix = os.path.splitext(tg_file.file_path or "")[1].lower()
-        if suffix not in {".jpg", ".jpeg", ".png", ".webp"}:
-            suffix = ".jpg"
-
-        with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as temp_file:
-            temp_file.write(data)
-            return temp_file.name
-
     @classmethod
     async def build_pdf(
         cls,
@@ -436,22 +419,15 @@ class SafetyChecklistPdfService:
                 pdf.set_font("Helvetica", "B", 12)
                 pdf.cell(0, 8, "Attached Photos", ln=True)
             for idx, photo_id in enumerate(photo_ids, start=1):
-                temp_path = None
                 try:
-                    temp_path = await cls._download_temp_photo(bot, photo_id)
+                    image = await PhotoCache.get_image(bot, photo_id)
                     pdf.set_font("Helvetica", size=10)
                     pdf.cell(0, 7, f"Photo {idx}", ln=True)
                     page_width = pdf.w - pdf.l_margin - pdf.r_margin
-                    pdf.image(temp_path, w=page_width)
+                    pdf.image(image, w=page_width)
                     pdf.ln(2)
                 except Exception:
                     continue
-                finally:
-                    if temp_path and os.path.exists(temp_path):
-                        try:
-                            os.remove(temp_path)
-                        except OSError:
-                            pass
 
         out = pdf.output(dest="S")
         content = out.encode("latin-1") if isinstance(out, str) else bytes(out)
@@ -1,14 +1,23 @@
 ﻿import asyncio
 from datetime import datetime, timedelta
 from sqlalchemy import select, and_
+from sqlalchemy.orm import aliased
 from src.bot.database import async_session, Job, User, WeeklyAvailability
 from src.bot.database.models import JobStatus, UserRole
 from src.bot.config import config
-from src.bot.i18n import msg as i18n_msg, get_recipient_lang
+from src.bot.i18n import msg as i18n_msg, get_recipient_langs, LANGUAGES
+from src.bot.services.outbox import OutboxService
+from src.bot.services.archive import ArchiveService
+from src.bot.services.fsm_storage import PostgresStorage
+from src.bot.services.timers import TimerService, REMINDER, AUTO_CLOSE, DEADLINE_WARNING, OVERDUE
 import logging
 
 logger = logging.getLogger(__name__)
 
+def _lang_of(user: User) -> str:
+    return user.language if user.language in LANGUAGES else "en"
+
+
 class SchedulerService:
     bot = None
     
@@ -18,15 +27,61 @@ class SchedulerService:
     
     @classmethod
     async def run_scheduler(cls):
+        """
+        Sleep on the TimerService heap and run a job pass only when one of its
+        timers is due. Housekeeping (availability, archiving, expired FSM states) and a timer
+        rebuild - which also picks up anything other processes failed to notify -
+        run every SCHEDULER_RESYNC_SECONDS. Timers of a failed pass are put back.
+        """
         logger.info("Starting background scheduler")
+        passes = {
+            REMINDER: cls.check_reminders,
+            AUTO_CLOSE: cls.check_auto_close,
+            DEADLINE_WARNING: cls.check_deadline_reminders,
+            OVERDUE: cls.check_deadline_reminders,
+        }
+        loop = asyncio.get_running_loop()
+        next_resync = loop.time()
+        await TimerService.activate()
+        try:
+            await cls._scheduler_loop(passes, loop, next_resync)
+        finally:
+            await TimerService.deactivate()
+    
+    @classmethod
+    async def _scheduler_loop(cls, passes, loop, next_resync):
         while True:
             try:
-                await cls.check_reminders()
-                await cls.check_auto_close()
-                await cls.check_deadline_reminders()
-                await cls.check_weekly_availability_survey()
-                await cls.check_availability_reminder()
-                await asyncio.sleep(1800)  # Run every 30 minutes
+                if TimerService.listener_lost():
+                    # Notifications sent while disconnected are gone: rebuild now.
+                    logger.warning("Timer LISTEN connection lost, reconnecting")
+                    await TimerService.listen()
+                    next_resync = loop.time()
+                if loop.time() >= next_resync:
+                    await cls.check_weekly_availability_survey()
+                    await cls.check_availability_reminder()
+                    await cls.check_archive()
+                    await cls.check_fsm_states()
+                    if not TimerService.listening():
+                        await TimerService.listen()
+                    count = await TimerService.rebuild()
+                    logger.info(f"Scheduler timers rebuilt: {count} pending")
+                    next_resync = loop.time() + config.SCHEDULER_RESYNC_SECONDS
+                
+                due = await TimerService.wait_due(timeout=max(next_resync - loop.time(), 0))
+                # Both deadline kinds share one pass; run each pass once.
+                by_pass = {}
+                for timer in due:
+                    by_pass.setdefault(passes[timer[1]], []).append(timer)
+                failed = None
+                for check, timers in by_pass.items():
+                    try:
+                        await check()
+                    except Exception as e:
+                        TimerService.restore(timers)
+                        failed = e
+                if failed:
+                    raise failed
             except asyncio.CancelledError:
                 logger.info("Scheduler cancelled")
                 break
@@ -34,6 +89,45 @@ class SchedulerService:
                 logger.error(f"Scheduler error: {e}")
                 await asyncio.sleep(60)
     
+    @classmethod
+    async def _claim_in_batches(cls, query, process, after_commit=None):
+        """
+        Run ``process(session, rows)`` over the rows of ``query`` in bounded batches.
+        
+        Each batch is claimed with SELECT ... FOR UPDATE SKIP LOCKED and committed
+        together with whatever ``process`` changed and enqueued, so replicas running
+        the same pass split the work instead of duplicating it: a row is either
+        locked by another replica (skipped) or already flagged once it commits.
+        ``query`` must select Job first and be ordered.
+        
+        With ``after_commit``, ``process`` is a plain function that only flags
+        the rows and returns what to send; ``after_commit(result)`` then does the
+        slow part (translation, enqueueing) once the locks are released.
+        """
+        batch_size = config.SCHEDULER_BATCH_SIZE
+        seen = set()
+        while True:
+            claim = query.limit(batch_size).with_for_update(skip_locked=True, of=Job)
+            if seen:
+                # Rows process() left unflagged (send errors) wait for the next pass
+                claim = claim.where(Job.id.notin_(seen))
+            
+            async with async_session() as session:
+                rows = (await session.execute(claim)).all()
+                if not rows:
+                    return
+                if after_commit:
+                    pending = process(session, rows)
+                else:
+                    await process(session, rows)
+                await session.commit()
+            if after_commit:
+                await after_commit(pending)
+            
+            seen.update(row[0].id for row in rows)
+            if len(rows) < batch_size:
+                return
+    
     @classmethod
     async def check_reminders(cls):
         if not async_session or not cls.bot:
@@ -41,28 +135,17 @@ class SchedulerService:
         
         reminder_cutoff = datetime.utcnow() - timedelta(hours=config.RESPONSE_REMINDER_HOURS)
         
-        async with async_session() as session:
-            result = await session.execute(
-                select(Job, User).join(
-                    User, Job.subcontractor_id == User.id
-                ).where(
-                    and_(
-                        Job.status == JobStatus.SENT,
-                        Job.sent_at < reminder_cutoff,
-                        Job.reminder_sent == False,
-                        Job.subcontractor_id != None
-                    )
-                )
-            )
-            jobs_with_users = result.all()
+        async def process(session, jobs_with_users):
+            langs = await get_recipient_langs(user.telegram_id for _, user in jobs_with_users)
             
             for job, user in jobs_with_users:
                 try:
-                    sub_lang = await get_recipient_lang(user.telegram_id)
-                    await cls.bot.send_message(
+                    sub_lang = langs[user.telegram_id]
+                    await OutboxService.enqueue(
                         user.telegram_id,
                         i18n_msg("pending_job_reminder", lang=sub_lang, job_id=job.id, title=job.title),
-                        parse_mode="Markdown"
+                        parse_mode="Markdown",
+                        session=session
                     )
                     
                     job.reminder_sent = True
@@ -70,8 +153,32 @@ class SchedulerService:
                     logger.info(f"Sent reminder for job {job.id} to user {user.telegram_id}")
                 except Exception as e:
                     logger.error(f"Failed to send reminder for job {job.id}: {e}")
-            
-            await session.commit()
+        
+        await cls._claim_in_batches(
+            select(Job, User).join(
+                User, Job.subcontractor_id == User.id
+            ).where(
+                and_(
+                    Job.status == JobStatus.SENT,
+                    Job.sent_at < reminder_cutoff,
+                    Job.reminder_sent == False,
+                    Job.subcontractor_id != None
+                )
+            ).order_by(Job.id),
+            process
+        )
+    
+    @classmethod
+    async def check_archive(cls):
+        # Chunked and committed per chunk; a run cut short resumes on the next pass.
+        await ArchiveService.archive_old_jobs()
+        await ArchiveService.move_to_cold_storage()
+    
+    @classmethod
+    async def check_fsm_states(cls):
+        purged = await PostgresStorage.purge_expired()
+        if purged:
+            logger.info(f"Purged {purged} expired FSM states")
     
     @classmethod
     async def check_auto_close(cls):
@@ -80,36 +187,37 @@ class SchedulerService:
         
         close_cutoff = datetime.utcnow() - timedelta(hours=config.JOB_AUTO_CLOSE_HOURS)
         
-        async with async_session() as session:
-            result = await session.execute(
-                select(Job, User).join(
-                    User, Job.supervisor_id == User.id
-                ).where(
-                    and_(
-                        Job.status == JobStatus.SENT,
-                        Job.sent_at < close_cutoff
-                    )
-                )
-            )
-            jobs_with_supervisors = result.all()
+        async def process(session, jobs_with_supervisors):
+            langs = await get_recipient_langs(supervisor.telegram_id for _, supervisor in jobs_with_supervisors)
             
             for job, supervisor in jobs_with_supervisors:
                 try:
                     job.status = JobStatus.CANCELLED
                     job.cancelled_at = datetime.utcnow()
                     
-                    sup_lang = await get_recipient_lang(supervisor.telegram_id)
-                    await cls.bot.send_message(
+                    sup_lang = langs[supervisor.telegram_id]
+                    await OutboxService.enqueue(
                         supervisor.telegram_id,
                         i18n_msg("job_auto_cancelled", lang=sup_lang, job_id=job.id, title=job.title, hours=config.JOB_AUTO_CLOSE_HOURS),
-                        parse_mode="Markdown"
+                        parse_mode="Markdown",
+                        session=session
                     )
                     
                     logger.info(f"Auto-cancelled job {job.id}")
                 except Exception as e:
                     logger.error(f"Failed to auto-close job {job.id}: {e}")
-            
-            await session.commit()
+        
+        await cls._claim_in_batches(
+            select(Job, User).join(
+                User, Job.supervisor_id == User.id
+            ).where(
+                and_(
+                    Job.status == JobStatus.SENT,
+                    Job.sent_at < close_cutoff
+                )
+            ).order_by(Job.id),
+            process
+        )
     
     @classmethod
     async def check_deadline_reminders(cls):
@@ -118,118 +226,128 @@ class SchedulerService:
           1. 24-hour warning  → sub only, when deadline is within the next 24 h
           2. Overdue alert    → sub + supervisor, once deadline has passed and
                                 job is still ACCEPTED or IN_PROGRESS
-        All messages are sent in the recipient's own language.
+        All messages are sent in the recipient's own language. Jobs are flagged
+        and committed first; titles are translated and messages enqueued after
+        the row locks are released.
         """
         if not async_session or not cls.bot:
             return
 
-        from src.bot.i18n import msg as i18n_msg, get_recipient_lang
         from src.bot.utils.translate import translate_text
 
         now = datetime.utcnow()
         active_statuses = [JobStatus.ACCEPTED, JobStatus.IN_PROGRESS]
 
-        async with async_session() as session:
+        # ── 1. 24-hour warning to sub ─────────────────────────────────────
+        upcoming_cutoff = now + timedelta(hours=24)
 
-            # ── 1. 24-hour warning to sub ─────────────────────────────────────
-            upcoming_cutoff = now + timedelta(hours=24)
-            upcoming_result = await session.execute(
-                select(Job, User).join(User, Job.subcontractor_id == User.id).where(
-                    and_(
-                        Job.status.in_(active_statuses),
-                        Job.deadline != None,
-                        Job.deadline > now,
-                        Job.deadline <= upcoming_cutoff,
-                        Job.deadline_reminder_sent == False,
-                    )
-                )
-            )
-            for job, sub in upcoming_result.all():
+        def process_upcoming(session, upcoming):
+            notices = []
+            for job, sub in upcoming:
+                job.deadline_reminder_sent = True
+                notices.append((job.id, job.title, job.deadline, sub.telegram_id, _lang_of(sub)))
+            return notices
+
+        async def send_upcoming(notices):
+            for job_id, title, deadline, sub_telegram_id, sub_lang in notices:
                 try:
-                    deadline_str = job.deadline.strftime("%d/%m/%Y")
-                    sub_lang = await get_recipient_lang(sub.telegram_id)
-                    translated_title = await translate_text(job.title, target_lang=sub_lang)
-                    await cls.bot.send_message(
-                        sub.telegram_id,
+                    translated_title = await translate_text(title, target_lang=sub_lang)
+                    await OutboxService.enqueue(
+                        sub_telegram_id,
                         i18n_msg(
                             "deadline_reminder", lang=sub_lang,
-                            job_id=job.id, title=translated_title, deadline=deadline_str,
+                            job_id=job_id, title=translated_title, deadline=deadline.strftime("%d/%m/%Y"),
                         ),
                         parse_mode="Markdown",
                     )
-                    job.deadline_reminder_sent = True
-                    logger.info(f"Sent 24h deadline reminder for job {job.id} to sub {sub.telegram_id}")
+                    logger.info(f"Sent 24h deadline reminder for job {job_id} to sub {sub_telegram_id}")
                 except Exception as e:
-                    logger.error(f"Failed to send 24h deadline reminder for job {job.id}: {e}")
+                    logger.error(f"Failed to send 24h deadline reminder for job {job_id}: {e}")
 
-            # ── 2. Overdue alert to sub + supervisor ──────────────────────────
-            overdue_result = await session.execute(
-                select(Job).where(
-                    and_(
-                        Job.status.in_(active_statuses),
-                        Job.deadline != None,
-                        Job.deadline < now,
-                        Job.deadline_overdue_sent == False,
-                        Job.subcontractor_id != None,
-                    )
+        await cls._claim_in_batches(
+            select(Job, User).join(User, Job.subcontractor_id == User.id).where(
+                and_(
+                    Job.status.in_(active_statuses),
+                    Job.deadline != None,
+                    Job.deadline > now,
+                    Job.deadline <= upcoming_cutoff,
+                    Job.deadline_reminder_sent == False,
                 )
-            )
-            overdue_jobs = overdue_result.scalars().all()
+            ).order_by(Job.id),
+            process_upcoming,
+            send_upcoming
+        )
 
-            for job in overdue_jobs:
-                deadline_str = job.deadline.strftime("%d/%m/%Y")
+        # ── 2. Overdue alert to sub + supervisor ──────────────────────────
+        supervisor_user = aliased(User)
 
-                # Fetch sub and supervisor
-                sub_result = await session.execute(
-                    select(User).where(User.id == job.subcontractor_id)
-                )
-                sub = sub_result.scalar_one_or_none()
+        def process_overdue(session, rows):
+            notices = []
+            for job, sub, supervisor in rows:
+                job.deadline_overdue_sent = True
+                notices.append((
+                    job.id, job.title, job.deadline,
+                    (sub.telegram_id, _lang_of(sub)),
+                    (supervisor.telegram_id, _lang_of(supervisor)) if supervisor else None,
+                    sub.first_name or sub.username or f"Sub #{job.subcontractor_id}",
+                ))
+            return notices
 
-                sup_result = await session.execute(
-                    select(User).where(User.id == job.supervisor_id)
-                )
-                supervisor = sup_result.scalar_one_or_none()
+        async def send_overdue(notices):
+            for job_id, title, deadline, (sub_telegram_id, sub_lang), supervisor, sub_name in notices:
+                deadline_str = deadline.strftime("%d/%m/%Y")
 
                 # Notify sub
-                if sub:
-                    try:
-                        sub_lang = await get_recipient_lang(sub.telegram_id)
-                        translated_title = await translate_text(job.title, target_lang=sub_lang)
-                        await cls.bot.send_message(
-                            sub.telegram_id,
-                            i18n_msg(
-                                "deadline_overdue_sub", lang=sub_lang,
-                                job_id=job.id, title=translated_title, deadline=deadline_str,
-                            ),
-                            parse_mode="Markdown",
-                        )
-                        logger.info(f"Sent overdue alert for job {job.id} to sub {sub.telegram_id}")
-                    except Exception as e:
-                        logger.error(f"Failed to send overdue alert to sub for job {job.id}: {e}")
+                try:
+                    translated_title = await translate_text(title, target_lang=sub_lang)
+                    await OutboxService.enqueue(
+                        sub_telegram_id,
+                        i18n_msg(
+                            "deadline_overdue_sub", lang=sub_lang,
+                            job_id=job_id, title=translated_title, deadline=deadline_str,
+                        ),
+                        parse_mode="Markdown",
+                    )
+                    logger.info(f"Sent overdue alert for job {job_id} to sub {sub_telegram_id}")
+                except Exception as e:
+                    logger.error(f"Failed to send overdue alert to sub for job {job_id}: {e}")
 
                 # Notify supervisor
                 if supervisor:
+                    sup_telegram_id, sup_lang = supervisor
                     try:
-                        sub_name = (sub.first_name or sub.username or f"Sub #{job.subcontractor_id}") if sub else "Unknown"
-                        sup_lang = await get_recipient_lang(supervisor.telegram_id)
-                        translated_title = await translate_text(job.title, target_lang=sup_lang)
+                        translated_title = await translate_text(title, target_lang=sup_lang)
                         translated_sub_name = await translate_text(sub_name, target_lang=sup_lang)
-                        await cls.bot.send_message(
-                            supervisor.telegram_id,
+                        await OutboxService.enqueue(
+                            sup_telegram_id,
                             i18n_msg(
                                 "deadline_overdue_supervisor", lang=sup_lang,
-                                job_id=job.id, title=translated_title,
+                                job_id=job_id, title=translated_title,
                                 sub_name=translated_sub_name, deadline=deadline_str,
                             ),
                             parse_mode="Markdown",
                         )
-                        logger.info(f"Sent overdue alert for job {job.id} to supervisor {supervisor.telegram_id}")
+                        logger.info(f"Sent overdue alert for job {job_id} to supervisor {sup_telegram_id}")
                     except Exception as e:
-                        logger.error(f"Failed to send overdue alert to supervisor for job {job.id}: {e}")
+                        logger.error(f"Failed to send overdue alert to supervisor for job {job_id}: {e}")
 
-                job.deadline_overdue_sent = True
-
-            await session.commit()
+        # Sub and supervisor come with the claimed jobs: no per-job lookups.
+        await cls._claim_in_batches(
+            select(Job, User, supervisor_user).join(
+                User, Job.subcontractor_id == User.id
+            ).outerjoin(
+                supervisor_user, Job.supervisor_id == supervisor_user.id
+            ).where(
+                and_(
+                    Job.status.in_(active_statuses),
+                    Job.deadline != None,
+                    Job.deadline < now,
+                    Job.deadline_overdue_sent == False,
+                )
+            ).order_by(Job.id),
+            process_overdue,
+            send_overdue
+        )
     
     @classmethod
     async def check_weekly_availability_survey(cls):
@@ -333,11 +451,14 @@ class SchedulerService:
             
             for manager in managers:
                 try:
-                    await cls.bot.send_message(
+                    await OutboxService.enqueue(
                         manager.telegram_id,
                         message,
-                        parse_mode="Markdown"
+                        parse_mode="Markdown",
+                        session=session
                     )
                 except Exception as e:
                     logger.error(f"Failed to notify manager {manager.telegram_id} of availability: {e}")
+            
+            await session.commit()
 
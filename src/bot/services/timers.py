@@ -0,0 +1,232 @@
+import asyncio
+import heapq
+import json
+from datetime import datetime, timedelta
+from sqlalchemy import select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+from src.bot.config import config
+from src.bot.database import engine, async_session, Job
+from src.bot.database.models import JobStatus
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Timer kinds; the scheduler maps each to the pass that handles it.
+REMINDER = "reminder"
+AUTO_CLOSE = "auto_close"
+DEADLINE_WARNING = "deadline_warning"
+OVERDUE = "overdue"
+
+
+def job_timers(job) -> list[tuple[str, datetime]]:
+    """Every timer ``job`` currently needs, as (kind, due_at), from its own columns.
+
+    Mirrors the filters of the scheduler passes; a timer that fires for a job
+    that no longer matches is simply a no-op pass.
+    """
+    timers = []
+    if job.status == JobStatus.SENT and job.sent_at:
+        if job.subcontractor_id and not job.reminder_sent:
+            timers.append((REMINDER, job.sent_at + timedelta(hours=config.RESPONSE_REMINDER_HOURS)))
+        timers.append((AUTO_CLOSE, job.sent_at + timedelta(hours=config.JOB_AUTO_CLOSE_HOURS)))
+    if job.status in (JobStatus.ACCEPTED, JobStatus.IN_PROGRESS) and job.deadline:
+        if not job.deadline_reminder_sent:
+            timers.append((DEADLINE_WARNING, job.deadline - timedelta(hours=24)))
+        if job.subcontractor_id and not job.deadline_overdue_sent:
+            timers.append((OVERDUE, job.deadline))
+    return timers
+
+
+class TimerService:
+    """Min-heap of per-job due times that the scheduler sleeps on.
+
+    Only the process running the scheduler keeps timers (:meth:`activate`).
+    It builds them from the database (:meth:`rebuild`) and is fed by the job
+    services whenever a job is sent, accepted or declined (:meth:`schedule_job`),
+    so the scheduler wakes exactly when the earliest timer is due instead of
+    polling. Every other process (replicas, shard workers) hands its timers to
+    the scheduler with a ``NOTIFY`` in the job's own transaction; anything
+    missed is picked up by the next rebuild.
+    """
+
+    NOTIFY_CHANNEL = "job_timers"
+
+    _active = False
+    _listener = None  # AsyncConnection holding the LISTEN
+    _listener_raw = None  # its asyncpg connection
+    _heap: list[tuple[datetime, str, int]] = []
+    # (kind, job_id) -> due_at; heap entries that disagree are stale and skipped
+    _due: dict[tuple[str, int], datetime] = {}
+    _changed = asyncio.Event()
+
+    @classmethod
+    async def activate(cls):
+        """Keep timers in this process (it runs the scheduler) and LISTEN for other processes' timers."""
+        cls._active = True
+        await cls.listen()
+
+    @classmethod
+    async def listen(cls) -> bool:
+        await cls._close_listener()
+        if not engine:
+            return False
+        try:
+            cls._listener = await engine.connect()
+            raw = (await cls._listener.get_raw_connection()).driver_connection
+            await raw.add_listener(cls.NOTIFY_CHANNEL, cls._on_notify)
+            raw.add_termination_listener(cls._on_terminated)
+            cls._listener_raw = raw
+            return True
+        except Exception as e:
+            logger.warning(f"Timer LISTEN unavailable, relying on rebuilds: {e}")
+            await cls._close_listener()
+            return False
+
+    @classmethod
+    async def deactivate(cls):
+        cls._active = False
+        cls._heap = []
+        cls._due = {}
+        await cls._close_listener()
+
+    @classmethod
+    async def _close_listener(cls):
+        listener, raw = cls._listener, cls._listener_raw
+        cls._listener = cls._listener_raw = None
+        if listener is not None:
+            try:
+                # Drop the LISTEN before the connection goes back to the pool.
+                if raw is not None:
+                    raw.remove_termination_listener(cls._on_terminated)
+                    if not raw.is_closed():
+                        await raw.remove_listener(cls.NOTIFY_CHANNEL, cls._on_notify)
+                await listener.close()
+            except Exception:
+                pass
+
+    @classmethod
+    def listening(cls) -> bool:
+        return cls._listener_raw is not None and not cls._listener_raw.is_closed()
+
+    @classmethod
+    def listener_lost(cls) -> bool:
+        return cls._listener_raw is not None and cls._listener_raw.is_closed()
+
+    @classmethod
+    def _on_terminated(cls, connection):
+        # Wake the scheduler so it can reconnect and rebuild.
+        cls._changed.set()
+
+    @classmethod
+    def _on_notify(cls, connection, pid, channel, payload):
+        try:
+            for kind, job_id, due_at in json.loads(payload):
+                cls.schedule(kind, job_id, datetime.fromisoformat(due_at))
+        except (ValueError, TypeError) as e:
+            logger.error(f"Bad timer notification {payload!r}: {e}")
+
+    @classmethod
+    def schedule(cls, kind: str, job_id: int, due_at: datetime):
+        if not cls._active:
+            return
+        if cls._due.get((kind, job_id)) == due_at:
+            return
+        cls._due[(kind, job_id)] = due_at
+        heapq.heappush(cls._heap, (due_at, kind, job_id))
+        if cls._heap[0][0] == due_at:
+            # New earliest timer: wake the sleeper so it can sleep less.
+            cls._changed.set()
+
+    @classmethod
+    async def schedule_job(cls, job, session: AsyncSession):
+        """Register ``job``'s timers; call inside the transaction that changed it."""
+        timers = job_timers(job)
+        if cls._active:
+            for kind, due_at in timers:
+                cls.schedule(kind, job.id, due_at)
+        elif timers:
+            # Delivered to the scheduler's process when (and only if) the caller commits.
+            payload = json.dumps([(kind, job.id, due_at.isoformat()) for kind, due_at in timers])
+            await session.execute(
+                text("SELECT pg_notify(:channel, :payload)"),
+                {"channel": cls.NOTIFY_CHANNEL, "payload": payload},
+            )
+
+    @classmethod
+    def restore(cls, timers: list[tuple[datetime, str, int]]):
+        """Put back timers whose pass failed, unless they were rescheduled meanwhile."""
+        for due_at, kind, job_id in timers:
+            if (kind, job_id) not in cls._due:
+                cls.schedule(kind, job_id, due_at)
+
+    @classmethod
+    async def rebuild(cls) -> int:
+        """Reload every pending timer from the jobs table. Returns the timer count."""
+        if not async_session:
+            return 0
+
+        async with async_session() as session:
+            result = await session.execute(
+                select(
+                    Job.id, Job.status, Job.sent_at, Job.subcontractor_id, Job.reminder_sent,
+                    Job.deadline, Job.deadline_reminder_sent, Job.deadline_overdue_sent,
+                ).where(Job.status.in_([JobStatus.SENT, JobStatus.ACCEPTED, JobStatus.IN_PROGRESS]))
+            )
+            rows = result.all()
+
+        cls._heap = []
+        cls._due = {}
+        for row in rows:
+            for kind, due_at in job_timers(row):
+                cls._due[(kind, row.id)] = due_at
+                cls._heap.append((due_at, kind, row.id))
+        heapq.heapify(cls._heap)
+        cls._changed.set()
+        return len(cls._heap)
+
+    @classmethod
+    def _drop_stale(cls):
+        while cls._heap:
+            due_at, kind, job_id = cls._heap[0]
+            if cls._due.get((kind, job_id)) == due_at:
+                return
+            heapq.heappop(cls._heap)
+
+    @classmethod
+    def next_due(cls) -> datetime | None:
+        cls._drop_stale()
+        return cls._heap[0][0] if cls._heap else None
+
+    @classmethod
+    def pop_due(cls, now: datetime) -> list[tuple[datetime, str, int]]:
+        """Remove every timer due at or before ``now``; returns them as (due_at, kind, job_id)."""
+        timers = []
+        while (due_at := cls.next_due()) is not None and due_at <= now:
+            timer = heapq.heappop(cls._heap)
+            del cls._due[timer[1:]]
+            timers.append(timer)
+        return timers
+
+    @classmethod
+    async def wait_due(cls, timeout: float) -> list[tuple[datetime, str, int]]:
+        """Sleep until timers are due (returning them) or ``timeout`` seconds pass (returning an empty list)."""
+        loop = asyncio.get_running_loop()
+        give_up_at = loop.time() + timeout
+        while True:
+            now = datetime.utcnow()
+            timers = cls.pop_due(now)
+            if timers:
+                return timers
+
+            delay = give_up_at - loop.time()
+            due_at = cls.next_due()
+            if due_at is not None:
+                delay = min(delay, (due_at - now).total_seconds())
+            if delay <= 0:
+                return []
+
+            cls._changed.clear()
+            try:
+                await asyncio.wait_for(cls._changed.wait(), timeout=delay)
+            except asyncio.TimeoutError:
+                pass
@@ -0,0 +1,200 @@
+"""
+Sharded update processing (WORKER_PROCESSES > 0).
+
+The main process only receives updates (polling or webhook) and routes each
+one by chat id to one of N worker processes. Every worker runs the full
+dispatcher (routers, middlewares, FSM storage) in its own event loop and
+handles a chat's updates one at a time, in arrival order, while different
+chats run concurrently. CPU-heavy work (PDF rendering, checklist parsing)
+then only stalls the chats of its own shard, and throughput scales with cores.
+
+The scheduler and outbox worker stay in the main process. The main process
+and every worker each get an equal share of TELEGRAM_GLOBAL_RATE (see
+use_global_rate_share), so together they never exceed it.
+"""
+import asyncio
+import multiprocessing
+import queue as queue_module
+import signal
+from typing import Any
+from aiogram import Bot
+from aiogram.methods import TelegramMethod
+from src.bot.config import config
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Seconds a worker waits for an update before checking that its supervisor is still alive.
+_IDLE_POLL_SECONDS = 1.0
+_STOP = None
+
+
+def chat_id_of(update: dict[str, Any]) -> int:
+    """Chat an update belongs to (the sender for chat-less updates such as inline queries); 0 if none."""
+    for payload in update.values():
+        if not isinstance(payload, dict):
+            continue
+        chat = payload.get("chat") or (payload.get("message") or {}).get("chat")
+        if chat:
+            return chat["id"]
+        user = payload.get("from") or payload.get("user")
+        if user:
+            return user["id"]
+    return 0
+
+
+def use_global_rate_share(workers: int):
+    """Limit this process to its share of the global send rate.
+
+    The main process (outbox worker) and each of the ``workers`` shards send
+    independently, so the global limit is split ``workers + 1`` ways. Chats are
+    sharded, so per-chat limits hold as-is.
+    """
+    from src.bot.services.dispatch import DispatchService, TelegramRateLimiter
+
+    DispatchService.limiter = TelegramRateLimiter(
+        global_rate=config.TELEGRAM_GLOBAL_RATE / (workers + 1),
+        per_chat_rate=config.TELEGRAM_PER_CHAT_RATE,
+        per_chat_burst=config.TELEGRAM_PER_CHAT_BURST,
+    )
+
+
+def shard_for(update: dict[str, Any], shards: int) -> int:
+    return chat_id_of(update) % shards
+
+
+class ShardSupervisor:
+    """Spawns the worker processes and routes raw updates to them by chat id.
+
+    Workers are restarted if they die; their queue (and whatever was waiting
+    in it) is kept.
+    """
+
+    def __init__(self, workers: int):
+        self.ctx = multiprocessing.get_context("spawn")
+        self.workers = workers
+        self.queues = [self.ctx.Queue() for _ in range(workers)]
+        self.processes: list[multiprocessing.Process | None] = [None] * workers
+        self._stopping = False
+
+    def _spawn(self, index: int):
+        process = self.ctx.Process(
+            target=run_worker, args=(index, self.workers, self.queues[index]), name=f"shard-{index}"
+        )
+        process.start()
+        self.processes[index] = process
+
+    def start(self):
+        for index in range(self.workers):
+            self._spawn(index)
+        logger.info(f"Started {self.workers} update worker processes")
+
+    def dispatch(self, update: dict[str, Any]):
+        index = shard_for(update, self.workers)
+        process = self.processes[index]
+        if not self._stopping and process is not None and not process.is_alive():
+            logger.error(f"Worker shard-{index} exited with code {process.exitcode}, restarting")
+            self._spawn(index)
+        self.queues[index].put(update)
+
+    async def poll(self, bot: Bot, allowed_updates: list[str]):
+        """Long-poll getUpdates and route every update; runs until cancelled."""
+        offset = None
+        while True:
+            try:
+                updates = await bot.get_updates(offset=offset, timeout=30, allowed_updates=allowed_updates)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"getUpdates failed: {e}")
+                await asyncio.sleep(5)
+                continue
+            for update in updates:
+                self.dispatch(update.model_dump(mode="json", by_alias=True, exclude_none=True))
+                offset = update.update_id + 1
+
+    async def stop(self, timeout: float = 30):
+        """Let every worker finish its queue and in-flight updates, then exit."""
+        self._stopping = True
+        for q in self.queues:
+            q.put(_STOP)
+        loop = asyncio.get_running_loop()
+        for index, process in enumerate(self.processes):
+            if process is None:
+                continue
+            await loop.run_in_executor(None, process.join, timeout)
+            if process.is_alive():
+                logger.warning(f"Worker shard-{index} did not stop in {timeout}s, terminating")
+                process.terminate()
+                await loop.run_in_executor(None, process.join, 5)
+
+
+def run_worker(index: int, workers: int, updates: multiprocessing.Queue):
+    """Worker process entry point (spawned, so it imports everything afresh)."""
+    # The supervisor decides when to stop; Ctrl+C reaches the whole process group.
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, signal.SIG_IGN)
+    config.setup_logging()
+    asyncio.run(_worker_main(index, workers, updates))
+
+
+def _next_update(updates: multiprocessing.Queue):
+    try:
+        return updates.get(timeout=_IDLE_POLL_SECONDS)
+    except queue_module.Empty:
+        return ...
+
+
+async def _handle(dp, bot: Bot, update: dict[str, Any], previous: asyncio.Task | None):
+    if previous is not None:
+        # Same chat: wait for its earlier update, whatever the outcome.
+        await asyncio.wait({previous})
+    try:
+        result = await dp.feed_raw_update(bot=bot, update=update)
+        if isinstance(result, TelegramMethod):
+            await dp.silent_call_request(bot=bot, result=result)
+    except Exception as e:
+        logger.error(f"Update {update.get('update_id')} failed: {e}")
+
+
+async def _worker_main(index: int, workers: int, updates: multiprocessing.Queue):
+    from src.bot.main import build_bot, build_dispatcher
+    from src.bot.database.session import engine, replica_engine
+
+    use_global_rate_share(workers)
+    bot = build_bot()
+    dp = build_dispatcher()
+    await dp.emit_startup(bot=bot, dispatcher=dp)
+    logger.info(f"Worker shard-{index} ready")
+
+    loop = asyncio.get_running_loop()
+    parent = multiprocessing.parent_process()
+    tails: dict[int, asyncio.Task] = {}
+
+    def forget(chat_id: int, task: asyncio.Task):
+        if tails.get(chat_id) is task:
+            del tails[chat_id]
+
+    while True:
+        update = await loop.run_in_executor(None, _next_update, updates)
+        if update is _STOP:
+            break
+        if update is ...:
+            if parent is not None and not parent.is_alive():
+                logger.error(f"Worker shard-{index}: supervisor is gone, exiting")
+                break
+            continue
+        chat_id = chat_id_of(update)
+        task = asyncio.create_task(_handle(dp, bot, update, tails.get(chat_id)))
+        tails[chat_id] = task
+        task.add_done_callback(lambda t, c=chat_id: forget(c, t))
+
+    if tails:
+        await asyncio.wait(set(tails.values()))
+    await dp.emit_shutdown(bot=bot, dispatcher=dp)
+    await bot.session.close()
+    if engine:
+        await engine.dispose()
+    if replica_engine:
+        await replica_engine.dispose()
+    logger.info(f"Worker shard-{index} stopped")
@@ -1,4 +1,4 @@
-from .permissions import require_role, get_user_role
+from .permissions import require_role, get_user_role, get_current_user
 from .keyboards import (
     get_main_menu_keyboard,
     get_job_type_keyboard,
@@ -15,6 +15,7 @@ from .keyboards import (
 __all__ = [
     'require_role',
     'get_user_role',
+    'get_current_user',
     'get_main_menu_keyboard',
     'get_job_type_keyboard',
     'get_skip_keyboard',
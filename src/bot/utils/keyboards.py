@@ -1,6 +1,7 @@
 from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton, ReplyKeyboardMarkup, KeyboardButton
 from src.bot.database.models import UserRole, JobStatus, AvailabilityStatus
 from src.bot.utils.roles import creatable_roles
+from src.bot.utils.pagination import page_callback, NEXT, PREV
 
 def get_main_menu_keyboard(role: UserRole, lang: str = "en") -> ReplyKeyboardMarkup:
     from src.bot.i18n import get_text as t
@@ -190,6 +191,31 @@ def get_quote_detail_keyboard(quote_id: int, job_id: int, lang: str = "en") -> I
         [InlineKeyboardButton(text=i18n_msg("btn_back_to_quotes", lang=lang), callback_data=f"view_quotes:{job_id}")]
     ])
 
+def _job_list_button(job, context: str) -> InlineKeyboardButton:
+    status_emoji = {
+        JobStatus.CREATED: "",
+        JobStatus.SENT: "",
+        JobStatus.ACCEPTED: "",
+        JobStatus.IN_PROGRESS: "",
+        JobStatus.SUBMITTED: "",
+        JobStatus.COMPLETED: "",
+        JobStatus.CANCELLED: "",
+        JobStatus.ARCHIVED: ""
+    }.get(job.status, "")
+    return InlineKeyboardButton(
+        text=f"{status_emoji} #{job.id}: {job.title[:30]}",
+        callback_data=f"view_job:{context}:{job.id}"
+    )
+
+def _cursor_nav_buttons(prefix: str, prev_cursor: str | None, next_cursor: str | None, lang: str) -> list:
+    from src.bot.i18n import msg as i18n_msg
+    nav_buttons = []
+    if prev_cursor:
+        nav_buttons.append(InlineKeyboardButton(text=i18n_msg("btn_previous", lang=lang), callback_data=page_callback(prefix, PREV, prev_cursor)))
+    if next_cursor:
+        nav_buttons.append(InlineKeyboardButton(text=i18n_msg("btn_next", lang=lang), callback_data=page_callback(prefix, NEXT, next_cursor)))
+    return nav_buttons
+
 def get_job_list_keyboard(jobs: list, page: int = 0, page_size: int = 5, context: str = "history", lang: str = "en") -> InlineKeyboardMarkup:
     from src.bot.i18n import msg as i18n_msg
     start = page * page_size
@@ -197,20 +223,7 @@ def get_job_list_keyboard(jobs: list, page: int = 0, page_size: int = 5, context
     page_jobs = jobs[start:end]
     buttons = []
     for job in page_jobs:
-        status_emoji = {
-            JobStatus.CREATED: "",
-            JobStatus.SENT: "",
-            JobStatus.ACCEPTED: "",
-            JobStatus.IN_PROGRESS: "",
-            JobStatus.SUBMITTED: "",
-            JobStatus.COMPLETED: "",
-            JobStatus.CANCELLED: "",
-            JobStatus.ARCHIVED: ""
-        }.get(job.status, "")
-        buttons.append([InlineKeyboardButton(
-            text=f"{status_emoji} #{job.id}: {job.title[:30]}",
-            callback_data=f"view_job:{context}:{job.id}"
-        )])
+        buttons.append([_job_list_button(job, context)])
     nav_buttons = []
     if page > 0:
         nav_buttons.append(InlineKeyboardButton(text=i18n_msg("btn_previous", lang=lang), callback_data=f"page:{context}:{page-1}"))
@@ -220,6 +233,14 @@ def get_job_list_keyboard(jobs: list, page: int = 0, page_size: int = 5, context
         buttons.append(nav_buttons)
     return InlineKeyboardMarkup(inline_keyboard=buttons)
 
+def get_job_page_keyboard(jobs: list, context: str, prev_cursor: str | None = None, next_cursor: str | None = None, lang: str = "en") -> InlineKeyboardMarkup:
+    """One keyset page of jobs (see utils/pagination.py); nav buttons carry the cursors."""
+    buttons = [[_job_list_button(job, context)] for job in jobs]
+    nav_buttons = _cursor_nav_buttons(f"page:{context}", prev_cursor, next_cursor, lang)
+    if nav_buttons:
+        buttons.append(nav_buttons)
+    return InlineKeyboardMarkup(inline_keyboard=buttons)
+
 def get_role_selection_keyboard(creator_role: str = "super_admin", lang: str = "en") -> InlineKeyboardMarkup:
     from src.bot.i18n import msg as i18n_msg
     buttons = []
@@ -246,24 +267,18 @@ def get_back_keyboard(callback_data: str = "back:main", lang: str = "en") -> Inl
         [InlineKeyboardButton(text=i18n_msg("btn_back", lang=lang), callback_data=callback_data)]
     ])
 
-def get_user_list_keyboard(users: list, page: int = 0, page_size: int = 5, include_self: bool = True, is_super_admin: bool = False, lang: str = "en") -> InlineKeyboardMarkup:
+def get_user_list_keyboard(users: list, scope: str = "all", prev_cursor: str | None = None, next_cursor: str | None = None, lang: str = "en") -> InlineKeyboardMarkup:
+    """One keyset page of users; ``scope`` is a role value or "all" and is kept in the nav callbacks."""
     from src.bot.i18n import msg as i18n_msg
-    start = page * page_size
-    end = start + page_size
-    page_users = users[start:end]
     buttons = []
-    for user in page_users:
+    for user in users:
         role_emoji = {"admin": "", "supervisor": "", "subcontractor": ""}.get(user.role.value, "")
         name = user.first_name or user.username or f"User {user.telegram_id}"
         buttons.append([InlineKeyboardButton(
             text=f"{role_emoji} {name}",
             callback_data=f"manage_user:{user.id}"
         )])
-    nav_buttons = []
-    if page > 0:
-        nav_buttons.append(InlineKeyboardButton(text=i18n_msg("btn_previous", lang=lang), callback_data=f"page:users:{page-1}"))
-    if end < len(users):
-        nav_buttons.append(InlineKeyboardButton(text=i18n_msg("btn_next", lang=lang), callback_data=f"page:users:{page+1}"))
+    nav_buttons = _cursor_nav_buttons(f"page:users:{scope}", prev_cursor, next_cursor, lang)
     if nav_buttons:
         buttons.append(nav_buttons)
     buttons.append([InlineKeyboardButton(text=i18n_msg("btn_back", lang=lang), callback_data="back:admin_menu")])
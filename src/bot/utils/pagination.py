@@ -0,0 +1,110 @@
+"""
+Keyset (cursor) pagination over ``(created_at, id)``, newest first.
+
+A cursor is the ``(created_at, id)`` of a page's edge row, packed small enough
+to travel in Telegram callback data (64 bytes). Every page costs one query of
+``page_size + 1`` rows: the extra row only tells us whether another page
+exists in that direction.
+
+Queries filter and order on the bare ``(created_at, id)`` columns (NOT NULL,
+see migrations/created_at_not_null) so they walk the ``(created_at, id)``
+indexes instead of sorting the whole filtered set.
+"""
+from datetime import datetime, timedelta
+from sqlalchemy import Select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+PAGE_SIZE = 5
+
+NEXT = "n"  # older rows
+PREV = "p"  # newer rows
+
+_EPOCH = datetime(1970, 1, 1)
+
+
+def _sort_key(row) -> tuple[datetime, int]:
+    return row.created_at, row.id
+
+
+def encode_cursor(created_at: datetime, row_id: int) -> str:
+    micros = (created_at - _EPOCH) // timedelta(microseconds=1)
+    return f"{micros:x}.{row_id:x}"
+
+
+def decode_cursor(token: str) -> tuple[datetime, int]:
+    micros, row_id = token.split(".")
+    return _EPOCH + timedelta(microseconds=int(micros, 16)), int(row_id, 16)
+
+
+def page_callback(prefix: str, direction: str, cursor: str) -> str:
+    return f"{prefix}:{direction}:{cursor}"
+
+
+def parse_page_callback(data: str, prefix: str) -> tuple[str, str | None]:
+    """(direction, cursor) from callback data built by :func:`page_callback`."""
+    rest = data[len(prefix) + 1:]
+    direction, _, cursor = rest.partition(":")
+    if direction not in (NEXT, PREV) or not cursor:
+        return NEXT, None
+    return direction, cursor
+
+
+def _keyset_query(query: Select, model, cursor: str | None, backwards: bool, page_size: int) -> Select:
+    key = tuple_(model.created_at, model.id)
+    if cursor:
+        edge = tuple_(*decode_cursor(cursor))
+        query = query.where(key > edge if backwards else key < edge)
+    if backwards:
+        query = query.order_by(model.created_at.asc(), model.id.asc())
+    else:
+        query = query.order_by(model.created_at.desc(), model.id.desc())
+    return query.limit(page_size + 1)
+
+
+async def fetch_page(
+    session: AsyncSession,
+    query: Select,
+    model,
+    cursor: str | None = None,
+    direction: str = NEXT,
+    page_size: int = PAGE_SIZE,
+) -> tuple[list, str | None, str | None]:
+    """Run ``query`` for one page of ``model`` rows.
+
+    Returns: (rows newest first, cursor for the newer page or None, cursor for the older page or None)
+    """
+    return await fetch_merged_page(session, [(query, model)], cursor, direction, page_size)
+
+
+async def fetch_merged_page(
+    session: AsyncSession,
+    sources: list[tuple[Select, object]],
+    cursor: str | None = None,
+    direction: str = NEXT,
+    page_size: int = PAGE_SIZE,
+) -> tuple[list, str | None, str | None]:
+    """Like :func:`fetch_page`, over several ``(query, model)`` sources at once.
+
+    Ids must be unique across sources (e.g. a table and its archive tier).
+    Each source is asked for ``page_size + 1`` rows and the results merged.
+    """
+    backwards = direction == PREV and cursor is not None
+
+    rows = []
+    for query, model in sources:
+        result = await session.execute(_keyset_query(query, model, cursor, backwards, page_size))
+        rows.extend(result.scalars().all())
+    rows.sort(key=_sort_key, reverse=not backwards)
+
+    has_more = len(rows) > page_size
+    rows = rows[:page_size]
+    if backwards:
+        rows.reverse()
+    if not rows:
+        return rows, None, None
+
+    first = encode_cursor(rows[0].created_at, rows[0].id)
+    last = encode_cursor(rows[-1].created_at, rows[-1].id)
+    if backwards:
+        return rows, first if has_more else None, last
+    return rows, first if cursor else None, last if has_more else None
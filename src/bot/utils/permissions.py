@@ -1,31 +1,40 @@
 from functools import wraps
 from aiogram.types import Message
 from sqlalchemy import select
-from src.bot.database import async_session, User
+from src.bot.database import async_session, session_scope, User
 from src.bot.database.models import UserRole
 from src.bot.utils.roles import has_minimum_role
+from src.bot.middleware.user_context import current_user_for, is_missing
+from src.bot.utils.user_cache import UserProfileCache
 import logging
 
 logger = logging.getLogger(__name__)
 
 async def get_user_role(telegram_id: int) -> UserRole | None:
-    if not async_session:
-        return None
-    async with async_session() as session:
-        result = await session.execute(
-            select(User).where(User.telegram_id == telegram_id, User.is_active == True)
-        )
-        user = result.scalar_one_or_none()
-        return user.role if user else None
+    cached = current_user_for(telegram_id)
+    if not is_missing(cached):
+        return cached.role if cached and cached.is_active else None
+    profile = await UserProfileCache.get(telegram_id)
+    return profile.role if profile and profile.is_active else None
 
 async def get_user(telegram_id: int) -> User | None:
+    user = await get_current_user(telegram_id)
+    return user if user and user.is_active else None
+
+async def get_current_user(telegram_id: int) -> User | None:
+    """User row for ``telegram_id`` (active or not), reusing the row loaded for this update."""
+    cached = current_user_for(telegram_id)
+    if not is_missing(cached):
+        return cached
     if not async_session:
         return None
-    async with async_session() as session:
+    async with session_scope() as session:
         result = await session.execute(
-            select(User).where(User.telegram_id == telegram_id, User.is_active == True)
+            select(User).where(User.telegram_id == telegram_id)
         )
-        return result.scalar_one_or_none()
+        user = result.scalar_one_or_none()
+    UserProfileCache.remember(user, telegram_id)
+    return user
 
 def require_role(*roles: UserRole):
     def decorator(handler):
@@ -0,0 +1,119 @@
+import time
+from collections import OrderedDict
+from typing import Iterable, NamedTuple
+from sqlalchemy import select
+from src.bot.config import config
+from src.bot.database import async_session, User
+from src.bot.database.models import UserRole
+from src.bot.middleware.user_context import forget_current_user
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class UserProfile(NamedTuple):
+    id: int
+    role: UserRole
+    team_id: int | None
+    region_id: int | None
+    language: str
+    is_active: bool
+
+
+class UserProfileCache:
+    """Bounded TTL/LRU cache of the user fields looked up on hot paths.
+
+    Maps telegram_id to a :class:`UserProfile` (or ``None`` for unknown ids).
+    Writers that change a user's registration, role, team, language or active
+    flag must call :meth:`invalidate`; the TTL bounds staleness for changes
+    made by other processes.
+    """
+
+    _entries: "OrderedDict[int, tuple[float, UserProfile | None]]" = OrderedDict()
+
+    @staticmethod
+    def _profile(user: User) -> UserProfile:
+        return UserProfile(
+            id=user.id,
+            role=user.role,
+            team_id=user.team_id,
+            region_id=user.region_id,
+            language=user.language or "en",
+            is_active=bool(user.is_active),
+        )
+
+    @classmethod
+    def _store(cls, telegram_id: int, profile: UserProfile | None):
+        cls._entries[telegram_id] = (time.monotonic() + config.USER_CACHE_TTL_SECONDS, profile)
+        cls._entries.move_to_end(telegram_id)
+        while len(cls._entries) > config.USER_CACHE_MAX_ENTRIES:
+            cls._entries.popitem(last=False)
+
+    @classmethod
+    def _lookup(cls, telegram_id: int) -> tuple[bool, UserProfile | None]:
+        entry = cls._entries.get(telegram_id)
+        if entry is None:
+            return False, None
+        expires_at, profile = entry
+        if expires_at < time.monotonic():
+            del cls._entries[telegram_id]
+            return False, None
+        cls._entries.move_to_end(telegram_id)
+        return True, profile
+
+    @classmethod
+    def remember(cls, user: User | None, telegram_id: int | None = None):
+        """Prime the cache from a User row that was loaded anyway."""
+        if user is not None:
+            cls._store(user.telegram_id, cls._profile(user))
+        elif telegram_id is not None:
+            cls._store(telegram_id, None)
+
+    @classmethod
+    async def get(cls, telegram_id: int) -> UserProfile | None:
+        return (await cls.get_many([telegram_id])).get(telegram_id)
+
+    @classmethod
+    async def get_many(cls, telegram_ids: Iterable[int]) -> dict[int, UserProfile | None]:
+        """Profiles for all ``telegram_ids``, fetching every miss in one query."""
+        profiles: dict[int, UserProfile | None] = {}
+        missing = []
+        for telegram_id in dict.fromkeys(telegram_ids):
+            hit, profile = cls._lookup(telegram_id)
+            if hit:
+                profiles[telegram_id] = profile
+            else:
+                missing.append(telegram_id)
+
+        if not missing or not async_session:
+            return profiles
+
+        try:
+            async with async_session() as session:
+                result = await session.execute(
+                    select(User).where(User.telegram_id.in_(missing))
+                )
+                users = {u.telegram_id: u for u in result.scalars().all()}
+        except Exception as e:
+            logger.error(f"Failed to load user profiles: {e}")
+            return profiles
+
+        for telegram_id in missing:
+            user = users.get(telegram_id)
+            profile = cls._profile(user) if user else None
+            cls._store(telegram_id, profile)
+            profiles[telegram_id] = profile
+        return profiles
+
+    @classmethod
+    def invalidate(cls, *telegram_ids: int):
+        for telegram_id in telegram_ids:
+            if telegram_id is None:
+                continue
+            cls._entries.pop(telegram_id, None)
+            forget_current_user(telegram_id)
+
+    @classmethod
+    def clear(cls):
+        cls._entries.clear()
+        forget_current_user()
@@ -0,0 +1,84 @@
+"""
+Webhook serving mode (BOT_MODE=webhook).
+
+Telegram pushes each update to ``WEBHOOK_BASE_URL + WEBHOOK_PATH`` as soon as
+it happens, instead of the bot fetching batches with getUpdates. Requests
+without the ``WEBHOOK_SECRET`` header are rejected; accepted updates are
+acknowledged immediately and handled in the background. Any number of
+replicas can serve the same webhook behind a load balancer.
+
+With WORKER_PROCESSES set, the endpoint only verifies the secret and hands the
+raw update to its shard (see src.bot.sharding).
+"""
+import asyncio
+import secrets
+from aiohttp import web
+from aiogram import Bot, Dispatcher
+from aiogram.webhook.aiohttp_server import SimpleRequestHandler, setup_application
+from src.bot.config import config
+from src.bot.sharding import ShardSupervisor
+import logging
+
+logger = logging.getLogger(__name__)
+
+ALLOWED_UPDATES = ["message", "callback_query"]
+
+
+class DrainingRequestHandler(SimpleRequestHandler):
+    """SimpleRequestHandler that lets in-flight updates finish before closing the bot session."""
+
+    DRAIN_SECONDS = 25
+
+    async def close(self) -> None:
+        pending = set(self._background_feed_update_tasks)
+        if pending:
+            logger.info(f"Waiting for {len(pending)} in-flight updates")
+            _, still_running = await asyncio.wait(pending, timeout=self.DRAIN_SECONDS)
+            for task in still_running:
+                task.cancel()
+        await super().close()
+
+
+def _sharded_handler(shards: ShardSupervisor):
+    async def handle(request: web.Request) -> web.Response:
+        if not secrets.compare_digest(request.headers.get("X-Telegram-Bot-Api-Secret-Token", ""), config.WEBHOOK_SECRET):
+            return web.Response(body="Unauthorized", status=401)
+        shards.dispatch(await request.json())
+        return web.json_response({})
+    return handle
+
+
+def build_app(dp: Dispatcher | None, bot: Bot, shards: ShardSupervisor | None = None) -> web.Application:
+    app = web.Application()
+    app.router.add_get("/healthz", lambda request: web.Response(text="ok"))
+    if shards:
+        app.router.add_post(config.WEBHOOK_PATH, _sharded_handler(shards))
+        return app
+    # Registered before setup_application so updates drain before the dispatcher
+    # shutdown hooks (FSM storage flush) run.
+    DrainingRequestHandler(dispatcher=dp, bot=bot, secret_token=config.WEBHOOK_SECRET).register(
+        app, path=config.WEBHOOK_PATH
+    )
+    setup_application(app, dp, bot=bot)
+    return app
+
+
+async def start_webhook(dp: Dispatcher | None, bot: Bot, shards: ShardSupervisor | None = None) -> web.AppRunner:
+    """Serve the webhook on WEBHOOK_HOST:WEBHOOK_PORT and point Telegram at it."""
+    runner = web.AppRunner(build_app(dp, bot, shards))
+    await runner.setup()
+    site = web.TCPSite(runner, config.WEBHOOK_HOST, config.WEBHOOK_PORT)
+    await site.start()
+    logger.info(f"Webhook server listening on {config.WEBHOOK_HOST}:{config.WEBHOOK_PORT}{config.WEBHOOK_PATH}")
+
+    # Idempotent, so every replica can register the same URL on start.
+    try:
+        await bot.set_webhook(
+            config.WEBHOOK_BASE_URL.rstrip("/") + config.WEBHOOK_PATH,
+            secret_token=config.WEBHOOK_SECRET,
+            allowed_updates=ALLOWED_UPDATES,
+        )
+    except Exception:
+        await runner.cleanup()
+        raise
+    return runner